@@ -0,0 +1,119 @@
+import numpy as np
+
+DEFAULT_TIERS = (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000)
+
+
+def _normalize(prices, weights, budgets):
+    prices = np.asarray(prices, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum()
+    budgets = np.atleast_1d(np.asarray(budgets, dtype=np.float64))
+    if (prices <= 0).any():
+        raise ValueError("Prices must be positive")
+    return prices, weights, budgets
+
+
+def allocation_error(shares, prices, weights, budgets):
+    """Root-mean-square gap between held and target weights, counting idle cash as a gap.
+
+    Works on a single budget or a batch (shares of shape budgets x assets).
+    """
+    prices, weights, budgets = _normalize(prices, weights, budgets)
+    held = np.atleast_2d(shares) * prices / budgets[:, None]
+    cash = 1.0 - held.sum(axis=1)
+    squared = ((held - weights) ** 2).sum(axis=1) + cash ** 2
+    return np.sqrt(squared / (len(weights) + 1))
+
+
+def allocate_shares(prices, weights, budgets, max_rounds=None, max_swaps=50, candidates=8):
+    """Turn target weights into whole shares for one or many budgets at once.
+
+    Every budget starts from the floored target share counts. Leftover cash is
+    then spent greedily: each round buys, for every budget still improving,
+    the one share that most reduces the squared gap between held and target
+    dollars (idle cash counts as a gap, so cash is spent whenever that helps).
+    A bounded local search then tries single-share buys, sells and swaps
+    until no budget improves or `max_swaps` rounds have run.
+
+    Returns (shares, cash) with shapes (budgets x assets) and (budgets,).
+    """
+    prices, weights, budgets = _normalize(prices, weights, budgets)
+    targets = budgets[:, None] * weights[None, :]
+    shares = np.rint(targets / prices).astype(np.int64)
+    deficit = targets - shares * prices  # target minus held dollars, per asset
+    cash = budgets - (shares * prices).sum(axis=1)
+
+    # Rounding to the nearest share can overspend; sell the least harmful share
+    # (the change in squared gap is 2 * p_i * (d_i + c + p_i)) until every budget fits
+    over = np.flatnonzero(cash < 0)
+    while len(over):
+        c = cash[over, None]
+        cost = prices * (deficit[over] + c + prices)
+        cost[shares[over] == 0] = np.inf
+        worst = cost.argmin(axis=1)
+        shares[over, worst] -= 1
+        deficit[over, worst] += prices[worst]
+        cash[over] += prices[worst]
+        over = over[cash[over] < 0]
+
+    # Buying one share of i changes the squared gap by 2 * p_i * (p_i - d_i - c),
+    # so the best buy maximizes p_i * (d_i + c - p_i) among affordable names
+    active = np.arange(len(budgets))
+    rounds = 0
+    while len(active) and (max_rounds is None or rounds < max_rounds):
+        c = cash[active, None]
+        gain = prices * (deficit[active] + c - prices)
+        gain[prices > c] = -np.inf
+        best = gain.argmax(axis=1)
+        improving = gain[np.arange(len(active)), best] > 0
+        active, best = active[improving], best[improving]
+        shares[active, best] += 1
+        deficit[active, best] -= prices[best]
+        cash[active] -= prices[best]
+        rounds += 1
+
+    # Local search over single moves: buy one share, sell one share, or swap a
+    # share of one name for another. Only the `candidates` names with the best
+    # standalone sell and buy changes are paired. With a zero-price "nothing"
+    # option on both sides, selling i and buying j changes the squared gap by
+    #   p_i (2 d_i + p_i) + p_j (p_j - 2 d_j) + (p_i - p_j) (2 c + p_i - p_j)
+    k = min(len(prices), candidates)
+    active = np.arange(len(budgets))
+    for _ in range(max_swaps):
+        if not len(active):
+            break
+        d, c = deficit[active], cash[active]
+        rows = np.arange(len(active))[:, None]
+        sell_score = np.where(shares[active] > 0, prices * (2 * d + prices), np.inf)
+        buy_score = prices * (prices - 2 * d)
+        sells = np.argpartition(sell_score, k - 1, axis=1)[:, :k]
+        buys = np.argpartition(buy_score, k - 1, axis=1)[:, :k]
+
+        nothing = np.zeros((len(active), 1))
+        p_sell = np.concatenate((prices[sells], nothing), axis=1)[:, :, None]
+        p_buy = np.concatenate((prices[buys], nothing), axis=1)[:, None, :]
+        delta = (
+            np.concatenate((sell_score[rows, sells], nothing), axis=1)[:, :, None]
+            + np.concatenate((buy_score[rows, buys], nothing), axis=1)[:, None, :]
+            + (p_sell - p_buy) * (2 * c[:, None, None] + p_sell - p_buy)
+        )
+        delta[(c[:, None, None] + p_sell - p_buy) < 0] = np.inf  # unaffordable
+        sell_ids = np.concatenate((sells, nothing - 1), axis=1).astype(np.int64)
+        buy_ids = np.concatenate((buys, nothing - 1), axis=1).astype(np.int64)
+        delta[(sell_ids[:, :, None] == buy_ids[:, None, :]) & (sell_ids[:, :, None] >= 0)] = np.inf
+
+        flat = delta.reshape(len(active), -1).argmin(axis=1)
+        improving = delta.reshape(len(active), -1)[np.arange(len(active)), flat] < -1e-9
+        sell_slot, buy_slot = np.divmod(flat[improving], k + 1)
+        sell = sell_ids[improving, sell_slot]
+        buy = buy_ids[improving, buy_slot]
+        active = active[improving]
+
+        selling, buying = sell >= 0, buy >= 0
+        for mask, ids, sign in [(selling, sell, 1), (buying, buy, -1)]:
+            rows_, ids_ = active[mask], ids[mask]
+            shares[rows_, ids_] -= sign
+            deficit[rows_, ids_] += sign * prices[ids_]
+            cash[rows_] += sign * prices[ids_]
+
+    return shares, cash
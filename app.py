@@ -2,28 +2,92 @@ import os
 # Set OAuth insecure transport for development
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-import yfinance as yf
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
-import plotly.utils
+import hmac
 import json
-from sklearn.linear_model import LinearRegression
+import sys
+import time
 import warnings
 import requests
 from requests_oauthlib import OAuth2Session
 from config import Config
 from models import User, user_session
+from market_data import market_data
+from rate_limiter import PRIORITY_INTERACTIVE
+from precompute import SnapshotScheduler
+from jobs import JobLimitError, JobManager
+from quotes import QuoteFeed
+from transport import http_transport
+from oidc import google_oidc
+from universes import UniverseRegistry, normalize_symbols, partition
+from metrics import metrics, SamplingProfiler
+from responses import ResponseCache
 warnings.filterwarnings('ignore')
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The pandas/NumPy/yfinance analytics stack is imported on first use by the
+# analysis routes, so auth and static pages start without paying for it.
+ANALYTICS_MODULES = ['numpy', 'pandas', 'yfinance', 'screening', 'price_store', 'projection', 'monte_carlo', 'optimizer', 'allocation', 'backtest', 'rolling', 'fundamentals', 'charts', 'compute_pool', 'risk']
+
+def preload_analytics():
+    """Import the analytics stack up front (e.g. in a gunicorn --preload master)"""
+    import importlib
+    for module in ANALYTICS_MODULES:
+        importlib.import_module(module)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, serializing with orjson when installed and timing responses as their own stage.
+    
+    orjson encodes NumPy scalars and arrays natively (and NaN as null); the
+    standard library fallback converts them with tolist() instead of failing.
+    """
+    
+    @staticmethod
+    def default(o):
+        if type(o).__module__ == 'numpy':
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+    
+    def dumps(self, obj, **kwargs):
+        # orjson output is always compact, so only compact or indent=2 calls can use it
+        if orjson is not None and set(kwargs) <= {'indent', 'separators'} and kwargs.get('indent') in (None, 2) and kwargs.get('separators') in (None, (',', ':')):
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=self.default, option=option).decode()
+            except orjson.JSONEncodeError:
+                pass  # e.g. integers beyond 64 bits: let the standard library handle it
+        return super().dumps(obj, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        with metrics.span('serialize'):
+            return super().response(*args, **kwargs)
+
 app = Flask(__name__)
 app.config.from_object(Config)
+app.json = TimedJSONProvider(app)
+
+# Serialized, compressed responses shared by the cacheable GET routes
+response_cache = ResponseCache(
+    app.json.dumps,
+    max_entries=Config.RESPONSE_CACHE_SIZE,
+    max_bytes=Config.RESPONSE_CACHE_MAX_BYTES,
+    ttl=Config.RESPONSE_CACHE_TTL,
+    min_compress_size=Config.RESPONSE_MIN_COMPRESS_SIZE
+)
 
-# Ensure session configuration is set properly
-app.config['SESSION_TYPE'] = 'filesystem'
+# Sessions are signed cookies and users live in the shared user store,
+# so any worker can serve any request
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
 
 # Initialize Flask-Login
@@ -36,36 +100,71 @@ def load_user(user_id):
     """Load user from session storage"""
     return user_session.get_user(user_id)
 
-# S&P 500 stock symbols (top 100 for demo purposes)
-SP500_SYMBOLS = [
-    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'BRK-B', 'LLY', 'TSLA', 'V',
-    'UNH', 'XOM', 'JNJ', 'JPM', 'PG', 'MA', 'HD', 'CVX', 'MRK', 'ABBV',
-    'PEP', 'KO', 'AVGO', 'PFE', 'TMO', 'COST', 'DHR', 'ACN', 'WMT', 'MCD',
-    'NEE', 'NKE', 'PM', 'TXN', 'RTX', 'HON', 'QCOM', 'LOW', 'UNP', 'IBM',
-    'CAT', 'GS', 'MS', 'AMGN', 'SPGI', 'INTC', 'VZ', 'T', 'BMY', 'DE',
-    'PLD', 'ADI', 'ISRG', 'GILD', 'REGN', 'CMCSA', 'ADP', 'TJX', 'NOC', 'MDLZ',
-    'DUK', 'SO', 'CME', 'SYK', 'CI', 'ZTS', 'ITW', 'BDX', 'EOG', 'KLAC',
-    'CSCO', 'USB', 'PGR', 'AON', 'TGT', 'SCHW', 'AXP', 'MMC', 'BLK', 'MO',
-    'GE', 'SLB', 'ETN', 'FIS', 'VRTX', 'APD', 'HUM', 'ICE', 'PSA', 'ORCL',
-    'LMT', 'TFC', 'AIG', 'COF', 'GM', 'D', 'SRE', 'MPC', 'AEP', 'FDX'
-]
-
-def calculate_pe_ratio(stock_data):
+@app.before_request
+def start_request_metrics():
+    """Start the request's stage breakdown and, on ?profile=1, a sampling profiler of every busy thread"""
+    g.request_started = time.perf_counter()
+    metrics.start_trace()
+    if app.config['PROFILING_ENABLED'] and request.args.get('profile') == '1':
+        g.profiler = SamplingProfiler(interval=Config.PROFILE_INTERVAL).start()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request latency and report the stage breakdown in a Server-Timing header"""
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    stages = metrics.end_trace()
+    metrics.observe('http_request_seconds', elapsed, endpoint=endpoint)
+    metrics.inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+    
+    timings = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in stages.items()]
+    response.headers['Server-Timing'] = ', '.join(timings + [f"total;dur={elapsed * 1000:.2f}"])
+    
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        path = profiler.stop().dump(Config.PROFILE_DIR, endpoint)
+        response.headers['X-Profile'] = os.path.basename(path)
+        app.logger.info("Profiled %s %s: %d samples written to %s", request.method, request.path, profiler.samples, path)
+    
+    if elapsed > Config.SLOW_REQUEST_SECONDS:
+        breakdown = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in stages.items())
+        app.logger.warning("Slow request %s %s: %.2fs (%s)", request.method, request.path, elapsed, breakdown or 'no stages')
+    return response
+
+# Symbol universes (S&P 500, Russell, ...) loaded from files in UNIVERSE_DIR, plus per-user watchlists
+universes = UniverseRegistry(Config.UNIVERSE_DIR, Config.WATCHLIST_DIR)
+
+def default_symbols():
+    """Current members of the default universe"""
+    return universes.get(Config.DEFAULT_UNIVERSE).symbols()
+
+def requested_universe(data, user_id=None):
+    """Return (symbols, universe) for a request's explicit `symbols` or named `universe`"""
+    if data.get('symbols'):
+        return normalize_symbols(data['symbols']), None
+    universe = universes.resolve(data.get('universe') or Config.DEFAULT_UNIVERSE, user_id)
+    return universe.symbols(data.get('as_of')), universe
+
+
+def calculate_pe_ratio(info):
     """Calculate P/E ratio for a stock"""
     try:
-        info = stock_data.info
         if 'trailingPE' in info and info['trailingPE'] is not None:
             return info['trailingPE']
         return None
     except:
         return None
 
-def calculate_sharpe_ratio(stock_data, risk_free_rate=0.02):
+def calculate_sharpe_ratio(hist, risk_free_rate=0.02):
     """Calculate Sharpe ratio for a stock"""
+    import numpy as np
+    
     try:
-        # Get 1 year of historical data
-        hist = stock_data.history(period="1y")
-        if len(hist) < 30:  # Need at least 30 days of data
+        # Expects 1 year of historical data
+        if hist is None or len(hist) < 30:  # Need at least 30 days of data
             return None
         
         # Calculate daily returns
@@ -82,97 +181,337 @@ def calculate_sharpe_ratio(stock_data, risk_free_rate=0.02):
     except:
         return None
 
-def calculate_dividend_yield(stock_data):
+def calculate_dividend_yield(info):
     """Calculate dividend yield for a stock"""
     try:
-        info = stock_data.info
         if 'dividendYield' in info and info['dividendYield'] is not None:
             return info['dividendYield'] * 100  # Convert to percentage
         return None
     except:
         return None
 
-def analyze_stocks():
-    """Analyze all S&P 500 stocks and return top performers"""
+def build_fundamentals(symbols=None):
+    """Fetch info for the universe and keep only the indexed fields in a columnar snapshot"""
+    from fundamentals import FundamentalsIndex
+    
+    symbols = symbols or default_symbols()
+    with metrics.span('fetch_info', items=len(symbols)):
+        infos = market_data.get_info(symbols)
+    with metrics.span('build_fundamentals', items=len(infos)):
+        return FundamentalsIndex.from_infos(infos)
+
+def fundamentals_for(symbols):
+    """Fundamentals covering symbols: the scheduled snapshot when it has them all, else a fresh build"""
+    snapshot = fundamentals_scheduler.latest()
+    if snapshot is not None and snapshot['data'].covers(symbols):
+        return snapshot['data']
+    return build_fundamentals(symbols)
+
+def shared_price_matrix(symbols, histories, period):
+    """The histories as a shared dates x symbols matrix, rebuilt only when a symbol gains a bar"""
+    from compute_pool import compute_pool
+    from screening import build_price_matrix
+    
+    version = hash(tuple((symbol, histories[symbol].index[-1], len(histories[symbol])) for symbol in symbols if symbol in histories))
+    return compute_pool.publish((period, tuple(symbols)), version, lambda: build_price_matrix(histories))
+
+def score_symbols(symbols, limit=None):
+    """Score symbols by the average of P/E, Sharpe and dividend yield, best first"""
+    from screening import build_price_matrix, compute_factors, average_ratios, ratio_array, optional_float, top_k
+    
     results = []
+    symbols = list(symbols)
+    if not symbols:
+        return results
     
-    # Use a smaller subset for demo purposes to avoid rate limiting
-    demo_symbols = SP500_SYMBOLS[:20]  # First 20 stocks for demo
+    # P/E, dividend yield, name and price come from the columnar fundamentals snapshot
+    fundamentals = fundamentals_for(symbols)
     
-    for symbol in demo_symbols:
-        try:
-            stock = yf.Ticker(symbol)
-            
-            pe_ratio = calculate_pe_ratio(stock)
-            sharpe_ratio = calculate_sharpe_ratio(stock)
-            dividend_yield = calculate_dividend_yield(stock)
-            
-            # Calculate average of available ratios
-            ratios = [r for r in [pe_ratio, sharpe_ratio, dividend_yield] if r is not None]
+    if market_data.uses_store():
+        # Rolling state only applies bars added since the last refresh
+        with metrics.span('rolling_metrics', items=len(symbols)):
+            rolling = market_data.get_rolling_metrics(symbols)
+        sharpe_ratios = ratio_array(rolling.get(symbol, {}).get('sharpe_ratio') for symbol in symbols)
+    else:
+        # Score the whole universe in one vectorized pass over a dates x symbols matrix
+        with metrics.span('fetch_history', items=len(symbols)):
+            histories = market_data.get_history(symbols, period="1y")
+        with metrics.span('compute_factors', items=len(histories)):
+            from compute_pool import compute_pool
+            if compute_pool.enabled:
+                # Worker processes read the prices from shared memory instead of competing for this process's GIL
+                matrix = shared_price_matrix(symbols, histories, "1y")
+                sharpe_ratios = compute_pool.factors(matrix, symbols)['sharpe_ratio']
+            else:
+                prices = build_price_matrix(histories)
+                sharpe_ratios = compute_factors(prices).reindex(symbols)['sharpe_ratio'].to_numpy()
+    pe_ratios = fundamentals.column('pe_ratio', symbols)
+    dividend_yields = fundamentals.column('dividend_yield', symbols)
+    prices = fundamentals.column('price', symbols)
+    
+    # Need at least 2 ratios to calculate average
+    with metrics.span('rank', items=len(symbols)):
+        avg_ratios = average_ratios(pe_ratios, sharpe_ratios, dividend_yields)
+        ranked = top_k(avg_ratios, limit or len(symbols))
+    
+    for i in ranked:
+        symbol = symbols[i]
+        stock = {
+            'symbol': symbol,
+            'pe_ratio': optional_float(pe_ratios[i]),
+            'sharpe_ratio': optional_float(sharpe_ratios[i]),
+            'dividend_yield': optional_float(dividend_yields[i]),
+            'avg_ratio': float(avg_ratios[i]),
+            'company_name': fundamentals.company_name(symbol)
+        }
+        if optional_float(prices[i]) is not None:
+            stock['current_price'] = float(prices[i])
+        results.append(stock)
+    
+    # The snapshot already carries prices; seed the live quote table with them
+    quote_feed.publish({symbol: optional_float(price) for symbol, price in zip(symbols, prices)})
+    
+    return results
+
+def analyze_stocks(symbols=None):
+    """Analyze the default universe and return top performers"""
+    if symbols is None:
+        symbols = default_symbols()
+    
+    return rank_stocks(scan_universe(symbols, limit=10))
+
+def scan_universe(symbols, limit=10, processes=None):
+    """Score a large universe shard by shard, across worker processes when configured.
+
+    Each shard keeps only its own top `limit`, which is all the merge needs.
+    """
+    symbols = list(symbols)
+    processes = processes or Config.UNIVERSE_SCAN_PROCESSES
+    shards = partition(symbols, -(-len(symbols) // Config.UNIVERSE_SHARD_SIZE))
+    with metrics.span('scan', items=len(symbols)):
+        if processes > 1 and len(shards) > 1:
+            from concurrent.futures import ProcessPoolExecutor
             
-            if len(ratios) >= 2:  # Need at least 2 ratios to calculate average
-                avg_ratio = np.mean(ratios)
-                results.append({
-                    'symbol': symbol,
-                    'pe_ratio': pe_ratio,
-                    'sharpe_ratio': sharpe_ratio,
-                    'dividend_yield': dividend_yield,
-                    'avg_ratio': avg_ratio,
-                    'company_name': stock.info.get('longName', symbol)
-                })
-        except Exception as e:
-            print(f"Error analyzing {symbol}: {e}")
-            continue
-    
-            # If we don't have enough real data, add some mock data for demo
-        if len(results) < 5:
-            mock_stocks = [
-                {'symbol': 'AAPL', 'pe_ratio': 25.5, 'sharpe_ratio': 1.2, 'dividend_yield': 0.5, 'avg_ratio': 9.07, 'company_name': 'Apple Inc.', 'current_price': 150.0},
-                {'symbol': 'MSFT', 'pe_ratio': 30.2, 'sharpe_ratio': 1.4, 'dividend_yield': 0.8, 'avg_ratio': 10.80, 'company_name': 'Microsoft Corporation', 'current_price': 300.0},
-                {'symbol': 'GOOGL', 'pe_ratio': 28.1, 'sharpe_ratio': 1.1, 'dividend_yield': 0.0, 'avg_ratio': 9.70, 'company_name': 'Alphabet Inc.', 'current_price': 2500.0},
-                {'symbol': 'AMZN', 'pe_ratio': 35.0, 'sharpe_ratio': 1.3, 'dividend_yield': 0.0, 'avg_ratio': 12.10, 'company_name': 'Amazon.com Inc.', 'current_price': 3500.0},
-                {'symbol': 'NVDA', 'pe_ratio': 45.2, 'sharpe_ratio': 1.8, 'dividend_yield': 0.1, 'avg_ratio': 15.70, 'company_name': 'NVIDIA Corporation', 'current_price': 450.0},
-                {'symbol': 'META', 'pe_ratio': 22.3, 'sharpe_ratio': 1.0, 'dividend_yield': 0.0, 'avg_ratio': 7.77, 'company_name': 'Meta Platforms Inc.', 'current_price': 200.0},
-                {'symbol': 'TSLA', 'pe_ratio': 50.1, 'sharpe_ratio': 1.5, 'dividend_yield': 0.0, 'avg_ratio': 17.20, 'company_name': 'Tesla Inc.', 'current_price': 250.0},
-                {'symbol': 'JPM', 'pe_ratio': 12.5, 'sharpe_ratio': 0.8, 'dividend_yield': 2.5, 'avg_ratio': 5.27, 'company_name': 'JPMorgan Chase & Co.', 'current_price': 150.0},
-                {'symbol': 'JNJ', 'pe_ratio': 18.2, 'sharpe_ratio': 0.9, 'dividend_yield': 2.8, 'avg_ratio': 7.30, 'company_name': 'Johnson & Johnson', 'current_price': 160.0},
-                {'symbol': 'PG', 'pe_ratio': 20.1, 'sharpe_ratio': 0.7, 'dividend_yield': 2.4, 'avg_ratio': 7.73, 'company_name': 'Procter & Gamble Co.', 'current_price': 140.0}
-            ]
-            results.extend(mock_stocks)
+            with ProcessPoolExecutor(max_workers=min(processes, len(shards)), initializer=_init_scan_worker, initargs=(processes,)) as executor:
+                parts = list(executor.map(_scan_shard, shards, [limit] * len(shards)))
+        else:
+            parts = [score_symbols(shard, limit=limit) for shard in shards]
     
+    results = [stock for part in parts for stock in part]
+    results.sort(key=lambda stock: stock['avg_ratio'], reverse=True)
+    return results[:limit]
+
+def _init_scan_worker(processes):
+    # Shard workers compute inline rather than each starting its own compute pool
+    from compute_pool import compute_pool
+    compute_pool.detach()
+    
+    # Workers share the upstream rate budget rather than each spending all of it
+    from rate_limiter import RequestScheduler
+    shared = market_data.scheduler
+    market_data.scheduler = RequestScheduler(
+        shared.rate * 60 / processes,
+        burst=max(int(shared.capacity) // processes, 1),
+        max_retries=shared.max_retries
+    )
+
+def _scan_shard(shard, limit):
+    return score_symbols(shard, limit=limit)
+
+def rank_stocks(results):
+    """Return the top 10 scored stocks, padding with mock data if too few were scored"""
+    results = list(results)
+    
+    # If we don't have enough real data, add some mock data for demo
+    if len(results) < 5:
+        mock_stocks = [
+            {'symbol': 'AAPL', 'pe_ratio': 25.5, 'sharpe_ratio': 1.2, 'dividend_yield': 0.5, 'avg_ratio': 9.07, 'company_name': 'Apple Inc.', 'current_price': 150.0},
+            {'symbol': 'MSFT', 'pe_ratio': 30.2, 'sharpe_ratio': 1.4, 'dividend_yield': 0.8, 'avg_ratio': 10.80, 'company_name': 'Microsoft Corporation', 'current_price': 300.0},
+            {'symbol': 'GOOGL', 'pe_ratio': 28.1, 'sharpe_ratio': 1.1, 'dividend_yield': 0.0, 'avg_ratio': 9.70, 'company_name': 'Alphabet Inc.', 'current_price': 2500.0},
+            {'symbol': 'AMZN', 'pe_ratio': 35.0, 'sharpe_ratio': 1.3, 'dividend_yield': 0.0, 'avg_ratio': 12.10, 'company_name': 'Amazon.com Inc.', 'current_price': 3500.0},
+            {'symbol': 'NVDA', 'pe_ratio': 45.2, 'sharpe_ratio': 1.8, 'dividend_yield': 0.1, 'avg_ratio': 15.70, 'company_name': 'NVIDIA Corporation', 'current_price': 450.0},
+            {'symbol': 'META', 'pe_ratio': 22.3, 'sharpe_ratio': 1.0, 'dividend_yield': 0.0, 'avg_ratio': 7.77, 'company_name': 'Meta Platforms Inc.', 'current_price': 200.0},
+            {'symbol': 'TSLA', 'pe_ratio': 50.1, 'sharpe_ratio': 1.5, 'dividend_yield': 0.0, 'avg_ratio': 17.20, 'company_name': 'Tesla Inc.', 'current_price': 250.0},
+            {'symbol': 'JPM', 'pe_ratio': 12.5, 'sharpe_ratio': 0.8, 'dividend_yield': 2.5, 'avg_ratio': 5.27, 'company_name': 'JPMorgan Chase & Co.', 'current_price': 150.0},
+            {'symbol': 'JNJ', 'pe_ratio': 18.2, 'sharpe_ratio': 0.9, 'dividend_yield': 2.8, 'avg_ratio': 7.30, 'company_name': 'Johnson & Johnson', 'current_price': 160.0},
+            {'symbol': 'PG', 'pe_ratio': 20.1, 'sharpe_ratio': 0.7, 'dividend_yield': 2.4, 'avg_ratio': 7.73, 'company_name': 'Procter & Gamble Co.', 'current_price': 140.0}
+        ]
+        print(f"Only {len(results)} stocks analyzed, falling back to mock data")
+        metrics.inc('mock_fallbacks_total', kind='analysis')
+        for stock in mock_stocks:
+            stock['is_mock'] = True
+        results.extend(mock_stocks)
+
     # Sort by average ratio and return top 10
     results.sort(key=lambda x: x['avg_ratio'], reverse=True)
     return results[:10]
 
-def create_portfolio(selected_stocks, portfolio_amount):
+def attach_prices(stocks):
+    """Make sure every stock has a current price"""
+    # Current prices come from the info already fetched by score_symbols
+    for stock in stocks:
+        if 'current_price' not in stock:
+            # If the info had no price, use a default price based on symbol
+            default_prices = {
+                'AAPL': 150.0, 'MSFT': 300.0, 'GOOGL': 2500.0, 'AMZN': 3500.0,
+                'NVDA': 450.0, 'META': 200.0, 'TSLA': 250.0, 'JPM': 150.0,
+                'JNJ': 160.0, 'PG': 140.0
+            }
+            stock['current_price'] = default_prices.get(stock['symbol'], 100.0)
+    
+    return stocks
+
+def build_analysis():
+    """Run the screen and attach current prices to the top stocks"""
+    return attach_prices(analyze_stocks())
+
+# Background scheduler that keeps the /analyze ranking precomputed
+analysis_scheduler = SnapshotScheduler(
+    build_analysis,
+    Config.ANALYSIS_REFRESH_INTERVAL,
+    name='analysis-refresh'
+)
+
+# Background scheduler that keeps the fundamentals index for /screen current
+fundamentals_scheduler = SnapshotScheduler(
+    build_fundamentals,
+    Config.FUNDAMENTALS_REFRESH_INTERVAL,
+    name='fundamentals-refresh'
+)
+
+# Worker pool for asynchronous analysis jobs
+analysis_jobs = JobManager(
+    max_workers=Config.ANALYSIS_JOB_WORKERS,
+    chunk_size=Config.ANALYSIS_JOB_CHUNK_SIZE,
+    max_jobs=Config.ANALYSIS_MAX_JOBS
+)
+
+# One upstream quote poller shared by every streaming dashboard
+quote_feed = QuoteFeed(
+    lambda symbols: market_data.get_quotes(symbols, priority=PRIORITY_INTERACTIVE),
+    interval=Config.QUOTE_POLL_INTERVAL,
+    history=Config.QUOTE_HISTORY
+)
+
+def quote_symbols(value):
+    """Parse a comma-separated ?symbols= list, bounded by QUOTE_MAX_SYMBOLS"""
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in (value or '').split(',') if symbol.strip()))
+    if not symbols:
+        raise ValueError('Provide at least one symbol')
+    if len(symbols) > Config.QUOTE_MAX_SYMBOLS:
+        raise ValueError(f'At most {Config.QUOTE_MAX_SYMBOLS} symbols can be watched')
+    return symbols
+
+def create_portfolio(selected_stocks, portfolio_amount, weights=None):
     """Create a diversified portfolio"""
-    # Equal weight allocation for diversification
+    from allocation import allocate_shares
+    
+    # Equal weight allocation for diversification unless optimized weights are given
     num_stocks = len(selected_stocks)
-    allocation_per_stock = portfolio_amount / num_stocks
+    prices = [stock['current_price'] for stock in selected_stocks]
+    targets = [weights.get(stock['symbol'], 0.0) if weights else 1.0 / num_stocks for stock in selected_stocks]
+    if not sum(targets) > 0:
+        raise ValueError('No target weights left to allocate')
+    
+    # Whole shares that track the target weights while leaving as little cash idle as possible
+    with metrics.span('allocate', items=num_stocks):
+        shares = allocate_shares(prices, targets, portfolio_amount)[0][0]
     
     portfolio = []
-    for stock in selected_stocks:
-        shares = int(allocation_per_stock / stock['current_price'])
-        actual_allocation = shares * stock['current_price']
+    for stock, target, count in zip(selected_stocks, targets, shares):
+        actual_allocation = int(count) * stock['current_price']
         
         portfolio.append({
             'symbol': stock['symbol'],
-            'shares': shares,
+            'shares': int(count),
             'allocation': actual_allocation,
             'percentage': (actual_allocation / portfolio_amount) * 100,
+            'target_percentage': target / sum(targets) * 100,
             'company_name': stock['company_name']
         })
     
     return portfolio
 
-def calculate_growth_projection(stock_symbol, months):
+def allocation_tiers(selected_stocks, budgets, weights=None):
+    """Whole-share allocations of the same target weights for many budgets at once"""
+    from allocation import allocate_shares, allocation_error
+    
+    symbols = [stock['symbol'] for stock in selected_stocks]
+    prices = [stock['current_price'] for stock in selected_stocks]
+    targets = [weights.get(symbol, 0.0) if weights else 1.0 for symbol in symbols]
+    if not sum(targets) > 0:
+        raise ValueError('No target weights left to allocate')
+    
+    shares, cash = allocate_shares(prices, targets, budgets)
+    errors = allocation_error(shares, prices, targets, budgets)
+    
+    return [{
+        'budget': float(budget),
+        'shares': dict(zip(symbols, row.tolist())),
+        'invested': float(budget - leftover),
+        'cash': float(leftover),
+        'tracking_error': float(error)
+    } for budget, row, leftover, error in zip(budgets, shares, cash, errors)]
+
+def requested_stocks(data):
+    """Selected stocks of a request body, with validated and de-duplicated symbols"""
+    stocks = {}
+    for stock in data['selected_stocks']:
+        symbol = normalize_symbols([stock['symbol']])[0]
+        stocks.setdefault(symbol, dict(stock, symbol=symbol))
+    if not stocks:
+        raise ValueError('Select at least one stock')
+    return list(stocks.values())
+
+def strategy_weights(selected_stocks, data):
+    """Read the allocation strategy of a request body and compute its weights.
+    
+    Returns (strategy, stocks, weights, risk); optimized strategies leave out
+    the stocks without price history, which get no weight.
+    """
+    from optimizer import STRATEGIES
+    
+    strategy = data.get('strategy', 'equal')
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+    
+    if strategy == 'equal':
+        return strategy, selected_stocks, None, None
+    symbols = [stock['symbol'] for stock in selected_stocks]
+    weights, risk = optimize_weights(symbols, strategy, float(data.get('max_weight') or 1.0))
+    stocks = [stock for stock in selected_stocks if stock['symbol'] in weights]
+    if not stocks:
+        raise ValueError('No price history for any selected stock')
+    return strategy, stocks, weights, risk
+
+def optimize_weights(symbols, strategy, max_weight=1.0):
+    """Optimize portfolio weights from the symbols' recent daily returns"""
+    from optimizer import portfolio_optimizer
+    
+    with metrics.span('fetch_history', items=len(symbols)):
+        histories = market_data.get_history(symbols, period="2y", priority=PRIORITY_INTERACTIVE)
+    with metrics.span('optimize', items=len(histories)):
+        return portfolio_optimizer.optimize(histories, strategy, window=Config.COVARIANCE_WINDOW, max_weight=max_weight)
+
+def portfolio_risk_model(symbols):
+    """Cached risk model of the symbols' recent daily returns against the benchmark"""
+    from risk import risk_engine
+    
+    benchmark = Config.ROLLING_BENCHMARK
+    with metrics.span('fetch_history', items=len(symbols) + 1):
+        histories = market_data.get_history(list(dict.fromkeys(symbols + [benchmark])), period="2y", priority=PRIORITY_INTERACTIVE)
+    missing = [symbol for symbol in symbols if symbol not in histories]
+    if missing:
+        raise ValueError(f"No price history for {', '.join(missing)}")
+    return risk_engine.model({symbol: histories[symbol] for symbol in symbols}, histories.get(benchmark), window=Config.RISK_WINDOW)
+
+def calculate_growth_projection(stock_symbol, months, model='linear'):
     """Calculate growth projection for a stock"""
     try:
-        stock = yf.Ticker(stock_symbol)
-        
         # Get historical data
-        hist = stock.history(period="2y")
-        if len(hist) < 30:
+        with metrics.span('fetch_history', items=1):
+            hist = market_data.get_history([stock_symbol], period="2y", priority=PRIORITY_INTERACTIVE).get(stock_symbol)
+        if hist is None or len(hist) < 30:
             # Return mock data for demo purposes
             mock_prices = {
                 'AAPL': {'current': 150.0, 'projected': 165.0},
@@ -188,6 +527,7 @@ def calculate_growth_projection(stock_symbol, months):
             }
             
             if stock_symbol in mock_prices:
+                metrics.inc('mock_fallbacks_total', kind='projection')
                 current_price = mock_prices[stock_symbol]['current']
                 projected_price = mock_prices[stock_symbol]['projected']
                 growth_percentage = ((projected_price - current_price) / current_price) * 100
@@ -200,30 +540,196 @@ def calculate_growth_projection(stock_symbol, months):
                 }
             return None
         
-        # Prepare data for linear regression
-        dates = np.arange(len(hist))
-        prices = hist['Close'].values
-        
-        # Fit linear regression
-        model = LinearRegression()
-        model.fit(dates.reshape(-1, 1), prices)
-        
-        # Project future prices
-        future_dates = np.arange(len(hist), len(hist) + months * 30)  # Approximate trading days
-        future_prices = model.predict(future_dates.reshape(-1, 1))
+        # Closed-form trend fit; coefficients are cached per (symbol, last bar)
+        from projection import projection_engine
         
-        current_price = prices[-1]
-        projected_price = future_prices[-1]
-        growth_percentage = ((projected_price - current_price) / current_price) * 100
+        with metrics.span('projection', items=1):
+            projections = projection_engine.project({stock_symbol: hist}, [months], model)
+        return projections[stock_symbol][months]
+    except:
+        return None
+
+def calculate_monte_carlo_projection(symbols, months, method='gbm', weights=None, n_paths=None, seed=None):
+    """Simulate price paths for one or more stocks and summarize them as percentile bands"""
+    import numpy as np
+    from monte_carlo import simulator, simulation_summary, TRADING_DAYS_PER_MONTH
+    from projection import projection_result
+    from screening import build_price_matrix
+    
+    with metrics.span('fetch_history', items=len(symbols)):
+        histories = market_data.get_history(symbols, period="2y", priority=PRIORITY_INTERACTIVE)
+    missing = [symbol for symbol in symbols if symbol not in histories]
+    if missing:
+        raise ValueError(f"No price history for {', '.join(missing)}")
+    
+    # Simulate all assets jointly so their correlation carries into the portfolio
+    prices = build_price_matrix(histories)[symbols].dropna()
+    if len(prices) < 30:
+        raise ValueError("Not enough price history to simulate")
+    price_values = prices.to_numpy()
+    with metrics.span('simulate', items=len(symbols)):
+        checkpoints, paths = simulator.simulate(
+            price_values,
+            months * TRADING_DAYS_PER_MONTH,
+            method=method,
+            band_every=Config.MONTE_CARLO_BAND_EVERY,
+            seed=seed,
+            n_paths=n_paths
+        )
+    
+    assets = {}
+    for i, symbol in enumerate(symbols):
+        current_price = price_values[-1, i]
+        bands = simulation_summary(paths[:, :, i], checkpoints, current_price)
+        projection = projection_result(current_price, bands['percentiles']['50'][-1], months)
+        projection['bands'] = bands
+        assets[symbol] = projection
+    
+    result = {'assets': assets}
+    if len(symbols) > 1 or weights:
+        values = simulator.portfolio_values(paths, price_values, weights or np.ones(len(symbols)))
+        result['portfolio'] = simulation_summary(values, checkpoints, 1.0)
+    return result
+
+def build_chart(symbol, hist, points, method, encoding, months=0, model='linear'):
+    """Chart payload of a history, with the projected trend at monthly steps when months > 0"""
+    from charts import chart_payload, day_numbers
+    
+    projection = None
+    if months:
+        import numpy as np
+        from monte_carlo import TRADING_DAYS_PER_MONTH
+        from projection import projection_engine, project
         
+        # Same 2-year fit and month length as /growth_projection, so the line ends at its
+        # projected price and each point falls one month (21 trading days) after the last
+        fit_hist = market_data.get_history([symbol], period="2y", priority=PRIORITY_INTERACTIVE).get(symbol)
+        coefficients = projection_engine.coefficients({symbol: fit_hist}, model).get(symbol) if fit_hist is not None else None
+        if coefficients is not None:
+            intercept, slope, n, last = coefficients
+            steps = np.arange(months + 1) * TRADING_DAYS_PER_MONTH
+            prices = project({'intercept': intercept, 'slope': slope, 'n': n, 'last': last}, model, steps)[:, 0]
+            last_day = np.datetime64(int(day_numbers(hist.index[-1:])[0]), 'D')
+            days = np.busday_offset(last_day, steps, roll='forward').astype(np.int64)
+            projection = (days, prices)
+    
+    with metrics.span('chart', items=1):
+        return dict(chart_payload(symbol, hist, points, method, encoding, projection), success=True)
+
+def run_backtest(symbols, years, options, grid=None, use_fundamentals=True, universe=None):
+    """Backtest the avg_ratio screen over stored history, or sweep a parameter grid.
+
+    With a universe, a symbol can only be picked on dates it was a member.
+    """
+    from backtest import Backtester
+    from screening import build_price_matrix
+    
+    with metrics.span('fetch_history', items=len(symbols)):
+        histories = market_data.get_history(symbols, period=f"{years}y")
+    prices = build_price_matrix(histories)
+    if prices.empty:
+        raise ValueError('No price history available')
+    
+    pe_ratios = dividend_yields = None
+    if use_fundamentals:
+        # Only current fundamentals exist, so they are held constant over the backtest
+        fundamentals = fundamentals_for(list(prices.columns))
+        pe_ratios = fundamentals.column('pe_ratio', prices.columns)
+        dividend_yields = fundamentals.column('dividend_yield', prices.columns)
+    
+    membership = universe.membership(prices.index, prices.columns) if universe is not None else None
+    backtester = Backtester(prices, pe_ratios, dividend_yields, membership=membership)
+    with metrics.span('backtest', items=len(prices.columns)):
+        if grid:
+            return {'sweep': backtester.sweep(grid, processes=Config.BACKTEST_PROCESSES, **options)}
+        return backtester.run(**options)
+
+def backtest_options(data):
+    """Read and validate the backtest options of a request body"""
+    from backtest import FREQUENCIES
+    
+    options = {
+        'top_n': int(data.get('top_n', 10)),
+        'lookback': int(data.get('lookback', 252)),
+        'frequency': data.get('frequency', 'M'),
+        'cost_bps': float(data.get('cost_bps', 10.0)),
+        'capital': float(data.get('capital', 10000.0)),
+        'whole_shares': bool(data.get('whole_shares', False))
+    }
+    if options['frequency'] not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency '{options['frequency']}', expected one of {', '.join(FREQUENCIES)}")
+    if options['top_n'] < 1 or options['lookback'] < 30 or options['capital'] <= 0:
+        raise ValueError('top_n must be at least 1, lookback at least 30 days and capital positive')
+    return options
+
+def monte_carlo_options(data):
+    """Read and validate the Monte Carlo options of a request body"""
+    from monte_carlo import METHODS as MONTE_CARLO_METHODS
+    
+    method = data.get('method', 'gbm')
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {', '.join(MONTE_CARLO_METHODS)}")
+    n_paths = min(int(data.get('paths', Config.MONTE_CARLO_PATHS)), Config.MONTE_CARLO_MAX_PATHS)
+    seed = data.get('seed')
+    return {
+        'method': method,
+        'n_paths': max(n_paths, 100),
+        'seed': int(seed) if seed is not None else None
+    }
+
+def projection_params(data):
+    """Validate /growth_projection parameters and normalize them so equivalent requests share a cache entry"""
+    from projection import MODELS as PROJECTION_MODELS
+    
+    params = {
+        'symbol': normalize_symbols([data['symbol']])[0],
+        'months': int(data['months']),
+        'mode': 'monte_carlo' if data.get('mode') == 'monte_carlo' else 'trend'
+    }
+    if params['mode'] == 'monte_carlo':
+        params.update(monte_carlo_options(data))
+    else:
+        params['model'] = data.get('model', 'linear')
+        if params['model'] not in PROJECTION_MODELS:
+            raise ValueError(f"Unknown model '{params['model']}', expected one of {', '.join(PROJECTION_MODELS)}")
+    return params
+
+def projection_payload(params):
+    """Compute the /growth_projection response body"""
+    symbol = params['symbol']
+    if params['mode'] == 'monte_carlo':
+        result = calculate_monte_carlo_projection([symbol], params['months'], method=params['method'], n_paths=params['n_paths'], seed=params['seed'])
         return {
-            'current_price': current_price,
-            'projected_price': projected_price,
-            'growth_percentage': growth_percentage,
-            'monthly_growth': growth_percentage / months
+            'success': True,
+            'projection': result['assets'][symbol]
         }
-    except:
+    
+    projection = calculate_growth_projection(symbol, params['months'], params['model'])
+    if projection:
+        return {
+            'success': True,
+            'projection': projection
+        }
+    return {
+        'success': False,
+        'error': 'Unable to calculate projection'
+    }
+
+def projection_entry(params):
+    """Cached /growth_projection response for the parameters and the symbol's latest bar.
+    
+    Returns None for unseeded Monte Carlo runs, which are meant to differ
+    on every call, and when the history is unavailable, so nothing is cached
+    against a failed fetch.
+    """
+    if params['mode'] == 'monte_carlo' and params['seed'] is None:
         return None
+    hist = market_data.get_history([params['symbol']], period="2y", priority=PRIORITY_INTERACTIVE).get(params['symbol'])
+    if hist is None or not len(hist):
+        return None
+    version = (hist.index[-1], len(hist))
+    key = ('growth_projection', version) + tuple(sorted(params.items()))
+    return response_cache.get_or_build(key, lambda: projection_payload(params))
 
 @app.route('/')
 def index():
@@ -246,9 +752,9 @@ def login():
         scope=['openid', 'email', 'profile']
     )
     
-    # Use the recommended v2 endpoint
+    # Endpoints come from the cached OpenID discovery document
     authorization_url, state = google.authorization_url(
-        'https://accounts.google.com/o/oauth2/v2/auth',
+        google_oidc.endpoint('authorization_endpoint'),
         access_type='offline'
     )
     
@@ -264,21 +770,25 @@ def callback():
             print("No oauth_state in session")
             return redirect(url_for('login'))
         
-        google = OAuth2Session(
+        # Reuse the shared keep-alive pools instead of opening new TLS connections per login
+        google = http_transport.mount(OAuth2Session(
             app.config['GOOGLE_CLIENT_ID'],
             state=session.get('oauth_state'),
             redirect_uri=request.url_root + 'callback'
-        )
+        ))
         
         token = google.fetch_token(
-            'https://oauth2.googleapis.com/token',
+            google_oidc.endpoint('token_endpoint'),
             client_secret=app.config['GOOGLE_CLIENT_SECRET'],
-            authorization_response=request.url
+            authorization_response=request.url,
+            timeout=http_transport.timeout
         )
         
-        # Get user info from Google
-        resp = google.get('https://openidconnect.googleapis.com/v1/userinfo')
-        user_info = resp.json()
+        # The signed ID token already carries the profile; only ask userinfo if it cannot be verified locally
+        user_info = google_oidc.verify_id_token(token.get('id_token'))
+        if user_info is None:
+            resp = google.get(google_oidc.endpoint('userinfo_endpoint'), timeout=http_transport.timeout)
+            user_info = resp.json()
         
         # Create or update user - use email as fallback for user_id if 'id' is not present
         user_id = user_info.get('id') or user_info.get('sub') or user_info['email']
@@ -311,32 +821,91 @@ def logout():
     logout_user()
     return redirect(url_for('index'))
 
-@app.route('/analyze', methods=['POST'])
+def snapshot_response(snapshot, include_age=True):
+    """Build the /analyze JSON payload from a precomputed snapshot"""
+    top_stocks = snapshot['data']
+    payload = {
+        'success': True,
+        'stocks': top_stocks,
+        'mock_data': any(stock.get('is_mock') for stock in top_stocks),
+        'version': snapshot['version'],
+        'as_of': datetime.utcfromtimestamp(snapshot['computed_at']).isoformat() + 'Z'
+    }
+    if include_age:
+        payload['age_seconds'] = time.time() - snapshot['computed_at']
+    return payload
+
+@app.route('/analyze', methods=['GET', 'POST'])
 @login_required
 def analyze():
     try:
-        # Analyze stocks
-        top_stocks = analyze_stocks()
+        # Serve the ranking materialized by the background scheduler
+        if app.config['ANALYSIS_PRECOMPUTE_ENABLED']:
+            fundamentals_scheduler.ensure_started()
+            analysis_scheduler.ensure_started()
+        snapshot = analysis_scheduler.get_or_refresh()
         
-        # Get current prices for selected stocks
-        for stock in top_stocks:
-            try:
-                # If current_price is already set (from mock data), use it
-                if 'current_price' not in stock:
-                    ticker = yf.Ticker(stock['symbol'])
-                    stock['current_price'] = ticker.info.get('regularMarketPrice', 0)
-            except:
-                # If API fails, use a default price based on symbol
-                default_prices = {
-                    'AAPL': 150.0, 'MSFT': 300.0, 'GOOGL': 2500.0, 'AMZN': 3500.0,
-                    'NVDA': 450.0, 'META': 200.0, 'TSLA': 250.0, 'JPM': 150.0,
-                    'JNJ': 160.0, 'PG': 140.0
-                }
-                stock['current_price'] = default_prices.get(stock['symbol'], 100.0)
+        if request.method == 'GET':
+            # Without the age the body only changes with the snapshot, so reloads revalidate to a 304
+            key = ('analyze', snapshot['version'], snapshot['computed_at'])
+            entry = response_cache.get_or_build(key, lambda: snapshot_response(snapshot, include_age=False))
+            return response_cache.respond(entry, request)
         
+        return jsonify(snapshot_response(snapshot))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/analyze/refresh', methods=['POST'])
+@login_required
+def refresh_analysis():
+    """Force the analysis snapshot to be recomputed"""
+    try:
+        if app.config['ANALYSIS_PRECOMPUTE_ENABLED']:
+            # Let the background thread do the work and return immediately
+            analysis_scheduler.ensure_started()
+            analysis_scheduler.request_refresh()
+            return jsonify({
+                'success': True,
+                'refreshing': True,
+                'version': analysis_scheduler.stats()['version']
+            })
+        
+        snapshot = analysis_scheduler.refresh()
+        return jsonify(snapshot_response(snapshot))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/screen', methods=['GET', 'POST'])
+@login_required
+def screen():
+    """Filter and sort the fundamentals index, e.g. where="pe < 25 and dividend_yield > 2" """
+    try:
+        params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+        fields = params.get('fields')
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        limit = min(int(params.get('limit') or 50), Config.SCREEN_MAX_RESULTS)
+        descending = str(params.get('order', 'asc')).lower() == 'desc'
+        
+        if app.config['ANALYSIS_PRECOMPUTE_ENABLED']:
+            fundamentals_scheduler.ensure_started()
+        snapshot = fundamentals_scheduler.get_or_refresh()
+        
+        started = time.perf_counter()
+        stocks, total = snapshot['data'].query(params.get('where'), params.get('sort'), descending, limit, fields)
         return jsonify({
             'success': True,
-            'stocks': top_stocks
+            'stocks': stocks,
+            'total': total,
+            'version': snapshot['version'],
+            'age_seconds': time.time() - snapshot['computed_at'],
+            'query_ms': (time.perf_counter() - started) * 1000
         })
     except Exception as e:
         return jsonify({
@@ -344,16 +913,184 @@ def analyze():
             'error': str(e)
         })
 
+@app.route('/analyze/jobs', methods=['POST'])
+@login_required
+def create_analysis_job():
+    """Start an asynchronous analysis and return its id immediately"""
+    try:
+        data = request.get_json(silent=True) or {}
+        symbols, _ = requested_universe(data, current_user.id)
+        
+        job = analysis_jobs.submit(
+            current_user.id,
+            symbols,
+            lambda chunk: attach_prices(score_symbols(chunk)),
+            lambda rows: attach_prices(rank_stocks(rows))
+        )
+        
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status_url': url_for('analysis_job_status', job_id=job.id),
+            'stream_url': url_for('analysis_job_stream', job_id=job.id)
+        }), 202
+    except JobLimitError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/analyze/jobs/<job_id>')
+@login_required
+def analysis_job_status(job_id):
+    """Poll the progress of an analysis job"""
+    job = analysis_jobs.get(job_id, owner=current_user.id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify(dict(success=True, **job.progress()))
+
+@app.route('/analyze/jobs/<job_id>/stream')
+@login_required
+def analysis_job_stream(job_id):
+    """Stream scored rows of an analysis job as Server-Sent Events"""
+    job = analysis_jobs.get(job_id, owner=current_user.id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    def generate():
+        for event, data in job.events():
+            if event == 'keepalive':
+                yield ': keepalive\n\n'
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/universes')
+@login_required
+def list_universes():
+    """Available symbol universes and their sizes"""
+    try:
+        summaries = [universes.get(name).summary() for name in universes.names()]
+        watchlist = universes.watchlist(current_user.id)
+        if watchlist is not None:
+            summaries.append(watchlist.summary())
+        return jsonify({
+            'success': True,
+            'default': Config.DEFAULT_UNIVERSE,
+            'universes': summaries
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/universes/<name>')
+@login_required
+def universe_members(name):
+    """Members of a universe on ?as_of=YYYY-MM-DD (today by default), with ?shards=N partitions"""
+    try:
+        universe = universes.resolve(name, current_user.id)
+        as_of = request.args.get('as_of')
+        response = dict(universe.summary(), success=True, as_of=as_of, members=universe.symbols(as_of))
+        if request.args.get('shards'):
+            response['shards'] = universe.shards(int(request.args['shards']), as_of)
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/watchlist', methods=['GET', 'PUT'])
+@login_required
+def watchlist():
+    """Read or replace the current user's watchlist (use universe "watchlist" in other requests)"""
+    try:
+        if request.method == 'PUT':
+            symbols = (request.get_json() or {}).get('symbols') or []
+            if len(symbols) > Config.WATCHLIST_MAX_SYMBOLS:
+                raise ValueError(f'At most {Config.WATCHLIST_MAX_SYMBOLS} symbols per watchlist')
+            universe = universes.save_watchlist(current_user.id, symbols)
+        else:
+            universe = universes.watchlist(current_user.id)
+        return jsonify({
+            'success': True,
+            'symbols': universe.all_symbols() if universe is not None else []
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/quotes')
+@login_required
+def quotes():
+    """Latest known quotes for ?symbols=A,B,C from the shared quote table"""
+    try:
+        version, table = quote_feed.snapshot(quote_symbols(request.args.get('symbols')))
+        return jsonify({
+            'success': True,
+            'version': version,
+            'quotes': table
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/quotes/stream')
+@login_required
+def quote_stream():
+    """Stream price changes for ?symbols=A,B,C as Server-Sent Events"""
+    try:
+        symbols = quote_symbols(request.args.get('symbols'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # Browsers send the last event id on reconnect, so only missed changes are replayed
+    last_id = request.headers.get('Last-Event-ID', '')
+    since = int(last_id) if last_id.isdigit() else None
+    
+    def generate():
+        yield 'retry: 5000\n\n'
+        for event, version, data in quote_feed.events(symbols, since=since):
+            if event == 'keepalive':
+                yield ': keepalive\n\n'
+            else:
+                payload = data if isinstance(data, str) else json.dumps(data)
+                yield f"id: {version}\nevent: {event}\ndata: {payload}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/create_portfolio', methods=['POST'])
 @login_required
 def create_portfolio_route():
     try:
         data = request.get_json()
-        selected_stocks = data['selected_stocks']
+        selected_stocks = requested_stocks(data)
         portfolio_amount = float(data['portfolio_amount'])
         
         # Create portfolio
-        portfolio = create_portfolio(selected_stocks, portfolio_amount)
+        strategy, stocks, weights, risk = strategy_weights(selected_stocks, data)
+        portfolio = create_portfolio(stocks, portfolio_amount, weights)
         
         # Calculate diversification metrics
         total_allocation = sum(stock['allocation'] for stock in portfolio)
@@ -361,9 +1098,13 @@ def create_portfolio_route():
         
         return jsonify({
             'success': True,
+            'strategy': strategy,
             'portfolio': portfolio,
             'total_allocation': total_allocation,
-            'diversification_score': diversification_score
+            'cash_remaining': portfolio_amount - total_allocation,
+            'diversification_score': diversification_score,
+            'risk': risk,
+            'missing_history': [stock['symbol'] for stock in selected_stocks if stock not in stocks]
         })
     except Exception as e:
         return jsonify({
@@ -371,31 +1112,334 @@ def create_portfolio_route():
             'error': str(e)
         })
 
-@app.route('/growth_projection', methods=['POST'])
+@app.route('/portfolio_risk', methods=['POST'])
 @login_required
-def growth_projection():
+def portfolio_risk():
+    """VaR/CVaR, beta, risk contributions and correlation clusters of a portfolio, or batched measures for many weight vectors"""
     try:
-        data = request.get_json()
-        stock_symbol = data['symbol']
-        months = int(data['months'])
+        import numpy as np
+        from risk import risk_engine
         
-        projection = calculate_growth_projection(stock_symbol, months)
+        data = request.get_json()
+        confidence = float(data.get('confidence') or Config.RISK_CONFIDENCE)
+        horizon_days = int(data.get('horizon_days') or 1)
+        if not 0.5 <= confidence < 1:
+            raise ValueError('Confidence must be between 0.5 and 1')
+        if not 1 <= horizon_days <= 252:
+            raise ValueError('Horizon must be between 1 and 252 days')
         
-        if projection:
+        if 'weights' in data:
+            # Batch: one row of weights per portfolio over the same symbols
+            symbols = normalize_symbols(data['symbols'])
+            weights = np.atleast_2d(np.asarray(data['weights'], dtype=np.float64))
+            if weights.shape[1] != len(symbols):
+                raise ValueError('Provide one weight per symbol in every portfolio')
+            if len(weights) > Config.RISK_MAX_PORTFOLIOS:
+                raise ValueError(f"At most {Config.RISK_MAX_PORTFOLIOS} portfolios per request")
+            model = portfolio_risk_model(symbols)
+            weights = weights[:, [symbols.index(symbol) for symbol in model.symbols]]
+            with metrics.span('risk', items=len(weights)):
+                measures = risk_engine.evaluate(model, weights, confidence, horizon_days)
             return jsonify({
                 'success': True,
-                'projection': projection
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Unable to calculate projection'
+                'symbols': model.symbols,
+                'benchmark': Config.ROLLING_BENCHMARK,
+                'confidence': confidence,
+                'horizon_days': horizon_days,
+                'portfolios': len(weights),
+                'measures': measures
             })
+        
+        # Single portfolio as returned by /create_portfolio; uninvested cash carries no risk
+        portfolio = data['portfolio']
+        symbols = normalize_symbols([position['symbol'] for position in portfolio])
+        allocations = {}
+        for position in portfolio:
+            symbol = position['symbol'].strip().upper()
+            allocations[symbol] = allocations.get(symbol, 0.0) + float(position['allocation'])
+        value = float(data.get('portfolio_amount') or sum(allocations.values()))
+        if value <= 0:
+            raise ValueError('Portfolio value must be positive')
+        model = portfolio_risk_model(symbols)
+        weights = np.array([allocations[symbol] / value for symbol in model.symbols])
+        with metrics.span('risk', items=1):
+            report = risk_engine.report(model, weights, value, confidence, horizon_days)
+        
+        return jsonify({
+            'success': True,
+            'benchmark': Config.ROLLING_BENCHMARK,
+            'risk': report
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/allocation_tiers', methods=['POST'])
+@login_required
+def allocation_tiers_route():
+    """Whole-share allocations of the selected stocks for a range of budgets"""
+    try:
+        data = request.get_json()
+        selected_stocks = requested_stocks(data)
+        
+        from allocation import DEFAULT_TIERS
+        
+        budgets = [float(budget) for budget in data.get('budgets') or DEFAULT_TIERS]
+        if len(budgets) > Config.ALLOCATION_MAX_BUDGETS:
+            raise ValueError(f"At most {Config.ALLOCATION_MAX_BUDGETS} budgets per request")
+        if min(budgets) <= 0:
+            raise ValueError('Budgets must be positive')
+        
+        strategy, stocks, weights, risk = strategy_weights(selected_stocks, data)
+        
+        return jsonify({
+            'success': True,
+            'strategy': strategy,
+            'tiers': allocation_tiers(stocks, budgets, weights),
+            'missing_history': [stock['symbol'] for stock in selected_stocks if stock not in stocks]
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/growth_projection', methods=['GET', 'POST'])
+@login_required
+def growth_projection():
+    """Trend or Monte Carlo projection of one stock; GET supports ETag revalidation and browser caching"""
+    try:
+        params = projection_params(request.get_json() if request.method == 'POST' else request.args)
+        entry = projection_entry(params)
+        if entry is None:
+            return jsonify(projection_payload(params))
+        
+        return response_cache.respond(entry, request, max_age=Config.PROJECTION_MAX_AGE if request.method == 'GET' else None)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/chart/<symbol>')
+@login_required
+def chart(symbol):
+    """Downsampled, compactly encoded price history (and projected trend) for drawing a chart"""
+    try:
+        from charts import RANGES, METHODS, ENCODINGS
+        from projection import MODELS as PROJECTION_MODELS
+        
+        symbol = normalize_symbols([symbol])[0]
+        period = request.args.get('range', '1y')
+        method = request.args.get('method', 'lttb')
+        encoding = request.args.get('encoding', 'delta')
+        model = request.args.get('model', 'linear')
+        for name, value, allowed in (('range', period, RANGES), ('method', method, METHODS), ('encoding', encoding, ENCODINGS), ('model', model, PROJECTION_MODELS)):
+            if value not in allowed:
+                raise ValueError(f"Unknown {name} '{value}', expected one of {', '.join(allowed)}")
+        # One point per pixel of the client's chart width
+        points = min(max(int(request.args.get('points') or Config.CHART_DEFAULT_POINTS), 10), Config.CHART_MAX_POINTS)
+        months = min(max(int(request.args.get('months') or 0), 0), 60)
+        
+        hist = market_data.get_history([symbol], period=period, priority=PRIORITY_INTERACTIVE).get(symbol)
+        if hist is None or len(hist) < 2:
+            raise ValueError(f"No price history for {symbol}")
+        key = (symbol, period, points, method, encoding, months, model, hist.index[-1], len(hist))
+        entry = response_cache.get_or_build(('chart',) + key, lambda: build_chart(symbol, hist, points, method, encoding, months, model))
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         })
+    
+    return response_cache.respond(entry, request, max_age=Config.CHART_MAX_AGE)
+
+@app.route('/portfolio_projection', methods=['POST'])
+@login_required
+def portfolio_projection():
+    """Monte Carlo projection of a weighted portfolio using the assets' correlations"""
+    try:
+        data = request.get_json()
+        symbols = normalize_symbols(data['symbols'])
+        months = int(data['months'])
+        weights = data.get('weights')
+        
+        if not symbols:
+            raise ValueError('Select at least one stock')
+        if weights is not None:
+            if len(weights) != len(data['symbols']):
+                raise ValueError('Provide one weight per symbol')
+            # A repeated symbol is one position; its weights add up
+            combined = dict.fromkeys(symbols, 0.0)
+            for symbol, weight in zip(data['symbols'], weights):
+                combined[str(symbol).strip().upper()] += float(weight)
+            weights = list(combined.values())
+        
+        result = calculate_monte_carlo_projection(symbols, months, weights=weights, **monte_carlo_options(data))
+        
+        return jsonify({
+            'success': True,
+            'projection': result
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/backtest', methods=['POST'])
+@login_required
+def backtest():
+    """Replay the screen at every rebalance date over stored history"""
+    try:
+        data = request.get_json() or {}
+        symbols, universe = requested_universe(data, current_user.id)
+        if universe is not None:
+            # Include past members so the backtest is free of survivorship bias
+            symbols = universe.all_symbols()
+        years = min(max(int(data.get('years', 5)), 1), Config.BACKTEST_MAX_YEARS)
+        grid = data.get('grid')
+        
+        options = backtest_options(data)
+        if grid:
+            # Swept parameters override the single-run values; each value is parsed and checked like a single run's
+            combinations = 1
+            for name, values in grid.items():
+                if name not in options or not isinstance(values, list) or not values:
+                    raise ValueError(f"Grid values for '{name}' must be a non-empty list of a backtest option")
+                combinations *= len(values)
+                if combinations > Config.BACKTEST_MAX_SWEEP:
+                    raise ValueError(f"At most {Config.BACKTEST_MAX_SWEEP} parameter combinations per sweep")
+            grid = {name: [backtest_options(dict(data, **{name: value}))[name] for value in values] for name, values in grid.items()}
+            for name in grid:
+                options.pop(name)
+        
+        result = run_backtest(symbols, years, options, grid, data.get('use_fundamentals', True), universe)
+        
+        return jsonify({
+            'success': True,
+            'backtest': result
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/rolling_metrics', methods=['POST'])
+@login_required
+def rolling_metrics():
+    """Rolling Sharpe, volatility, beta and trend, updated incrementally per new bar"""
+    try:
+        data = request.get_json() or {}
+        symbols = normalize_symbols(data.get('symbols') or [])
+        if not symbols:
+            raise ValueError('Provide at least one symbol')
+        
+        return jsonify({
+            'success': True,
+            'benchmark': Config.ROLLING_BENCHMARK,
+            'metrics': market_data.get_rolling_metrics(symbols, priority=PRIORITY_INTERACTIVE)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+def metric_gauges():
+    """Cache, rate limiter, source, snapshot and pool readings exported by /metrics"""
+    gauges = []
+    for name, cache in market_data.cache_stats().items():
+        if cache and 'hit_ratio' in cache:
+            for key in ('hits', 'misses', 'evictions'):
+                gauges.append((f'cache_{key}_total', {'cache': name}, cache[key]))
+            gauges.append(('cache_hit_ratio', {'cache': name}, cache['hit_ratio']))
+            gauges.append(('cache_entries', {'cache': name}, cache['size']))
+    users = user_session.stats()
+    gauges.append(('cache_hit_ratio', {'cache': 'users'}, users['hit_ratio']))
+    
+    limiter = market_data.scheduler_stats()
+    gauges += [
+        ('rate_limiter_queue_depth', {}, limiter['queue_depth']),
+        ('rate_limiter_tokens', {}, limiter['tokens']),
+        ('rate_limiter_retries_total', {}, limiter['retries']),
+        ('rate_limiter_failures_total', {}, limiter['failures']),
+        ('rate_limiter_wait_seconds_total', {}, limiter['total_wait'])
+    ]
+    for name, scheduler in (('analysis', analysis_scheduler), ('fundamentals', fundamentals_scheduler)):
+        snapshot = scheduler.stats()
+        gauges += [
+            ('snapshot_age_seconds', {'snapshot': name}, snapshot['age_seconds']),
+            ('snapshot_refresh_seconds', {'snapshot': name}, snapshot['last_duration']),
+            ('snapshot_refreshes_total', {'snapshot': name}, snapshot['refreshes']),
+            ('snapshot_failures_total', {'snapshot': name}, snapshot['failures'])
+        ]
+    for status, count in analysis_jobs.stats()['by_status'].items():
+        gauges.append(('analysis_jobs', {'status': status}, count))
+    for host, pool in http_transport.stats().items():
+        gauges.append(('http_pool_requests_total', {'host': host}, pool['requests']))
+        gauges.append(('http_pool_connections_total', {'host': host}, pool['connections']))
+    responses = response_cache.stats()
+    gauges += [
+        ('response_cache_hit_ratio', {}, responses['hit_ratio']),
+        ('response_cache_entries', {}, responses['size']),
+        ('response_cache_bytes', {}, responses['weight']),
+        ('response_cache_evictions_total', {}, responses['evictions'])
+    ]
+    # Only report the compute pool once a request has loaded it; /metrics should not import pandas
+    compute_module = sys.modules.get('compute_pool')
+    if compute_module is not None:
+        pool = compute_module.compute_pool.stats()
+        gauges += [
+            ('compute_pool_processes', {}, pool['processes']),
+            ('compute_pool_tasks_total', {}, pool['tasks']),
+            ('compute_pool_shared_bytes', {}, pool['shared_bytes'])
+        ]
+    return gauges
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition; requires `Authorization: Bearer METRICS_TOKEN`, and is only open without one in debug mode"""
+    token = app.config['METRICS_TOKEN']
+    if not token:
+        if not app.debug:
+            return Response('Set METRICS_TOKEN to enable /metrics\n', status=403, mimetype='text/plain')
+    elif not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {token}".encode()):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.render(metric_gauges()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/stats')
+@login_required
+def stats():
+    """Report cache, rate limiter and precompute statistics"""
+    from projection import projection_engine
+    from optimizer import portfolio_optimizer
+    from compute_pool import compute_pool
+    from risk import risk_engine
+    
+    return jsonify({
+        'success': True,
+        'cache': market_data.cache_stats(),
+        'rate_limiter': market_data.scheduler_stats(),
+        'source': market_data.source_stats(),
+        'analysis': analysis_scheduler.stats(),
+        'fundamentals': fundamentals_scheduler.stats(),
+        'projection_cache': projection_engine.stats(),
+        'response_cache': response_cache.stats(),
+        'covariance_cache': portfolio_optimizer.stats(),
+        'compute_pool': compute_pool.stats(),
+        'risk_cache': risk_engine.stats(),
+        'quotes': quote_feed.stats(),
+        'users': user_session.stats(),
+        'http': http_transport.stats(),
+        'oidc': google_oidc.stats()
+    })
+
+if app.config['PRELOAD_ANALYTICS']:
+    preload_analytics()
 
 if __name__ == '__main__':
     app.run(debug=False, port=5001, host='127.0.0.1', use_reloader=False) 
\ No newline at end of file
@@ -0,0 +1,243 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from screening import average_ratios, TRADING_DAYS
+
+FREQUENCIES = {'W': 'W', 'M': 'M', 'Q': 'Q'}
+
+
+def rebalance_rows(index, frequency='M', start_row=0):
+    """Row numbers of the first trading day of every week, month or quarter from start_row on"""
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown rebalance frequency: {frequency}")
+    periods = pd.DatetimeIndex(index).to_period(FREQUENCIES[frequency]).asi8
+    rows = np.flatnonzero(np.concatenate(([True], periods[1:] != periods[:-1])))
+    return rows[rows >= start_row]
+
+
+def rolling_sharpe(values, rows, lookback=252, risk_free_rate=0.02, min_periods=30):
+    """Trailing annualized Sharpe ratio of every column at each of the given rows.
+
+    Uses the `lookback` daily returns ending at each row, computed from running
+    sums so every rebalance date costs O(symbols) instead of a rescan of the
+    window. Matches screening.compute_factors on the same window.
+    """
+    returns = values[1:] / values[:-1] - 1.0
+    valid = ~np.isnan(returns)
+    zero = np.zeros((1, values.shape[1]))
+    sums = np.concatenate((zero, np.cumsum(np.where(valid, returns, 0.0), axis=0)))
+    squares = np.concatenate((zero, np.cumsum(np.where(valid, returns, 0.0) ** 2, axis=0)))
+    counts = np.concatenate((zero, np.cumsum(valid, axis=0)))
+
+    # Returns 0..row-1 end at price row `row`
+    ends = np.asarray(rows)
+    starts = np.maximum(ends - lookback, 0)
+    n = counts[ends] - counts[starts]
+    total = sums[ends] - sums[starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        variance = (squares[ends] - squares[starts] - n * mean ** 2) / np.maximum(n - 1, 1)
+        sharpe = np.sqrt(TRADING_DAYS) * (mean - risk_free_rate / TRADING_DAYS) / np.sqrt(np.maximum(variance, 0.0))
+    sharpe[(n < min_periods - 1) | ~np.isfinite(sharpe)] = np.nan
+    return sharpe
+
+
+def top_n_weights(scores, top_n):
+    """Equal weights over the top_n non-NaN scores of every row, as in create_portfolio"""
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    top_n = min(top_n, scores.shape[1])
+    picks = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    rows = np.arange(len(scores))[:, None]
+    chosen = np.isfinite(scores[rows, picks])
+    weights = np.zeros_like(scores)
+    weights[rows, picks] = chosen / np.maximum(chosen.sum(axis=1, keepdims=True), 1)
+    return weights
+
+
+def simulate_weights(values, rows, weights, capital=10000.0, cost_bps=10.0):
+    """Hold fractional shares of the target weights between rebalances.
+
+    Returns (holdings, cash, turnover): shares held after each rebalance, cash
+    left over (only when nothing was selected) and one-way turnover at each
+    rebalance.
+    """
+    cost = cost_bps / 10000.0
+    prices = np.nan_to_num(values[rows], nan=1.0)
+    ends = np.append(rows[1:], len(values) - 1)
+    with np.errstate(invalid='ignore'):
+        ratios = np.where(weights > 0, values[ends] / prices, 0.0)
+    invested = weights.sum(axis=1) > 0
+    growth = np.where(invested, (weights * ratios).sum(axis=1), 1.0)
+
+    # Weights drift with prices until the next rebalance; trading back to target costs cost_bps
+    drifted = np.zeros_like(weights)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drifted[1:] = np.nan_to_num((weights * ratios)[:-1] / growth[:-1, None])
+    traded = np.abs(weights - drifted).sum(axis=1)
+    factors = 1.0 - cost * traded
+    value = capital * np.cumprod(factors) * np.concatenate(([1.0], np.cumprod(growth[:-1])))
+
+    holdings = value[:, None] * weights / prices
+    return holdings, np.where(invested, 0.0, value), traded / 2
+
+
+def simulate_shares(values, rows, weights, capital=10000.0, cost_bps=10.0):
+    """Hold whole shares allocated with the create_portfolio solver, carrying cash.
+
+    Loops over rebalance dates only; each allocation is vectorized over symbols.
+    """
+    from allocation import allocate_shares
+
+    cost = cost_bps / 10000.0
+    holdings = np.zeros(weights.shape)
+    cash = np.zeros(len(rows))
+    turnover = np.zeros(len(rows))
+    shares = np.zeros(weights.shape[1])
+    balance = capital
+    for r, row in enumerate(rows):
+        prices = np.nan_to_num(values[row], nan=0.0)
+        value = balance + shares @ prices
+        picks = np.flatnonzero(weights[r] > 0)
+        target = np.zeros_like(shares)
+        if len(picks):
+            # Reserve enough cash to pay for selling everything and buying it all back
+            budget = value * (1 - 2 * cost)
+            target[picks] = allocate_shares(prices[picks], weights[r, picks], budget)[0][0]
+        traded = np.abs(target - shares) @ prices
+        balance = value - target @ prices - cost * traded
+        shares = target
+        holdings[r], cash[r] = shares, balance
+        turnover[r] = traded / (2 * value) if value else 0.0
+    return holdings, cash, turnover
+
+
+def equity_curve(values, rows, holdings, cash):
+    """Daily portfolio value from the first rebalance on"""
+    days = np.arange(rows[0], len(values))
+    period = np.searchsorted(rows, days, side='right') - 1
+    return cash[period] + np.nansum(holdings[period] * values[days], axis=1)
+
+
+def performance(equity, turnover, risk_free_rate=0.02):
+    """Headline statistics of a daily equity curve"""
+    returns = equity[1:] / equity[:-1] - 1.0
+    years = len(returns) / TRADING_DAYS
+    total_return = equity[-1] / equity[0] - 1.0
+    volatility = returns.std(ddof=1) * np.sqrt(TRADING_DAYS) if len(returns) > 1 else np.nan
+    cagr = (equity[-1] / equity[0]) ** (1 / years) - 1.0 if years > 0 else np.nan
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    return {
+        'total_return': float(total_return),
+        'cagr': float(cagr),
+        'volatility': float(volatility),
+        'sharpe_ratio': float((cagr - risk_free_rate) / volatility) if volatility else None,
+        'max_drawdown': float(drawdown.min()),
+        'average_turnover': float(turnover[1:].mean()) if len(turnover) > 1 else 0.0,
+        'rebalances': int(len(turnover))
+    }
+
+
+class Backtester:
+    """Replays the avg_ratio screen over a dates x symbols price history.
+
+    P/E and dividend yield only exist as current snapshots, so when given they
+    are held constant over the whole backtest (a look-ahead bias); the Sharpe
+    ratio is recomputed point-in-time at every rebalance. An optional dates x
+    symbols `membership` mask restricts picks (and the benchmark) to symbols
+    that were in the universe on each rebalance date.
+    """
+
+    def __init__(self, prices, pe_ratios=None, dividend_yields=None, risk_free_rate=0.02, membership=None):
+        self.symbols = list(prices.columns)
+        self.dates = prices.index
+        self.values = prices.to_numpy(dtype=np.float64)
+        self.fundamentals = [
+            np.asarray(ratios, dtype=np.float64)[None, :]
+            for ratios in (pe_ratios, dividend_yields) if ratios is not None
+        ]
+        self.risk_free_rate = risk_free_rate
+        self.membership = None if membership is None else np.asarray(membership, dtype=bool)
+
+    def eligible(self, rows):
+        """Symbols with a price (and universe membership, if known) at each of the rows"""
+        eligible = ~np.isnan(self.values[rows])
+        if self.membership is not None:
+            eligible &= self.membership[rows]
+        return eligible
+
+    def scores(self, rows, lookback=252):
+        """avg_ratio scores (rebalances x symbols) using only data up to each rebalance"""
+        sharpe = rolling_sharpe(self.values, rows, lookback, self.risk_free_rate)
+        ratios = [self.fundamentals[0], sharpe] + self.fundamentals[1:] if self.fundamentals else [sharpe]
+        scores = average_ratios(*ratios, min_count=min(2, len(ratios)))
+        scores[~self.eligible(rows)] = np.nan  # not trading yet, or not in the universe, on that date
+        return scores
+
+    def run(self, top_n=10, lookback=252, frequency='M', cost_bps=10.0, capital=10000.0, whole_shares=False, details=True):
+        """Backtest the top_n equal-weight screen; returns metrics, an equal-weight benchmark and the equity curve"""
+        rows = rebalance_rows(self.dates, frequency, start_row=min(lookback, len(self.dates) - 2))
+        if len(rows) < 2:
+            raise ValueError("Not enough history for a backtest")
+
+        weights = top_n_weights(self.scores(rows, lookback), top_n)
+        simulate = simulate_shares if whole_shares else simulate_weights
+        holdings, cash, turnover = simulate(self.values, rows, weights, capital, cost_bps)
+        equity = equity_curve(self.values, rows, holdings, cash)
+
+        # Equal weight across every eligible symbol, rebalanced on the same dates
+        listed = self.eligible(rows)
+        benchmark_weights = listed / np.maximum(listed.sum(axis=1, keepdims=True), 1)
+        bench_holdings, bench_cash, bench_turnover = simulate_weights(self.values, rows, benchmark_weights, capital, cost_bps)
+        benchmark = equity_curve(self.values, rows, bench_holdings, bench_cash)
+
+        result = {
+            'parameters': {'top_n': top_n, 'lookback': lookback, 'frequency': frequency, 'cost_bps': cost_bps, 'whole_shares': whole_shares},
+            'metrics': performance(equity, turnover, self.risk_free_rate),
+            'benchmark': performance(benchmark, bench_turnover, self.risk_free_rate)
+        }
+        if details:
+            result['dates'] = [date.strftime('%Y-%m-%d') for date in self.dates[rows[0]:]]
+            result['equity'] = equity.tolist()
+            result['benchmark_equity'] = benchmark.tolist()
+            result['rebalances'] = [{
+                'date': self.dates[row].strftime('%Y-%m-%d'),
+                'holdings': [self.symbols[i] for i in np.flatnonzero(weights[r] > 0)],
+                'turnover': float(turnover[r])
+            } for r, row in enumerate(rows)]
+        return result
+
+    def sweep(self, grid, processes=1, **options):
+        """Run one backtest per combination of the parameter grid, optionally across a process pool.
+
+        grid maps run() keyword names to lists of values, e.g.
+        {'top_n': [5, 10, 20], 'frequency': ['M', 'Q']}. Returns summaries
+        sorted by Sharpe ratio, best first.
+        """
+        names = list(grid)
+        combinations = [dict(zip(names, values), **options) for values in itertools.product(*(grid[name] for name in names))]
+        if processes > 1 and len(combinations) > 1:
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self,)) as executor:
+                results = list(executor.map(_run_worker, combinations))
+        else:
+            results = [self.run(details=False, **parameters) for parameters in combinations]
+        return sorted(results, key=sharpe_rank, reverse=True)
+
+
+def sharpe_rank(result):
+    """Sort key of a backtest summary: its Sharpe ratio, with missing or NaN values last"""
+    sharpe = result['metrics']['sharpe_ratio']
+    return sharpe if sharpe is not None and np.isfinite(sharpe) else -np.inf
+
+
+_worker_backtester = None
+
+
+def _init_worker(backtester):
+    # Each worker receives the price matrix once instead of with every task
+    global _worker_backtester
+    _worker_backtester = backtester
+
+
+def _run_worker(parameters):
+    return _worker_backtester.run(details=False, **parameters)
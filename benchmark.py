@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Stock Portfolio Analyzer.
+
+Uses synthetic price data so results are repeatable without network access.
+Run: python3 benchmark.py
+"""
+
+import time
+import numpy as np
+import pandas as pd
+
+
+def synthetic_histories(num_symbols, num_days, seed=42):
+    """Generate {symbol: DataFrame} of random-walk closing prices"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2024-12-31', periods=num_days)
+    returns = rng.normal(0.0004, 0.015, size=(num_days, num_symbols))
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    return {f"SYM{i:04d}": pd.DataFrame({'Close': closes[:, i]}, index=dates) for i in range(num_symbols)}
+
+
+def best_time(func, repeat=3):
+    """Return the best wall-clock time of several runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_screening(num_symbols=500, num_days=1260):
+    """Compare per-symbol Sharpe calls against the vectorized screening engine"""
+    from app import calculate_sharpe_ratio
+    from screening import build_price_matrix, compute_factors, top_k
+
+    print(f"\nScreening {num_symbols} symbols x {num_days} days...")
+    histories = synthetic_histories(num_symbols, num_days)
+
+    def per_symbol():
+        scores = {symbol: calculate_sharpe_ratio(hist) for symbol, hist in histories.items()}
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:10]
+
+    prices = build_price_matrix(histories)
+
+    def vectorized():
+        factors = compute_factors(prices)
+        return top_k(factors['sharpe_ratio'].to_numpy(), 10)
+
+    loop_time = best_time(per_symbol)
+    matrix_time = best_time(lambda: build_price_matrix(histories))
+    vector_time = best_time(vectorized)
+
+    print(f"  - Per-symbol Sharpe loop:    {loop_time * 1000:8.1f} ms")
+    print(f"  - Build price matrix:        {matrix_time * 1000:8.1f} ms")
+    print(f"  - Vectorized factors + top-k: {vector_time * 1000:7.1f} ms ({loop_time / vector_time:.0f}x faster)")
+
+
+def bench_monte_carlo(n_paths=10000, n_steps=252, n_assets=20):
+    """Time vectorized Monte Carlo simulation at weekly and daily band resolution"""
+    import os
+    from monte_carlo import MonteCarloSimulator
+
+    print(f"\nMonte Carlo {n_paths} paths x {n_steps} steps x {n_assets} assets...")
+    rng = np.random.default_rng(42)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, size=(504, n_assets)), axis=0))
+
+    simulator = MonteCarloSimulator(n_paths=n_paths)
+    for method in ['gbm', 'bootstrap']:
+        for band_every, label in [(5, 'weekly bands'), (1, 'daily bands')]:
+            elapsed = best_time(lambda: simulator.simulate(prices, n_steps, method=method, band_every=band_every))
+            print(f"  - {method:9s} {label}: {elapsed * 1000:8.1f} ms")
+
+    processes = min(os.cpu_count() or 1, 4)
+    if processes > 1:
+        pooled = MonteCarloSimulator(n_paths=n_paths * 4, processes=processes)
+        elapsed = best_time(lambda: pooled.simulate(prices, n_steps, band_every=5), repeat=1)
+        print(f"  - gbm {n_paths * 4} paths on {processes} processes: {elapsed * 1000:8.1f} ms")
+
+
+def bench_optimizer(num_symbols=500, num_days=252):
+    """Time covariance estimation and each allocation strategy on a large universe"""
+    from optimizer import PortfolioOptimizer
+
+    print(f"\nPortfolio optimizer {num_symbols} symbols x {num_days} days...")
+    histories = synthetic_histories(num_symbols, num_days + 1)
+    optimizer = PortfolioOptimizer()
+
+    start = time.perf_counter()
+    optimizer.covariance(histories, window=num_days)
+    print(f"  - Ledoit-Wolf covariance (cold): {(time.perf_counter() - start) * 1000:8.1f} ms")
+    elapsed = best_time(lambda: optimizer.covariance(histories, window=num_days))
+    print(f"  - Covariance (cached):           {elapsed * 1000:8.1f} ms")
+
+    for strategy in ['min_variance', 'max_sharpe', 'risk_parity']:
+        elapsed = best_time(lambda: optimizer.optimize(histories, strategy, window=num_days, max_weight=0.05))
+        print(f"  - {strategy:12s}                   {elapsed * 1000:8.1f} ms")
+
+
+def bench_allocation(num_symbols=500, num_budgets=1000):
+    """Compare floored share counts with the integer allocation solver across budget tiers"""
+    from allocation import allocate_shares, allocation_error
+
+    print(f"\nShare allocation {num_symbols} names x {num_budgets} budgets ($1k-$1M)...")
+    rng = np.random.default_rng(42)
+    prices = np.exp(rng.normal(4.5, 1.2, num_symbols))
+    weights = rng.dirichlet(np.ones(num_symbols))
+    budgets = np.geomspace(1000, 1000000, num_budgets)
+
+    elapsed = best_time(lambda: allocate_shares(prices, weights, budgets), repeat=1)
+    shares, cash = allocate_shares(prices, weights, budgets)
+    floored = np.floor(budgets[:, None] * weights / prices)
+    floored_cash = budgets - floored @ prices
+    print(f"  - Solver: {elapsed * 1000:8.1f} ms ({elapsed / num_budgets * 1e6:.0f} us per budget)")
+
+    error = allocation_error(shares, prices, weights, budgets)
+    floored_error = allocation_error(floored, prices, weights, budgets)
+    for tier in [1000, 10000, 100000, 1000000]:
+        i = np.abs(budgets - tier).argmin()
+        print(f"  - ${tier:>9,}: idle cash {cash[i] / budgets[i]:6.2%} vs {floored_cash[i] / budgets[i]:6.2%} floored, "
+              f"tracking error {error[i]:.5f} vs {floored_error[i]:.5f}")
+
+
+def bench_backtest(num_symbols=500, years=10):
+    """Time a monthly backtest of the screen and a small parameter sweep"""
+    import os
+    from backtest import Backtester
+    from screening import build_price_matrix
+
+    print(f"\nBacktest {num_symbols} symbols x {years} years, monthly rebalance...")
+    prices = build_price_matrix(synthetic_histories(num_symbols, years * 252))
+    rng = np.random.default_rng(42)
+    backtester = Backtester(prices, pe_ratios=rng.uniform(5, 40, num_symbols), dividend_yields=rng.uniform(0, 4, num_symbols))
+
+    elapsed = best_time(lambda: backtester.run(top_n=10))
+    print(f"  - Fractional shares:  {elapsed * 1000:8.1f} ms")
+    elapsed = best_time(lambda: backtester.run(top_n=10, whole_shares=True, capital=100000), repeat=1)
+    print(f"  - Whole shares:       {elapsed * 1000:8.1f} ms")
+
+    grid = {'top_n': [5, 10, 20], 'lookback': [126, 252], 'frequency': ['M', 'Q']}
+    elapsed = best_time(lambda: backtester.sweep(grid), repeat=1)
+    print(f"  - 12-run sweep:       {elapsed * 1000:8.1f} ms")
+    processes = min(os.cpu_count() or 1, 4)
+    if processes > 1:
+        elapsed = best_time(lambda: backtester.sweep(grid, processes=processes), repeat=1)
+        print(f"  - Sweep on {processes} processes: {elapsed * 1000:8.1f} ms")
+
+
+def bench_rolling(num_symbols=500, window=252):
+    """Compare a daily bar update of the rolling engine against recomputing the window"""
+    from rolling import SymbolStats
+    from screening import build_price_matrix, compute_factors
+
+    print(f"\nRolling metrics for {num_symbols} symbols, {window}-day window...")
+    histories = synthetic_histories(num_symbols, window + 2)
+    prices = build_price_matrix(histories)
+    values = prices.to_numpy()
+    day = prices.index[-1].toordinal()
+
+    states = [SymbolStats(window) for _ in range(num_symbols)]
+    for i, stats in enumerate(states):
+        for date, close in zip(prices.index[:-1], values[:-1, i]):
+            stats.update(date.toordinal(), float(close))
+
+    def update():
+        for i, stats in enumerate(states):
+            stats.update(day, float(values[-1, i]))  # same-day refresh replaces the bar
+            stats.metrics()
+
+    elapsed = best_time(lambda: compute_factors(prices.iloc[-(window + 1):]))
+    print(f"  - Full recompute:     {elapsed * 1000:8.2f} ms")
+    elapsed = best_time(update)
+    print(f"  - Incremental update: {elapsed * 1000:8.2f} ms ({elapsed / num_symbols * 1e6:.1f} us per symbol)")
+
+
+def bench_fundamentals(num_symbols=5000):
+    """Time filtered, sorted queries against the fundamentals index"""
+    from fundamentals import FundamentalsIndex
+
+    print(f"\nFundamentals screen over {num_symbols} symbols...")
+    rng = np.random.default_rng(42)
+    sectors = ['Technology', 'Energy', 'Utilities', 'Financial Services', 'Healthcare']
+    infos = {
+        f"SYM{i:04d}": {
+            'trailingPE': rng.uniform(5, 60) if rng.random() > 0.1 else None,
+            'dividendYield': rng.uniform(0, 0.06),
+            'regularMarketPrice': rng.uniform(5, 500),
+            'marketCap': rng.uniform(1e8, 1e12),
+            'beta': rng.normal(1, 0.3),
+            'sector': sectors[i % len(sectors)],
+            'longName': f"Company {i}"
+        }
+        for i in range(num_symbols)
+    }
+
+    elapsed = best_time(lambda: FundamentalsIndex.from_infos(infos), repeat=1)
+    print(f"  - Build index:        {elapsed * 1000:8.2f} ms")
+    index = FundamentalsIndex.from_infos(infos)
+    queries = [
+        ('pe < 25 and dividend_yield > 2', 'pe_ratio', False),
+        ('market_cap >= 1e10 and beta < 1', 'dividend_yield', True),
+        ("sector == 'Utilities' and pe < 20", 'market_cap', True)
+    ]
+    for where, sort, descending in queries:
+        elapsed = best_time(lambda: index.query(where, sort, descending, limit=50), repeat=20)
+        print(f"  - {where:<38} {elapsed * 1000:6.3f} ms")
+
+
+def bench_charts(num_days=2520, points=800):
+    """Time downsampling a 10-year series and compare payload sizes"""
+    import gzip
+    import json
+    from charts import lttb, minmax_indices, chart_payload
+
+    print(f"\nChart payload for {num_days} daily bars at {points} points...")
+    hist = next(iter(synthetic_histories(1, num_days).values()))
+    closes = hist['Close'].to_numpy()
+    x = np.arange(num_days)
+
+    elapsed = best_time(lambda: lttb(x, closes, points))
+    print(f"  - LTTB:               {elapsed * 1000:8.2f} ms")
+    elapsed = best_time(lambda: minmax_indices(closes, points))
+    print(f"  - Min/max buckets:    {elapsed * 1000:8.2f} ms")
+    raw = hist.to_json().encode()
+    for encoding in ['delta', 'float32']:
+        body = json.dumps(chart_payload('SYM0000', hist, points, encoding=encoding), separators=(',', ':')).encode()
+        print(f"  - {encoding:8s} payload:    {len(body) / 1024:6.1f} KB, {len(gzip.compress(body)) / 1024:6.1f} KB gzipped "
+              f"(raw closes {len(raw) / 1024:.1f} KB)")
+
+
+def bench_responses(num_stocks=500):
+    """Time serializing an analysis-sized payload and serving it from the response cache"""
+    import json
+    from app import app
+    from responses import ResponseCache
+
+    print(f"\nResponse serialization for {num_stocks} ranked stocks...")
+    rng = np.random.default_rng(23)
+    payload = {'success': True, 'stocks': [
+        {'symbol': f"SYM{i:04d}", 'pe_ratio': rng.uniform(5, 40), 'sharpe_ratio': rng.normal(), 'avg_ratio': rng.normal()}
+        for i in range(num_stocks)
+    ]}
+
+    elapsed = best_time(lambda: json.dumps(payload, default=float, sort_keys=True))
+    print(f"  - json.dumps:         {elapsed * 1000:8.2f} ms")
+    elapsed = best_time(lambda: app.json.dumps(payload))
+    print(f"  - App JSON provider:  {elapsed * 1000:8.2f} ms")
+    cache = ResponseCache(app.json.dumps)
+    entry = cache.get_or_build(('bench',), lambda: payload)
+    elapsed = best_time(lambda: cache.get_or_build(('bench',), lambda: payload))
+    print(f"  - Cached lookup:      {elapsed * 1000:8.2f} ms ({len(entry.body) / 1024:.1f} KB, {len(entry.variants['gzip']) / 1024:.1f} KB gzipped)")
+
+
+def bench_compute_pool(num_symbols=500, num_days=504, requests=32):
+    """Throughput of concurrent factor scoring requests on threads alone vs the shared-memory compute pool"""
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+    from compute_pool import ComputePool
+    from screening import build_price_matrix, compute_factors
+
+    cores = os.cpu_count() or 1
+    print(f"\n{requests} concurrent scoring requests over {num_symbols} symbols x {num_days} days ({cores} cores)...")
+    prices = build_price_matrix(synthetic_histories(num_symbols, num_days))
+    symbols = list(prices.columns)
+
+    def throughput(score, workers):
+        with ThreadPoolExecutor(max_workers=workers) as threads:
+            elapsed = best_time(lambda: list(threads.map(lambda _: score(), range(requests))), repeat=2)
+        return requests / elapsed
+
+    baseline = throughput(lambda: compute_factors(prices), 1)
+    print(f"  - Request thread, 1 thread:   {baseline:8.1f} req/s")
+    for workers in sorted({2, 4, cores} - {1}):
+        rate = throughput(lambda: compute_factors(prices), workers)
+        print(f"  - Request threads, {workers} threads: {rate:7.1f} req/s ({rate / baseline:.2f}x)")
+    for processes in sorted({2, 4, cores} - {1}):
+        pool = ComputePool(processes=processes, min_columns=num_symbols // processes)
+        matrix = pool.publish('bench', 1, lambda: prices)
+        pool.factors(matrix, symbols)  # start the workers and attach them to the matrix
+        rate = throughput(lambda: pool.factors(matrix, symbols), processes)
+        print(f"  - Compute pool, {processes} processes: {rate:6.1f} req/s ({rate / baseline:.2f}x), "
+              f"{matrix.nbytes / 1024 / 1024:.1f} MB shared once")
+        pool.shutdown()
+
+
+def bench_risk(num_symbols=50, num_portfolios=10000, num_days=504):
+    """Time risk models and VaR/CVaR of many portfolios in one batch against one at a time"""
+    from risk import RiskEngine
+
+    print(f"\nRisk of {num_portfolios} portfolios over {num_symbols} symbols...")
+    histories = synthetic_histories(num_symbols + 1, num_days)
+    benchmark = histories.pop(f"SYM{num_symbols:04d}")
+    engine = RiskEngine()
+
+    elapsed = best_time(lambda: RiskEngine().model(histories, benchmark), repeat=1)
+    print(f"  - Model + clusters:   {elapsed * 1000:8.2f} ms")
+    model = engine.model(histories, benchmark)
+    weights = np.random.default_rng(42).dirichlet(np.ones(num_symbols), size=num_portfolios)
+
+    sample = weights[:100]
+    elapsed = best_time(lambda: [engine.evaluate(model, w) for w in sample], repeat=1) * num_portfolios / len(sample)
+    print(f"  - One at a time:      {elapsed * 1000:8.1f} ms (extrapolated from {len(sample)})")
+    elapsed = best_time(lambda: engine.evaluate(model, weights))
+    print(f"  - Batched:            {elapsed * 1000:8.1f} ms")
+    elapsed = best_time(lambda: engine.report(model, weights[0], 100000))
+    print(f"  - Full report:        {elapsed * 1000:8.2f} ms")
+
+
+def main():
+    """Run all benchmarks"""
+    print("Stock Portfolio Analyzer - Benchmarks")
+    print("=" * 50)
+
+    benchmarks = [
+        bench_screening,
+        bench_monte_carlo,
+        bench_optimizer,
+        bench_allocation,
+        bench_backtest,
+        bench_rolling,
+        bench_fundamentals,
+        bench_charts,
+        bench_responses,
+        bench_compute_pool,
+        bench_risk
+    ]
+
+    for benchmark in benchmarks:
+        benchmark()
+
+
+if __name__ == "__main__":
+    main()
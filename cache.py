@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and single-flight loading.
+
+    With a weigher, entries are also evicted while their total weight (for
+    example serialized bytes) exceeds max_weight.
+    """
+
+    def __init__(self, max_size=1000, ttl=300, clock=time.monotonic, max_weight=None, weigher=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.weight = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._weights = {}  # key -> weight, when a weigher is set
+        self._inflight = {}  # key -> threading.Event for loads in progress
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.loads = 0
+        self.coalesced = 0
+
+    def _lookup(self, key, now):
+        """Return (found, value) for a fresh entry; caller must hold the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _remove(self, key):
+        """Drop an entry and its weight; caller must hold the lock"""
+        if self._entries.pop(key, None) is not None and self.weigher is not None:
+            self.weight -= self._weights.pop(key)
+
+    def _over_budget(self):
+        if len(self._entries) > self.max_size:
+            return True
+        # Never evict the newest entry just because it alone is over the budget
+        return self.max_weight is not None and self.weight > self.max_weight and len(self._entries) > 1
+
+    def _store(self, key, value, ttl):
+        """Insert a value and evict least recently used entries; caller must hold the lock"""
+        self._remove(key)
+        self._entries[key] = (self.clock() + ttl, value)
+        if self.weigher is not None:
+            self._weights[key] = self.weigher(value)
+            self.weight += self._weights[key]
+        while self._over_budget():
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        """Return a cached value without loading it"""
+        with self._lock:
+            found, value = self._lookup(key, self.clock())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Store a value in the cache"""
+        with self._lock:
+            self._store(key, value, self.ttl if ttl is None else ttl)
+
+    def invalidate(self, key):
+        """Remove a single entry from the cache"""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            self._entries.clear()
+            self._weights.clear()
+            self.weight = 0
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return a cached value, calling loader() once on a miss"""
+        results = self.get_many_or_load([key], lambda keys: {keys[0]: loader()}, ttl)
+        return results.get(key)
+
+    def get_many_or_load(self, keys, loader, ttl=None):
+        """Return {key: value} for keys, loading all misses with one loader(missing_keys) call.
+
+        Concurrent callers asking for a key that is already being loaded wait
+        for that load instead of starting their own. Keys the loader does not
+        return are left out of the result and are not cached.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        results = {}
+        to_load = []
+        waiting = []
+
+        with self._lock:
+            now = self.clock()
+            for key in keys:
+                found, value = self._lookup(key, now)
+                if found:
+                    self.hits += 1
+                    results[key] = value
+                elif key in self._inflight:
+                    self.hits += 1
+                    self.coalesced += 1
+                    waiting.append((key, self._inflight[key]))
+                else:
+                    self.misses += 1
+                    self._inflight[key] = threading.Event()
+                    to_load.append(key)
+
+        if to_load:
+            loaded = {}
+            try:
+                loaded = loader(to_load) or {}
+            finally:
+                with self._lock:
+                    self.loads += 1
+                    for key in to_load:
+                        if key in loaded and loaded[key] is not None:
+                            self._store(key, loaded[key], ttl)
+                        self._inflight.pop(key).set()
+            for key in to_load:
+                if loaded.get(key) is not None:
+                    results[key] = loaded[key]
+
+        for key, event in waiting:
+            event.wait()
+            with self._lock:
+                found, value = self._lookup(key, self.clock())
+            if found:
+                results[key] = value
+
+        return results
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            requests = self.hits + self.misses
+            stats = {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests if requests else 0.0,
+                'loads': self.loads,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+            if self.weigher is not None:
+                stats['weight'] = self.weight
+                stats['max_weight'] = self.max_weight
+            return stats
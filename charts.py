@@ -0,0 +1,125 @@
+import base64
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+ENCODINGS = ('delta', 'float32')
+RANGES = ('1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'max')
+PRICE_SCALE = 100  # delta-encoded prices are whole cents
+
+
+def lttb(x, y, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of len(y).
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket, which preserves the
+    visual shape of the series (peaks included) at a fraction of the points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax_indices(y, threshold):
+    """Indices of the minimum and maximum of each of threshold/2 equal buckets, in order.
+
+    Cheaper than LTTB and never clips a spike, at the cost of a jagged look
+    when many buckets are flat.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, threshold // 2 + 1).astype(np.int64)
+    indices = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            bucket = y[start:end]
+            low, high = start + int(np.argmin(bucket)), start + int(np.argmax(bucket))
+            indices.extend(sorted({low, high}))
+    return np.asarray(indices, dtype=np.int64)
+
+
+def downsample(x, y, points, method='lttb'):
+    """Indices of at most `points` points of the series, chosen by LTTB or min/max bucketing"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}', expected one of {', '.join(METHODS)}")
+    return lttb(x, y, points) if method == 'lttb' else minmax_indices(y, points)
+
+
+def encode(values, encoding='delta', scale=PRICE_SCALE):
+    """Encode a numeric series compactly.
+
+    delta: values are rounded to 1/scale and sent as the first value followed
+    by successive differences, small integers that compress well.
+    float32: little-endian float32 bytes in base64.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if encoding == 'delta':
+        scaled = np.round(values * scale).astype(np.int64)
+        return {'encoding': 'delta', 'scale': scale, 'data': np.diff(scaled, prepend=0).tolist()}
+    if encoding == 'float32':
+        return {'encoding': 'float32', 'data': base64.b64encode(values.astype('<f4').tobytes()).decode('ascii')}
+    raise ValueError(f"Unknown encoding '{encoding}', expected one of {', '.join(ENCODINGS)}")
+
+
+def decode(series):
+    """Inverse of encode() (what the dashboard does in JavaScript)"""
+    if series['encoding'] == 'delta':
+        return np.cumsum(series['data']) / series['scale']
+    return np.frombuffer(base64.b64decode(series['data']), dtype='<f4').astype(np.float64)
+
+
+def day_numbers(index):
+    """Days since 1970-01-01 of a DatetimeIndex"""
+    values = index.tz_localize(None) if getattr(index, 'tz', None) is not None else index
+    return values.values.astype('datetime64[D]').astype(np.int64)
+
+
+def chart_payload(symbol, hist, points=800, method='lttb', encoding='delta', projection=None):
+    """Downsampled, encoded close series of a history, plus an optional projected trend.
+
+    Dates are always delta-encoded day numbers. `projection` is a
+    (days, prices) pair of day numbers and projected prices.
+    """
+    closes = hist['Close'].dropna()
+    days = day_numbers(closes.index)
+    values = closes.to_numpy(dtype=np.float64)
+    keep = downsample(days, values, points, method)
+
+    payload = {
+        'symbol': symbol,
+        'as_of': str(np.datetime64(int(days[-1]), 'D')),
+        'method': method,
+        'points': int(len(keep)),
+        'source_points': int(len(values)),
+        'x': encode(days[keep], 'delta', scale=1),
+        'close': encode(values[keep], encoding)
+    }
+    if projection is not None:
+        projected_days, projected_prices = projection
+        payload['projection'] = {
+            'x': encode(projected_days, 'delta', scale=1),
+            'y': encode(projected_prices, encoding)
+        }
+    return payload
+
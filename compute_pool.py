@@ -0,0 +1,286 @@
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from config import Config
+
+WORKER_ATTACHMENTS = 32  # shared blocks a worker keeps mapped before closing the oldest
+
+
+class SharedMatrix:
+    """A float64 matrix in a named shared memory block.
+
+    The creating process owns the block and unlinks it; worker processes
+    attach by name and read the same pages through a NumPy view, so a
+    universe's prices are loaded once however many workers use them.
+    """
+
+    def __init__(self, shm, shape, columns=None, index=None, owner=False):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.columns = list(columns) if columns is not None else None
+        self.index = index
+        self.owner_pid = os.getpid() if owner else None
+        self.values = np.ndarray(self.shape, dtype=np.float64, buffer=shm.buf)
+        if not owner:
+            self.values.flags.writeable = False
+
+    @classmethod
+    def create(cls, values, columns=None, index=None):
+        """Copy a 2-D array into a new shared block"""
+        values = np.asarray(values, dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        matrix = cls(shm, values.shape, columns, index, owner=True)
+        matrix.values[...] = values
+        return matrix
+
+    @classmethod
+    def from_frame(cls, prices):
+        """Shared copy of a dates x symbols DataFrame, keeping its labels in this process"""
+        return cls.create(prices.to_numpy(dtype=np.float64), prices.columns, prices.index)
+
+    @classmethod
+    def attach(cls, descriptor):
+        """Map a block created by another process from its descriptor()"""
+        name, shape = descriptor
+        return cls(shared_memory.SharedMemory(name=name), shape)
+
+    def descriptor(self):
+        """(block name, shape): everything a worker needs to attach"""
+        return self.shm.name, self.shape
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * 8
+
+    def column_indices(self, symbols):
+        """Column of each symbol, -1 for symbols the matrix does not have"""
+        positions = {symbol: i for i, symbol in enumerate(self.columns or ())}
+        return np.array([positions.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+
+    def close(self):
+        self.values = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes away with it
+
+    def unlink(self):
+        """Close and, in the process that created the block, free it"""
+        self.close()
+        if self.owner_pid == os.getpid():
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def factor_columns(values, columns, start=0, risk_free_rate=0.02):
+    """Screening factors of some columns of a price matrix, from row `start` on"""
+    from screening import compute_factors
+
+    factors = compute_factors(pd.DataFrame(values[start:, columns]), risk_free_rate)
+    return {name: factors[name].to_numpy() for name in factors.columns}
+
+
+def trend_columns(values, columns, model='linear'):
+    """Trend fits of some columns of a price matrix"""
+    from projection import fit_trend
+
+    return fit_trend(values[:, columns], model)
+
+
+_attached = OrderedDict()  # block name -> SharedMatrix mapped in this worker process
+
+
+def _worker_values(descriptor):
+    matrix = _attached.get(descriptor[0])
+    if matrix is None:
+        matrix = _attached[descriptor[0]] = SharedMatrix.attach(descriptor)
+        while len(_attached) > WORKER_ATTACHMENTS:
+            _attached.popitem(last=False)[1].close()
+    return matrix.values
+
+
+def _run_task(func, descriptor, columns, args):
+    return func(_worker_values(descriptor), columns, *args)
+
+
+class ComputePool:
+    """Worker processes for the NumPy/pandas work behind analysis and projection requests.
+
+    Request threads hand over a shared matrix and the columns they need;
+    workers attach to the matrix by name, compute their slice of the columns
+    and return small per-column arrays, so CPU-bound work from concurrent
+    users runs on all cores instead of queueing on the web process's GIL.
+    With one process (the default) everything runs inline.
+    """
+
+    def __init__(self, processes=1, min_columns=64, max_matrices=16):
+        self.processes = processes
+        self.min_columns = min_columns  # narrower batches are cheaper to compute than to ship
+        self.max_matrices = max_matrices
+        self._executor = None
+        self._matrices = OrderedDict()  # key -> (version, SharedMatrix)
+        self._retired = []  # replaced matrices, unlinked once idle and beyond max_matrices
+        self._inflight = {}  # block name -> map_columns calls still using it
+        self._lock = threading.Lock()
+        self.tasks = 0
+        self.inline_batches = 0
+        self.publishes = 0
+        self.failures = 0
+
+    @property
+    def enabled(self):
+        return self.processes > 1
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes)
+            return self._executor
+
+    def publish(self, key, version, build):
+        """Shared matrix for key, calling build() for a dates x symbols DataFrame only when version changed"""
+        with self._lock:
+            current = self._matrices.get(key)
+            if current is not None and current[0] == version:
+                self._matrices.move_to_end(key)
+                return current[1]
+
+        matrix = SharedMatrix.from_frame(build())
+        with self._lock:
+            current = self._matrices.pop(key, None)
+            if current is not None:
+                self._retired.append(current[1])
+            self._matrices[key] = (version, matrix)
+            while len(self._matrices) > self.max_matrices:
+                self._retired.append(self._matrices.popitem(last=False)[1][1])
+            self._unlink_retired()
+            self.publishes += 1
+        return matrix
+
+    def _unlink_retired(self):
+        """Free the oldest retired matrices beyond max_matrices that no task uses; caller must hold the lock"""
+        excess = len(self._retired) - self.max_matrices
+        for matrix in list(self._retired):
+            if excess <= 0:
+                break
+            if not self._inflight.get(matrix.shm.name):
+                self._retired.remove(matrix)
+                matrix.unlink()
+                excess -= 1
+
+    def map_columns(self, func, matrix, columns, *args):
+        """Run func(values, columns, *args) over column chunks in the workers and concatenate the results.
+
+        func must be a module-level function returning {name: per-column array}.
+        """
+        columns = np.asarray(columns, dtype=np.int64)
+        chunks = max(1, min(self.processes, len(columns) // self.min_columns))
+        if not self.enabled or chunks == 1:
+            with self._lock:
+                self.inline_batches += 1
+            return func(matrix.values, columns, *args)
+
+        parts = np.array_split(columns, chunks)
+        block = matrix.shm.name
+        with self._lock:
+            # Retired matrices are not unlinked while workers may still attach to them
+            self._inflight[block] = self._inflight.get(block, 0) + 1
+        try:
+            futures = [self._pool().submit(_run_task, func, matrix.descriptor(), part, args) for part in parts]
+            results = [future.result() for future in futures]
+        except (BrokenProcessPool, FileNotFoundError) as e:
+            # A worker died (e.g. killed for memory) or could not attach; start a fresh pool next time
+            print(f"Error in compute pool, computing inline: {e}")
+            with self._lock:
+                self.failures += 1
+                if isinstance(e, BrokenProcessPool):
+                    self._executor = None
+            return func(matrix.values, columns, *args)
+        finally:
+            with self._lock:
+                self._inflight[block] -= 1
+                if not self._inflight[block]:
+                    del self._inflight[block]
+                self._unlink_retired()
+        with self._lock:
+            self.tasks += len(parts)
+        return {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+
+    def map_symbols(self, func, matrix, symbols, *args):
+        """map_columns by symbol; symbols missing from the matrix get NaN"""
+        positions = matrix.column_indices(symbols)
+        found = np.flatnonzero(positions >= 0)
+        results = self.map_columns(func, matrix, positions[found], *args)
+        aligned = {}
+        for name, values in results.items():
+            aligned[name] = np.full(len(symbols), np.nan)
+            aligned[name][found] = values
+        return aligned
+
+    def factors(self, matrix, symbols, start=0, risk_free_rate=0.02):
+        """Screening factors of symbols over rows `start` onwards of a shared price matrix"""
+        return self.map_symbols(factor_columns, matrix, symbols, start, risk_free_rate)
+
+    def fit_trends(self, prices, model='linear'):
+        """fit_trend over a dates x symbols array, split across the workers when it is wide enough"""
+        prices = np.asarray(prices, dtype=np.float64)
+        if not self.enabled or prices.ndim < 2 or prices.shape[1] < 2 * self.min_columns:
+            from projection import fit_trend
+            return fit_trend(prices, model)
+
+        matrix = SharedMatrix.create(prices)
+        try:
+            return self.map_columns(trend_columns, matrix, np.arange(prices.shape[1]), model)
+        finally:
+            matrix.unlink()
+
+    def detach(self):
+        """Run inline from now on, forgetting (not freeing) matrices inherited across a fork"""
+        with self._lock:
+            self.processes = 1
+            self._executor = None
+            self._matrices = OrderedDict()
+            self._retired = []
+            self._inflight = {}
+
+    def shutdown(self):
+        """Stop the workers and free every shared block this process created"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            matrices = [matrix for _, matrix in self._matrices.values()] + self._retired
+            self._matrices = OrderedDict()
+            self._retired = []
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for matrix in matrices:
+            matrix.unlink()
+
+    def stats(self):
+        """Return pool size, task counts and the shared matrices"""
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'tasks': self.tasks,
+                'inline_batches': self.inline_batches,
+                'publishes': self.publishes,
+                'failures': self.failures,
+                'matrices': len(self._matrices),
+                'shared_bytes': sum(matrix.nbytes for _, matrix in self._matrices.values())
+            }
+
+
+# Global compute pool
+compute_pool = ComputePool(
+    processes=Config.COMPUTE_PROCESSES,
+    min_columns=Config.COMPUTE_MIN_COLUMNS,
+    max_matrices=Config.COMPUTE_MAX_MATRICES
+)
+atexit.register(compute_pool.shutdown)
@@ -10,14 +10,134 @@ class Config:
     # OAuth configuration
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID') or 'your-google-client-id'
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET') or 'your-google-client-secret'
-    GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid_configuration"
+    GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+    OIDC_CACHE_TTL = 86400  # seconds the discovery document and signing keys are reused
     
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
-    # Database configuration (if needed later)
+    # Database configuration
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///stocks_analyzer.db'
     
+    # User store shared by every worker: sqlite:///path, redis://host:port/db or memory:// (single process only)
+    USER_STORE_URL = os.environ.get('USER_STORE_URL') or DATABASE_URL
+    USER_CACHE_SIZE = 1000  # users kept in each worker's in-process LRU
+    USER_CACHE_TTL = 60  # seconds before a cached user is re-read from the shared store
+    
     # API configuration
     YAHOO_FINANCE_RATE_LIMIT = 100  # requests per minute
-    STOCK_CACHE_DURATION = 300  # 5 minutes in seconds 
\ No newline at end of file
+    YAHOO_FINANCE_BURST = 100  # requests that may be sent back-to-back
+    YAHOO_FINANCE_MAX_RETRIES = 3  # retries on 429/5xx with jittered exponential backoff
+    STOCK_CACHE_DURATION = 300  # 5 minutes in seconds
+    HISTORY_CACHE_DURATION = int(os.environ.get('HISTORY_CACHE_DURATION') or 3600)  # daily bars change slowly
+    STOCK_CACHE_MAX_ENTRIES = int(os.environ.get('STOCK_CACHE_MAX_ENTRIES') or 2000)  # per cache, LRU evicted
+    
+    # Market data source: yahoo, synthetic (generated offline) or replay (fixtures recorded by replay.py)
+    MARKET_DATA_SOURCE = os.environ.get('MARKET_DATA_SOURCE') or 'yahoo'
+    MARKET_DATA_FIXTURES = os.environ.get('MARKET_DATA_FIXTURES') or os.path.join('data', 'fixtures')
+    SIMULATED_LATENCY = float(os.environ.get('SIMULATED_LATENCY') or 0)  # seconds per offline upstream call
+    SIMULATED_ERROR_RATE = float(os.environ.get('SIMULATED_ERROR_RATE') or 0)  # share of offline calls failing with 429/503
+    SIMULATED_RATE_LIMIT = int(os.environ.get('SIMULATED_RATE_LIMIT') or 100000)  # requests per minute allowed to offline sources
+    
+    # Outbound HTTP connection pools (keep-alive, shared by OAuth and market data calls)
+    HTTP_POOL_CONNECTIONS = 10  # hosts with a cached connection pool
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE') or 10)  # connections kept open per host
+    HTTP_HOST_POOL_SIZES = {  # larger pools for the hosts hit in bursts
+        'query1.finance.yahoo.com': 32,
+        'query2.finance.yahoo.com': 32,
+        'oauth2.googleapis.com': 16,
+        'openidconnect.googleapis.com': 16,
+        'www.googleapis.com': 4,
+        'accounts.google.com': 4
+    }
+    HTTP_TIMEOUT = 10  # seconds
+    YFINANCE_SHARED_SESSION = os.environ.get('YFINANCE_SHARED_SESSION', 'true').lower() == 'true'
+    
+    # Load pandas/NumPy/yfinance at startup instead of on first analysis request
+    PRELOAD_ANALYTICS = os.environ.get('PRELOAD_ANALYTICS', 'false').lower() == 'true'
+    
+    # Local price store configuration
+    PRICE_STORE_ENABLED = os.environ.get('PRICE_STORE_ENABLED', 'true').lower() == 'true'
+    PRICE_STORE_DIR = os.environ.get('PRICE_STORE_DIR') or os.path.join('data', 'prices')
+    PRICE_STORE_BACKFILL = '5y'  # history downloaded the first time a symbol is stored
+    
+    # Symbol universe configuration
+    UNIVERSE_DIR = os.environ.get('UNIVERSE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universes')
+    WATCHLIST_DIR = os.environ.get('WATCHLIST_DIR') or os.path.join('data', 'watchlists')
+    DEFAULT_UNIVERSE = os.environ.get('DEFAULT_UNIVERSE') or 'sp500'
+    WATCHLIST_MAX_SYMBOLS = 500
+    UNIVERSE_SHARD_SIZE = 250  # symbols scored per shard when scanning a universe
+    UNIVERSE_SCAN_PROCESSES = int(os.environ.get('UNIVERSE_SCAN_PROCESSES') or 1)  # >1 scans shards in worker processes
+    
+    # Instrumentation configuration
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for /metrics; without one it only answers in debug mode
+    SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS') or 2.0)  # slower requests print their stage breakdown
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'  # allow ?profile=1 on any request
+    PROFILE_INTERVAL = 0.005  # seconds between stack samples
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join('data', 'profiles')
+    
+    # Rolling statistics configuration
+    ROLLING_WINDOW = 252  # daily returns in the rolling Sharpe/volatility/beta/trend window
+    ROLLING_BENCHMARK = os.environ.get('ROLLING_BENCHMARK') or 'SPY'  # beta is measured against this symbol
+    
+    # Background precompute configuration
+    ANALYSIS_PRECOMPUTE_ENABLED = os.environ.get('ANALYSIS_PRECOMPUTE_ENABLED', 'true').lower() == 'true'
+    ANALYSIS_REFRESH_INTERVAL = int(os.environ.get('ANALYSIS_REFRESH_INTERVAL') or 300)  # seconds between recomputes
+    
+    # Fundamentals index configuration
+    FUNDAMENTALS_REFRESH_INTERVAL = int(os.environ.get('FUNDAMENTALS_REFRESH_INTERVAL') or 900)  # seconds between snapshot rebuilds
+    SCREEN_MAX_RESULTS = 500  # rows per /screen response
+    
+    # Asynchronous analysis job configuration
+    ANALYSIS_JOB_WORKERS = int(os.environ.get('ANALYSIS_JOB_WORKERS') or 4)
+    ANALYSIS_JOB_CHUNK_SIZE = 10  # symbols scored per task; rows stream as each chunk finishes
+    ANALYSIS_MAX_JOBS = 100  # unfinished jobs accepted at once; also finished jobs kept for polling
+    
+    # Live quote streaming configuration
+    QUOTE_POLL_INTERVAL = int(os.environ.get('QUOTE_POLL_INTERVAL') or 15)  # seconds between upstream polls while anyone is watching
+    QUOTE_MAX_SYMBOLS = 100  # symbols one stream may watch
+    QUOTE_HISTORY = 256  # published deltas kept so reconnecting streams can catch up
+    
+    # Growth projection configuration
+    PROJECTION_CACHE_SIZE = 5000  # fitted coefficient sets kept per (symbol, last bar, model)
+    MONTE_CARLO_PATHS = 10000  # default simulated paths per request
+    MONTE_CARLO_MAX_PATHS = 100000
+    MONTE_CARLO_CHUNK_SIZE = 1000  # paths generated at a time to bound memory
+    MONTE_CARLO_BAND_EVERY = 5  # trading days between percentile band points
+    MONTE_CARLO_PROCESSES = int(os.environ.get('MONTE_CARLO_PROCESSES') or 1)  # >1 splits chunks across a process pool
+    
+    # Compute pool configuration
+    COMPUTE_PROCESSES = int(os.environ.get('COMPUTE_PROCESSES') or 1)  # >1 runs factor and trend fits in worker processes
+    COMPUTE_MIN_COLUMNS = 64  # symbols per worker task; narrower batches are computed in the request thread
+    COMPUTE_MAX_MATRICES = 16  # shared price matrices kept, one per (period, universe shard)
+    
+    # Chart data configuration
+    CHART_DEFAULT_POINTS = 800  # points per series when the client does not send its pixel width
+    CHART_MAX_POINTS = 4000
+    CHART_MAX_AGE = 300  # seconds browsers reuse a chart before revalidating its ETag
+    
+    # Response cache configuration
+    RESPONSE_CACHE_SIZE = 2000  # serialized bodies kept per (endpoint, normalized parameters, data version)
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES') or 64 * 1024 * 1024)  # bodies plus compressed variants
+    RESPONSE_CACHE_TTL = 3600
+    RESPONSE_MIN_COMPRESS_SIZE = 512  # smaller bodies are sent uncompressed
+    PROJECTION_MAX_AGE = 300  # seconds browsers reuse a GET /growth_projection before revalidating
+    
+    # Portfolio optimizer configuration
+    COVARIANCE_CACHE_SIZE = 100  # shrunk covariances kept per (universe, window, as-of date)
+    COVARIANCE_WINDOW = 252  # trading days of returns used to estimate covariance
+    RISK_FREE_RATE = 0.02
+    ALLOCATION_MAX_BUDGETS = 1000  # budgets per /allocation_tiers request
+    
+    # Risk engine configuration
+    RISK_CACHE_SIZE = 200  # return matrices kept per (symbols, benchmark, window, as-of date)
+    RISK_WINDOW = 252  # trading days of returns behind VaR, CVaR and beta (benchmark is ROLLING_BENCHMARK)
+    RISK_CONFIDENCE = 0.95
+    RISK_CLUSTER_THRESHOLD = 0.5  # assets correlated at least this much on average share a cluster
+    RISK_MAX_PORTFOLIOS = 10000  # weight vectors per batched /portfolio_risk request
+    
+    # Backtest configuration
+    BACKTEST_MAX_YEARS = 10
+    BACKTEST_MAX_SWEEP = 50  # parameter combinations per sweep request
+    BACKTEST_PROCESSES = int(os.environ.get('BACKTEST_PROCESSES') or 1)  # >1 fans sweeps out to a process pool
+    MARKET_DATA_MAX_WORKERS = int(os.environ.get('MARKET_DATA_MAX_WORKERS') or 8)  # concurrent info fetches 
\ No newline at end of file
@@ -0,0 +1,213 @@
+import re
+import time
+import numpy as np
+
+# Numeric columns: name -> (Ticker.info key, scale). Dividend yield is a percentage, as in calculate_dividend_yield
+NUMERIC_FIELDS = {
+    'pe_ratio': ('trailingPE', 1.0),
+    'forward_pe': ('forwardPE', 1.0),
+    'dividend_yield': ('dividendYield', 100.0),
+    'price': ('regularMarketPrice', 1.0),
+    'market_cap': ('marketCap', 1.0),
+    'price_to_book': ('priceToBook', 1.0),
+    'beta': ('beta', 1.0)
+}
+TEXT_FIELDS = {
+    'company_name': 'longName',
+    'sector': 'sector'
+}
+ALIASES = {
+    'pe': 'pe_ratio',
+    'yield': 'dividend_yield',
+    'dividend': 'dividend_yield',
+    'cap': 'market_cap',
+    'pb': 'price_to_book',
+    'name': 'company_name'
+}
+OPERATORS = ('<', '<=', '>', '>=', '==', '!=')
+
+CLAUSE = re.compile(r"^\s*([A-Za-z_]+)\s*(<=|>=|==|!=|=|<|>)\s*(.+?)\s*$")
+# A quoted string (skipped over) or an 'and' between clauses
+CONJUNCTION = re.compile(r"""("[^"]*"|'[^']*')|\s+and\s+""", re.IGNORECASE)
+
+
+def field_name(name):
+    """Resolve a field or its alias; raises ValueError for unknown fields"""
+    name = ALIASES.get(name, name)
+    if name not in NUMERIC_FIELDS and name not in TEXT_FIELDS:
+        raise ValueError(f"Unknown field: {name}")
+    return name
+
+
+def split_clauses(expression):
+    """Split an expression on 'and', leaving quoted values such as "Oil and Gas" whole"""
+    clauses = []
+    start = 0
+    for match in CONJUNCTION.finditer(expression):
+        if match.group(1) is None:
+            clauses.append(expression[start:match.start()])
+            start = match.end()
+    clauses.append(expression[start:])
+    return clauses
+
+
+def parse_filters(expression):
+    """Parse 'pe < 25 and dividend_yield > 2' into [(field, operator, value)]"""
+    filters = []
+    for clause in split_clauses(expression.strip()):
+        if not clause:
+            continue
+        match = CLAUSE.match(clause)
+        if not match:
+            raise ValueError(f"Cannot parse filter: {clause}")
+        name, operator, value = match.groups()
+        if value[:1] in ('"', "'") and value[-1:] == value[:1]:
+            value = value[1:-1]
+        else:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"Filter value must be a number or a quoted string: {value}")
+        filters.append((name, '==' if operator == '=' else operator, value))
+    return filters
+
+
+def _number(value):
+    try:
+        value = float(value)
+        return value if np.isfinite(value) else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class FundamentalsIndex:
+    """Columnar snapshot of a few Ticker.info fields for a whole universe.
+
+    Every numeric column keeps a precomputed ascending sort order, so a range
+    filter is two binary searches plus a scatter into a boolean mask and a
+    sorted query is a pass over the already-ordered rows. Queries over
+    thousands of symbols take well under a millisecond.
+    """
+
+    def __init__(self, symbols, columns, text, as_of=None):
+        self.symbols = np.asarray(symbols, dtype=str)
+        self.columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        self.text = {name: np.asarray(values, dtype=str) for name, values in text.items()}
+        self.text_keys = {name: np.char.lower(values) for name, values in self.text.items()}  # case-insensitive matching
+        self.as_of = as_of or time.time()
+        self.positions = {symbol: i for i, symbol in enumerate(self.symbols.tolist())}
+        # argsort puts NaN last, so the first `valid` positions of each order are the known values
+        self.orders = {}
+        self.sorted_values = {}
+        self.valid = {}
+        for name, values in self.columns.items():
+            order = np.argsort(values, kind='stable')
+            self.orders[name] = order
+            self.sorted_values[name] = values[order]
+            self.valid[name] = int(np.count_nonzero(~np.isnan(values)))
+
+    @classmethod
+    def from_infos(cls, infos, as_of=None):
+        """Build the index from {symbol: Ticker.info}, keeping only the indexed fields"""
+        symbols = sorted(infos)
+        columns = {
+            name: [_number(infos[symbol].get(key)) * scale for symbol in symbols]
+            for name, (key, scale) in NUMERIC_FIELDS.items()
+        }
+        text = {
+            name: [str(infos[symbol].get(key) or (symbol if name == 'company_name' else '')) for symbol in symbols]
+            for name, key in TEXT_FIELDS.items()
+        }
+        return cls(symbols, columns, text, as_of)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def covers(self, symbols):
+        """True when every symbol has a row"""
+        return all(symbol in self.positions for symbol in symbols)
+
+    def company_name(self, symbol):
+        """Company name of a symbol, or the symbol itself when unknown"""
+        row = self.positions.get(symbol)
+        return str(self.text['company_name'][row]) if row is not None else symbol
+
+    def column(self, name, symbols):
+        """Values of a numeric column for the given symbols (NaN where unknown)"""
+        values = self.columns[field_name(name)]
+        rows = np.array([self.positions.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+        return np.where(rows >= 0, values[rows], np.nan) if len(rows) else np.empty(0)
+
+    def mask(self, name, operator, value):
+        """Boolean row mask of one filter clause"""
+        name = field_name(name)
+        if operator not in OPERATORS:
+            raise ValueError(f"Unknown operator: {operator}")
+        if name in self.text:
+            if operator not in ('==', '!='):
+                raise ValueError(f"{name} only supports == and !=")
+            matches = self.text_keys[name] == str(value).lower()
+            return matches if operator == '==' else ~matches
+        if isinstance(value, str):
+            raise ValueError(f"{name} must be compared with a number")
+
+        known = self.sorted_values[name][:self.valid[name]]
+        left = np.searchsorted(known, value, side='left')
+        right = np.searchsorted(known, value, side='right')
+        low, high = {
+            '<': (0, left), '<=': (0, right), '>': (right, len(known)),
+            '>=': (left, len(known)), '==': (left, right), '!=': (left, right)
+        }[operator]
+        mask = np.zeros(len(self.symbols), dtype=bool)
+        mask[self.orders[name][low:high]] = True
+        if operator == '!=':
+            mask[self.orders[name][:len(known)]] ^= True
+        return mask
+
+    def query(self, where=None, sort=None, descending=False, limit=50, fields=None):
+        """Return (rows, total matches) for a filter expression or [(field, op, value)] list.
+
+        Rows are sorted by `sort` (unknown values last) and carry `fields`
+        (every indexed field by default).
+        """
+        filters = parse_filters(where) if isinstance(where, str) else list(where or [])
+        mask = np.ones(len(self.symbols), dtype=bool)
+        for name, operator, value in filters:
+            mask &= self.mask(name, operator, value)
+
+        if sort:
+            sort = field_name(sort)
+            if sort not in self.orders:
+                raise ValueError(f"Cannot sort by {sort}")
+            order = self.orders[sort]
+            if descending:
+                valid = self.valid[sort]
+                order = np.concatenate((order[:valid][::-1], order[valid:]))
+            matched = order[mask[order]]
+        else:
+            matched = np.flatnonzero(mask)
+        return self.rows(matched[:limit], fields), int(len(matched))
+
+    def rows(self, indices, fields=None):
+        """JSON-friendly dicts for the given row positions"""
+        fields = [field_name(name) for name in fields] if fields else list(self.columns) + list(self.text)
+        values = {}
+        for name in fields:
+            if name in self.columns:
+                column = self.columns[name][indices]
+                values[name] = [None if value != value else value for value in column.tolist()]
+            else:
+                values[name] = self.text[name][indices].tolist()
+        symbols = self.symbols[indices].tolist()
+        return [
+            dict({'symbol': symbol}, **{name: values[name][i] for name in fields})
+            for i, symbol in enumerate(symbols)
+        ]
+
+    def stats(self):
+        """Return the size and age of the snapshot"""
+        return {
+            'symbols': len(self.symbols),
+            'fields': list(self.columns) + list(self.text),
+            'age_seconds': time.time() - self.as_of
+        }
@@ -0,0 +1,165 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobLimitError(Exception):
+    """Raised when a job is submitted while max_jobs jobs are still running or queued"""
+
+
+class AnalysisJob:
+    """A long-running analysis whose scored rows are published as they complete"""
+
+    def __init__(self, owner, symbols, chunk_size):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.symbols = list(symbols)
+        self.chunks = [self.symbols[i:i + chunk_size] for i in range(0, len(self.symbols), chunk_size)]
+        self.status = 'queued'
+        self.completed = 0  # symbols processed so far
+        self.rows = []  # scored rows in completion order
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._pending = len(self.chunks)
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+
+    def progress(self):
+        """Return a JSON-friendly progress summary"""
+        with self._cond:
+            total = len(self.symbols)
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'completed': self.completed,
+                'total': total,
+                'percent': 100.0 * self.completed / total if total else 100.0,
+                'rows_scored': len(self.rows),
+                'stocks': self.result,
+                'error': self.error,
+                'elapsed_seconds': (self.finished_at or time.time()) - self.created_at
+            }
+
+    def events(self, timeout=15):
+        """Yield (event, data) pairs: each scored row, progress updates, then done/failed.
+
+        Yields ('keepalive', None) when nothing happens for `timeout` seconds so
+        streaming connections are not closed by proxies.
+        """
+        sent = 0
+        while True:
+            with self._cond:
+                if sent == len(self.rows) and not self.done:
+                    self._cond.wait(timeout)
+                rows = self.rows[sent:]
+                sent += len(rows)
+                finished = self.done and sent == len(self.rows)
+                completed = self.completed
+            for row in rows:
+                yield 'row', row
+            if rows:
+                yield 'progress', {'completed': completed, 'total': len(self.symbols)}
+            elif not finished:
+                yield 'keepalive', None
+            if finished:
+                if self.status == 'done':
+                    yield 'done', {'stocks': self.result}
+                else:
+                    yield 'failed', {'error': self.error}
+                return
+
+    def _publish(self, chunk, rows):
+        with self._cond:
+            self.status = 'running'
+            self.completed += len(chunk)
+            self.rows.extend(rows)
+            self._pending -= 1
+            self._cond.notify_all()
+            return self._pending == 0
+
+    def _finish(self, result=None, error=None):
+        with self._cond:
+            self.result = result
+            self.error = error
+            self.status = 'failed' if error else 'done'
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+
+class JobManager:
+    """Runs analysis jobs chunk by chunk on a shared worker pool"""
+
+    def __init__(self, max_workers=4, chunk_size=10, max_jobs=100):
+        self.chunk_size = chunk_size
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, owner, symbols, score_chunk, finalize):
+        """Create a job that scores symbols in chunks and finalizes the collected rows.
+
+        score_chunk(symbols) returns a list of scored rows and finalize(rows)
+        returns the final result. Returns the new job immediately, or raises
+        JobLimitError if max_jobs jobs are still unfinished.
+        """
+        job = AnalysisJob(owner, symbols, self.chunk_size)
+        with self._lock:
+            if sum(not existing.done for existing in self._jobs.values()) >= self.max_jobs:
+                raise JobLimitError(f"Too many analysis jobs in progress (limit {self.max_jobs}); try again shortly")
+            self._jobs[job.id] = job
+            self._evict()
+
+        if not job.chunks:
+            self._finalize(job, finalize)
+            return job
+
+        for chunk in job.chunks:
+            self._executor.submit(self._run_chunk, job, chunk, score_chunk, finalize)
+        return job
+
+    def _run_chunk(self, job, chunk, score_chunk, finalize):
+        try:
+            rows = score_chunk(chunk)
+        except Exception as e:
+            print(f"Error scoring {chunk}: {e}")
+            rows = []
+        if job._publish(chunk, rows):
+            self._finalize(job, finalize)
+
+    def _finalize(self, job, finalize):
+        try:
+            job._finish(result=finalize(list(job.rows)))
+        except Exception as e:
+            job._finish(error=str(e))
+
+    def get(self, job_id, owner=None):
+        """Return a job by id, or None if unknown or owned by someone else"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond max_jobs; caller must hold the lock"""
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+
+    def stats(self):
+        """Return counts of jobs by status"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {'jobs': len(self._jobs), 'by_status': counts}
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Load test for the Stock Portfolio Analyzer endpoints.
+
+Serves the app over HTTP against the offline synthetic market (no network
+needed), then measures per-endpoint latency percentiles, throughput under
+concurrent clients and memory growth across rounds. Results are compared
+with a baseline recorded on the same machine and the run fails on a
+regression. The baseline is local (not committed): timings from another
+machine say nothing about this one.
+
+Run: python3 loadtest.py --save-baseline  # record a baseline on this machine
+     python3 loadtest.py                  # compare with loadtest_baseline.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loadtest_baseline.json')
+
+
+def configure_environment(args, directory):
+    """Point the app at the synthetic market and throwaway stores before it is imported"""
+    from universes import Universe
+
+    sp500 = Universe.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universes', 'sp500.txt'))
+    from replay import synthetic_symbols
+    symbols = synthetic_symbols(args.symbols, sp500.all_symbols())
+    os.makedirs(os.path.join(directory, 'universes'))
+    with open(os.path.join(directory, 'universes', 'loadtest.txt'), 'w') as f:
+        f.write('\n'.join(symbols) + '\n')
+
+    os.environ.update({
+        'MARKET_DATA_SOURCE': args.source,
+        'MARKET_DATA_FIXTURES': args.fixtures or os.path.join('data', 'fixtures'),
+        'SIMULATED_LATENCY': str(args.latency),
+        'SIMULATED_ERROR_RATE': str(args.error_rate),
+        'USER_STORE_URL': 'memory://',
+        'PRICE_STORE_DIR': os.path.join(directory, 'prices'),
+        'UNIVERSE_DIR': os.path.join(directory, 'universes'),
+        'WATCHLIST_DIR': os.path.join(directory, 'watchlists'),
+        'DEFAULT_UNIVERSE': 'loadtest'
+    })
+    return symbols
+
+
+def rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, in KB on Linux
+
+
+def percentiles(samples):
+    """Latency summary in milliseconds"""
+    import numpy as np
+
+    values = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(values.max()), 'mean': float(values.mean())}
+
+
+class LoadTest:
+    """Runs request scenarios against a live HTTP server with one signed-in session per client"""
+
+    def __init__(self, base_url, cookie, symbols):
+        self.base_url = base_url
+        self.cookie = cookie
+        self.symbols = symbols
+        self.selected = []
+        self._lock = threading.Lock()
+        self.scenarios = {
+            'analyze': lambda i: ('POST', '/analyze', {}),
+            'screen': lambda i: ('GET', '/screen?where=pe < 25 and dividend_yield > 1&sort=dividend_yield&order=desc&limit=50', None),
+            'create_portfolio': lambda i: ('POST', '/create_portfolio', {
+                'selected_stocks': self.selected,
+                'portfolio_amount': 100000,
+                'strategy': ('equal', 'min_variance', 'max_sharpe')[i % 3]
+            }),
+            # Rotate through 50 symbols so the mix has cold and warm fits
+            'growth_projection': lambda i: ('POST', '/growth_projection', {'symbol': self.symbols[i % 50], 'months': 12}),
+            'portfolio_projection': lambda i: ('POST', '/portfolio_projection', {
+                'symbols': [stock['symbol'] for stock in self.selected],
+                'months': 12,
+                'paths': 2000,
+                'seed': i
+            }),
+            'quotes': lambda i: ('GET', '/quotes?symbols=' + ','.join(stock['symbol'] for stock in self.selected), None)
+        }
+
+    def session(self):
+        import requests
+
+        session = requests.Session()
+        session.cookies.set('session', self.cookie)
+        return session
+
+    def request(self, session, name, i):
+        """Send one scenario request; returns (seconds, ok)"""
+        method, path, body = self.scenarios[name](i)
+        started = time.perf_counter()
+        response = session.request(method, self.base_url + path, json=body, timeout=120)
+        elapsed = time.perf_counter() - started
+        ok = response.status_code == 200 and response.json().get('success', False)
+        return elapsed, ok
+
+    def warm_up(self):
+        """One cold request per scenario; also picks the stocks later requests use"""
+        session = self.session()
+        cold = {}
+        started = time.perf_counter()
+        response = session.post(self.base_url + '/analyze', json={}, timeout=600).json()
+        cold['analyze'] = (time.perf_counter() - started) * 1000
+        self.selected = [stock for stock in response['stocks'] if not stock.get('is_mock')][:5]
+        if not self.selected:
+            raise RuntimeError(f"Analysis returned no real stocks: {response}")
+        for name in self.scenarios:
+            if name != 'analyze':
+                elapsed, ok = self.request(session, name, 0)
+                cold[name] = elapsed * 1000
+        return cold
+
+    def sequential(self, requests):
+        """Single-client latency of each scenario"""
+        session = self.session()
+        results = {}
+        for name in self.scenarios:
+            timings = []
+            for i in range(requests):
+                elapsed, ok = self.request(session, name, i + 1)
+                timings.append(elapsed)
+            results[name] = percentiles(timings)
+        return results
+
+    def concurrent(self, clients, requests):
+        """`clients` threads each sending `requests` requests round-robin over the scenarios"""
+        names = list(self.scenarios)
+        timings = {name: [] for name in names}
+        errors = [0]
+
+        def client(c):
+            session = self.session()
+            for i in range(requests):
+                name = names[(c + i) % len(names)]
+                elapsed, ok = self.request(session, name, c * requests + i)
+                with self._lock:
+                    timings[name].append(elapsed)
+                    errors[0] += not ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(client, range(clients)))
+        seconds = time.perf_counter() - started
+        total = clients * requests
+        return {
+            'requests': total,
+            'errors': errors[0],
+            'seconds': seconds,
+            'throughput_rps': total / seconds,
+            'latency_ms': {name: percentiles(samples) for name, samples in timings.items() if samples}
+        }
+
+
+def run(args):
+    """Start the app on a local port and run every phase; returns the results dict"""
+    directory = tempfile.mkdtemp(prefix='loadtest-')
+    symbols = configure_environment(args, directory)
+
+    from werkzeug.serving import make_server
+    import app as stocks_app
+    from models import User
+
+    stocks_app.user_session.add_user(User('loadtest', 'loadtest@example.com', 'Load Test'))
+    cookie = stocks_app.app.session_interface.get_signing_serializer(stocks_app.app).dumps({'_user_id': 'loadtest', '_fresh': True})
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request access log
+    server = make_server('127.0.0.1', 0, stocks_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test = LoadTest(f"http://127.0.0.1:{server.server_port}", cookie, symbols)
+
+    try:
+        print(f"Load test: {len(symbols)} symbols from the {args.source} source, {args.clients} clients")
+        started = time.perf_counter()
+        cold = test.warm_up()
+        print(f"  - Warm-up:     {time.perf_counter() - started:8.2f} s")
+        gc.collect()
+        memory = {'after_warm_up': rss_mb(), 'rounds': []}
+
+        latency = test.sequential(args.requests)
+        concurrent = None
+        for round_number in range(args.rounds):
+            concurrent = test.concurrent(args.clients, args.requests)
+            gc.collect()
+            memory['rounds'].append(rss_mb())
+            print(f"  - Round {round_number + 1}:     {concurrent['throughput_rps']:8.1f} req/s, "
+                  f"{concurrent['errors']} errors, RSS {memory['rounds'][-1]:.0f} MB")
+        # Growth between the first and last round; warm-up allocations are excluded
+        memory['growth'] = memory['rounds'][-1] - memory['rounds'][0]
+    finally:
+        server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        'parameters': {
+            'source': args.source,
+            'symbols': len(symbols),
+            'clients': args.clients,
+            'requests': args.requests,
+            'rounds': args.rounds,
+            'latency': args.latency,
+            'error_rate': args.error_rate
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'recorded_at': datetime.utcnow().isoformat() + 'Z'
+        },
+        'cold_ms': cold,
+        'latency_ms': latency,
+        'concurrent': concurrent,
+        'memory_mb': memory
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms, memory_tolerance_mb):
+    """Return a list of regression messages against the baseline"""
+    regressions = []
+    for name, current in results['latency_ms'].items():
+        previous = baseline['latency_ms'].get(name)
+        if previous is None:
+            continue
+        for key in ('p50', 'p95'):
+            # Ignore sub-millisecond jitter on fast endpoints
+            if current[key] > previous[key] * (1 + tolerance) and current[key] - previous[key] > min_delta_ms:
+                regressions.append(f"{name} {key} {current[key]:.1f} ms vs {previous[key]:.1f} ms baseline")
+
+    throughput = results['concurrent']['throughput_rps']
+    previous = baseline['concurrent']['throughput_rps']
+    if throughput < previous / (1 + tolerance):
+        regressions.append(f"throughput {throughput:.1f} req/s vs {previous:.1f} req/s baseline")
+    if results['concurrent']['errors'] > baseline['concurrent']['errors']:
+        regressions.append(f"{results['concurrent']['errors']} failed requests vs {baseline['concurrent']['errors']} in the baseline")
+
+    growth = results['memory_mb']['growth']
+    if growth > max(baseline['memory_mb']['growth'], 0) + memory_tolerance_mb:
+        regressions.append(f"memory grew {growth:.0f} MB across rounds vs {baseline['memory_mb']['growth']:.0f} MB baseline")
+    return regressions
+
+
+def report(results, baseline):
+    """Print the latency table, with the baseline alongside when there is one"""
+    print(f"\n{'endpoint':<22}{'cold':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'load p95':>10}{'base p95':>10}")
+    for name, latency in results['latency_ms'].items():
+        loaded = results['concurrent']['latency_ms'].get(name, {}).get('p95', float('nan'))
+        previous = (baseline or {}).get('latency_ms', {}).get(name, {}).get('p95', float('nan'))
+        print(f"{name:<22}{results['cold_ms'][name]:9.1f}{latency['p50']:9.1f}{latency['p95']:9.1f}{latency['p99']:9.1f}{loaded:10.1f}{previous:10.1f}")
+    memory = results['memory_mb']
+    print(f"\nThroughput: {results['concurrent']['throughput_rps']:.1f} req/s; "
+          f"RSS {memory['after_warm_up']:.0f} MB after warm-up, {memory['growth']:+.1f} MB across rounds")
+
+
+def main():
+    """Run the load test and compare with, or save, the baseline"""
+    parser = argparse.ArgumentParser(description='Load test the analyzer endpoints against the offline market')
+    parser.add_argument('--source', default='synthetic', choices=['synthetic', 'replay'])
+    parser.add_argument('--fixtures', help='fixture directory for --source replay')
+    parser.add_argument('--symbols', type=int, default=600, help='universe size')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=30, help='requests per scenario (sequential) and per client (concurrent)')
+    parser.add_argument('--rounds', type=int, default=3, help='concurrent rounds; memory growth is measured across them')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated upstream latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of upstream calls failing with 429/503')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative slowdown before failing')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='ignore latency changes smaller than this')
+    parser.add_argument('--memory-tolerance-mb', type=float, default=50.0)
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print("No baseline to compare with; run with --save-baseline first")
+        return 0
+    if baseline['parameters'] != results['parameters']:
+        print(f"Parameters differ from the baseline ({baseline['parameters']}); not comparing")
+        return 0
+    machine = {key: baseline['environment'].get(key) for key in ('python', 'cpu_count')}
+    if machine != {key: results['environment'][key] for key in machine}:
+        print(f"Baseline was recorded on another machine ({machine}); not comparing")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms, args.memory_tolerance_mb)
+    for message in regressions:
+        print(f"✗ Regression: {message}")
+    if not regressions:
+        print("✓ No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from cache import TTLCache
+from metrics import metrics
+from rate_limiter import scheduler as default_scheduler, RequestScheduler, PRIORITY_BULK
+
+
+class YahooFinanceSource:
+    """Upstream source backed by Yahoo Finance (via yfinance)"""
+
+    def __init__(self, shared_session=None):
+        self.shared_session = Config.YFINANCE_SHARED_SESSION if shared_session is None else shared_session
+        self._session = None
+
+    def session_kwargs(self):
+        """Route yfinance through the pooled keep-alive transport unless disabled"""
+        if not self.shared_session:
+            return {}
+        if self._session is None:
+            from transport import http_transport, BROWSER_HEADERS
+            self._session = http_transport.named_session('yahoo', BROWSER_HEADERS)
+        return {'session': self._session}
+
+    def download(self, symbols, period=None, start=None):
+        """Download daily OHLC history for many symbols in one batched call"""
+        import yfinance as yf
+        
+        data = yf.download(
+            symbols,
+            period=None if start else period,
+            start=start,
+            group_by='ticker',
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+            **self.session_kwargs()
+        )
+        return split_download(data, symbols)
+
+    def info(self, symbol):
+        """Fetch the info dictionary for a single symbol"""
+        import yfinance as yf
+        
+        return yf.Ticker(symbol, **self.session_kwargs()).info
+
+    def quotes(self, symbols):
+        """Latest trade price for many symbols from one batched intraday download"""
+        import yfinance as yf
+        
+        data = yf.download(
+            symbols,
+            period='1d',
+            interval='1m',
+            group_by='ticker',
+            threads=True,
+            progress=False,
+            **self.session_kwargs()
+        )
+        prices = {}
+        for symbol, hist in split_download(data, symbols).items():
+            closes = hist['Close'].dropna()
+            if len(closes) > 0:
+                prices[symbol] = float(closes.iloc[-1])
+        return prices
+
+
+def split_download(data, symbols):
+    """Split a batched yf.download frame into one DataFrame per symbol"""
+    import pandas as pd
+    
+    histories = {}
+    if data is None or len(data) == 0:
+        return histories
+
+    if isinstance(data.columns, pd.MultiIndex):
+        available = set(data.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol in available:
+                hist = data[symbol].dropna(how='all')
+                if len(hist) > 0:
+                    histories[symbol] = hist
+    elif len(symbols) == 1:
+        # A single ticker comes back with flat OHLC columns
+        hist = data.dropna(how='all')
+        if len(hist) > 0:
+            histories[symbols[0]] = hist
+
+    return histories
+
+
+def create_source(name):
+    """Build the upstream source named by MARKET_DATA_SOURCE: yahoo, synthetic or replay"""
+    if name == 'yahoo':
+        return YahooFinanceSource()
+    from replay import SyntheticSource, ReplaySource
+    if name == 'synthetic':
+        return SyntheticSource(latency=Config.SIMULATED_LATENCY, error_rate=Config.SIMULATED_ERROR_RATE)
+    if name == 'replay':
+        return ReplaySource(Config.MARKET_DATA_FIXTURES, latency=Config.SIMULATED_LATENCY, error_rate=Config.SIMULATED_ERROR_RATE)
+    raise ValueError(f"Unsupported market data source: {name}")
+
+
+class MarketDataProvider:
+    """Fetches price history and info for a whole symbol universe at once"""
+
+    def __init__(self, source=None, scheduler=None, store=None, store_dir=None, max_workers=None, info_ttl=None, history_ttl=None, max_entries=None):
+        self.source = source or YahooFinanceSource()
+        self.scheduler = scheduler or default_scheduler
+        self.store = store
+        self.store_dir = store_dir  # opened on first use so importing stays cheap
+        self.max_workers = max_workers or Config.MARKET_DATA_MAX_WORKERS
+        max_entries = max_entries or Config.STOCK_CACHE_MAX_ENTRIES
+        history_ttl = history_ttl or Config.HISTORY_CACHE_DURATION
+        self.info_cache = TTLCache(max_size=max_entries, ttl=info_ttl or Config.STOCK_CACHE_DURATION)
+        self.history_cache = TTLCache(max_size=max_entries, ttl=history_ttl)
+        # Symbols whose stored history was refreshed recently
+        self.sync_cache = TTLCache(max_size=max_entries, ttl=history_ttl)
+        self.rolling = None
+
+    def _upstream(self, call, symbols, func, *args, priority=PRIORITY_BULK, cost=1, **kwargs):
+        """Run a source call under the rate limiter, counting symbols, outcomes and time"""
+        metrics.inc('upstream_symbols_total', symbols, call=call)
+        started = time.perf_counter()
+        try:
+            result = self.scheduler.call(func, *args, priority=priority, cost=cost, **kwargs)
+        except Exception:
+            metrics.inc('upstream_calls_total', call=call, outcome='error')
+            raise
+        finally:
+            metrics.observe('upstream_seconds', time.perf_counter() - started, call=call)
+        metrics.inc('upstream_calls_total', call=call, outcome='ok')
+        return result
+
+    def get_history(self, symbols, period="1y", priority=PRIORITY_BULK):
+        """Return {symbol: DataFrame} of daily history, downloading cache misses in one batch"""
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+
+        def load(keys):
+            missing = [symbol for symbol, _ in keys]
+            if self._open_store() is not None:
+                return {(symbol, period): hist for symbol, hist in self._read_store(missing, period, priority).items()}
+            try:
+                # yfinance issues one chart request per symbol, so charge one token each
+                histories = self._upstream(
+                    'history', len(missing), self.source.download, missing, period,
+                    priority=priority, cost=len(missing)
+                )
+            except Exception as e:
+                print(f"Error downloading history: {e}")
+                return {}
+            return {(symbol, period): hist for symbol, hist in histories.items()}
+
+        keys = [(symbol, period) for symbol in symbols]
+        cached = self.history_cache.get_many_or_load(keys, load)
+        return {symbol: cached[(symbol, p)] for symbol, p in keys if (symbol, p) in cached}
+
+    def _open_store(self):
+        """Return the price store, opening it from store_dir on first use"""
+        if self.store is None and self.store_dir:
+            from price_store import PriceStore
+            self.store = PriceStore(self.store_dir)
+        return self.store
+
+    def _read_store(self, symbols, period, priority):
+        """Bring the stored histories up to date, then read the requested window"""
+        from price_store import period_start
+        
+        self.sync_cache.get_many_or_load(symbols, lambda stale: self.sync_store(stale, priority))
+        start = period_start(period)
+        histories = {}
+        for symbol in symbols:
+            hist = self.store.read(symbol, start)
+            if hist is not None and len(hist) > 0:
+                histories[symbol] = hist
+        return histories
+
+    def sync_store(self, symbols, priority=PRIORITY_BULK):
+        """Fetch only the bars after each symbol's last stored date and append them.
+
+        Symbols never stored are backfilled with Config.PRICE_STORE_BACKFILL of
+        history. Returns {symbol: True} for symbols that are now up to date.
+        """
+        groups = {}
+        for symbol in symbols:
+            groups.setdefault(self.store.last_date(symbol), []).append(symbol)
+
+        synced = {}
+        for last_date, group in groups.items():
+            try:
+                if last_date is None:
+                    histories = self._upstream(
+                        'history', len(group), self.source.download, group, period=Config.PRICE_STORE_BACKFILL,
+                        priority=priority, cost=len(group)
+                    )
+                else:
+                    # Start at the last stored bar so a partial day gets refreshed
+                    histories = self._upstream(
+                        'history', len(group), self.source.download, group, start=last_date.strftime('%Y-%m-%d'),
+                        priority=priority, cost=len(group)
+                    )
+            except Exception as e:
+                print(f"Error updating stored history: {e}")
+                continue
+            for symbol, hist in histories.items():
+                self.store.append(symbol, hist)
+                synced[symbol] = True
+        return synced
+
+    def uses_store(self):
+        """True when history is served from the local price store"""
+        return self._open_store() is not None
+
+    def _open_rolling(self):
+        """Return the rolling statistics engine, persisted in the price store when there is one"""
+        if self.rolling is None:
+            from rolling import RollingStatsEngine
+            store = self._open_store()
+            self.rolling = RollingStatsEngine(
+                window=Config.ROLLING_WINDOW,
+                directory=store.root if store is not None else None
+            )
+        return self.rolling
+
+    def get_rolling_metrics(self, symbols, priority=PRIORITY_BULK):
+        """Return {symbol: rolling Sharpe/volatility/beta/trend}, applying only bars not seen before"""
+        symbols = list(symbols)
+        engine = self._open_rolling()
+        benchmark_symbol = Config.ROLLING_BENCHMARK
+        if self.store is not None:
+            from price_store import period_start
+            
+            # Bring the store up to date, then read just the bars after each symbol's state
+            self.sync_cache.get_many_or_load(symbols + [benchmark_symbol], lambda stale: self.sync_store(stale, priority))
+            benchmark = self.store.read(benchmark_symbol, period_start('2y'))
+            for symbol in symbols:
+                engine.catch_up(symbol, self.store.read(symbol, engine.last_date(symbol)), benchmark)
+        else:
+            histories = self.get_history(symbols + [benchmark_symbol], period="2y", priority=priority)
+            benchmark = histories.get(benchmark_symbol)
+            for symbol in symbols:
+                engine.catch_up(symbol, histories.get(symbol), benchmark)
+        return engine.metrics(symbols)
+
+    def get_info(self, symbols, priority=PRIORITY_BULK):
+        """Return {symbol: info dict}, fetching each cache miss once in a bounded thread pool"""
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+
+        def fetch(symbol):
+            try:
+                return symbol, self._upstream('info', 1, self.source.info, symbol, priority=priority)
+            except Exception as e:
+                print(f"Error fetching info for {symbol}: {e}")
+                return symbol, None
+
+        def load(missing):
+            workers = min(self.max_workers, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(fetch, missing)
+            return {symbol: info for symbol, info in results if info}
+
+        return self.info_cache.get_many_or_load(symbols, load)
+
+    def get_quotes(self, symbols, priority=PRIORITY_BULK):
+        """Return {symbol: latest price} from one rate-limited batched request (never cached)"""
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        return self._upstream('quotes', len(symbols), self.source.quotes, symbols, priority=priority)
+
+    def scheduler_stats(self):
+        """Return rate limiter queue, wait and retry metrics"""
+        return self.scheduler.stats()
+
+    def source_stats(self):
+        """Return the source name, plus call and injected error counts for offline sources"""
+        stats = getattr(self.source, 'stats', None)
+        return stats() if stats else {'source': type(self.source).__name__}
+
+    def cache_stats(self):
+        """Return hit/miss counters for the info and history caches"""
+        return {
+            'info': self.info_cache.stats(),
+            'history': self.history_cache.stats(),
+            'store_sync': self.sync_cache.stats(),
+            'rolling': self.rolling.stats() if self.rolling is not None else None
+        }
+
+    def clear_cache(self):
+        """Drop every cached info dictionary and history frame"""
+        self.info_cache.clear()
+        self.history_cache.clear()
+        self.sync_cache.clear()
+
+
+# Global market data provider instance; offline sources are not held to Yahoo's rate limit
+market_data = MarketDataProvider(
+    source=create_source(Config.MARKET_DATA_SOURCE),
+    scheduler=None if Config.MARKET_DATA_SOURCE == 'yahoo' else RequestScheduler(
+        Config.SIMULATED_RATE_LIMIT,
+        max_retries=Config.YAHOO_FINANCE_MAX_RETRIES
+    ),
+    store_dir=Config.PRICE_STORE_DIR if Config.PRICE_STORE_ENABLED else None
+)
@@ -0,0 +1,212 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PREFIX = 'stocks_analyzer_'
+
+# Latency buckets in seconds, from cached lookups to cold universe scans
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    'http_requests_total': 'HTTP requests by endpoint, method and status',
+    'http_request_seconds': 'Time to build each HTTP response',
+    'stage_seconds': 'Time spent in each fetch, compute and serialize stage',
+    'stage_items_total': 'Symbols processed by each stage',
+    'upstream_calls_total': 'Market data source calls by kind and outcome',
+    'upstream_seconds': 'Market data source call time, including rate limiter waits',
+    'upstream_symbols_total': 'Symbols requested from the market data source',
+    'mock_fallbacks_total': 'Responses filled with mock data because real data was missing'
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Metrics:
+    """Process-wide counters and latency histograms, plus a per-request stage breakdown.
+
+    Spans always feed the histograms; while a request trace is active on the
+    current thread they also add up per stage, which is what the
+    Server-Timing header and slow request log report.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in a histogram"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def span(self, stage, items=None):
+        """Time a stage; `items` counts the symbols it processed"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe('stage_seconds', elapsed, stage=stage)
+            if items:
+                self.inc('stage_items_total', items, stage=stage)
+            trace = getattr(self._local, 'trace', None)
+            if trace is not None:
+                trace[stage] = trace.get(stage, 0.0) + elapsed
+
+    def start_trace(self):
+        """Start collecting a stage breakdown for the current thread's request"""
+        self._local.trace = {}
+
+    def end_trace(self):
+        """Stop collecting and return {stage: seconds} for the current request"""
+        trace = getattr(self._local, 'trace', None)
+        self._local.trace = None
+        return trace or {}
+
+    def snapshot(self):
+        """Return copies of the counters and histograms"""
+        with self._lock:
+            return dict(self.counters), {key: list(value) for key, value in self.histograms.items()}
+
+    def render(self, gauges=()):
+        """Prometheus text exposition of the metrics plus (name, labels, value) gauges read at scrape time"""
+        counters, histograms = self.snapshot()
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {PREFIX}{name} {HELP[name]}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, 'counter')
+            lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(histograms.items()):
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), histogram[:-1]):
+                cumulative += count
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {histogram[-1]}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {cumulative}")
+
+        for name, labels, value in gauges:
+            if value is None:
+                continue
+            describe(name, 'counter' if name.endswith('_total') else 'gauge')
+            lines.append(f"{PREFIX}{name}{_format_labels(tuple(sorted((k, str(v)) for k, v in labels.items())))} {float(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples Python stacks at a fixed interval and aggregates them as folded stacks.
+
+    With no thread_id every busy thread is sampled under its thread name, so
+    work a request hands to snapshot or pool threads shows up too. The output
+    is the collapsed format flame graph tools read: one semicolon-separated
+    stack per line followed by its sample count.
+    """
+
+    IDLE_MODULES = ('threading.py', 'selectors.py', 'socketserver.py', 'queue.py')
+
+    def __init__(self, thread_id=None, interval=0.005, max_depth=64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frames = {self.thread_id: frames[self.thread_id]} if self.thread_id in frames else {}
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = False
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                if self.thread_id is None and os.path.basename(frame.f_code.co_filename) in self.IDLE_MODULES:
+                    continue  # parked in a lock, queue or select: not doing work
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if self.thread_id is None:
+                    stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+                sampled = True
+            self.samples += sampled
+
+    def folded(self):
+        """Collapsed stacks, most sampled first"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+    def top(self, limit=10):
+        """Functions with the most samples at the top of the stack"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(limit)
+
+    def dump(self, directory, name):
+        """Write the folded stacks to directory and return the file path"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{threading.get_ident()}.folded")
+        with open(path, 'w') as f:
+            f.write(self.folded())
+        return path
+
+
+# Global metrics registry
+metrics = Metrics()
@@ -1,9 +1,19 @@
-from flask_login import UserMixin
 from datetime import datetime
 import json
+import sqlite3
+import threading
+from cache import TTLCache
+from config import Config
 
-class User(UserMixin):
-    """User model for authentication"""
+class User:
+    """User model for authentication (implements the Flask-Login user interface)"""
+    
+    __slots__ = ('id', 'email', 'name', 'picture', 'created_at', 'last_login')
+    
+    # Every stored user has completed the OAuth login
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
     
     def __init__(self, user_id, email, name, picture=None):
         self.id = user_id
@@ -13,6 +23,18 @@ class User(UserMixin):
         self.created_at = datetime.utcnow()
         self.last_login = datetime.utcnow()
     
+    def get_id(self):
+        """Return the id Flask-Login keeps in the session cookie"""
+        return str(self.id)
+    
+    def __eq__(self, other):
+        return isinstance(other, User) and self.get_id() == other.get_id()
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    __hash__ = None
+    
     def to_dict(self):
         """Convert user object to dictionary for session storage"""
         return {
@@ -37,25 +59,131 @@ class User(UserMixin):
         user.last_login = datetime.fromisoformat(data['last_login'])
         return user
 
-class UserSession:
-    """Simple session storage for demo purposes"""
+class MemoryUserStore:
+    """Per-process user storage; only suitable for a single worker"""
     
     def __init__(self):
         self.users = {}
     
+    def save(self, user_id, data):
+        self.users[user_id] = data
+    
+    def load(self, user_id):
+        return self.users.get(user_id)
+    
+    def delete(self, user_id):
+        self.users.pop(user_id, None)
+
+class SQLiteUserStore:
+    """User storage in a SQLite file shared by every worker on the host"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def _connection(self):
+        """Open the database on first use; caller must hold the lock"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            if self.path != ':memory:':
+                conn.execute('PRAGMA journal_mode=WAL')  # readers do not block the writer
+            conn.execute('CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at TEXT NOT NULL)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def save(self, user_id, data):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO users (id, data, updated_at) VALUES (?, ?, ?)',
+                (user_id, json.dumps(data), datetime.utcnow().isoformat())
+            )
+            conn.commit()
+    
+    def load(self, user_id):
+        with self._lock:
+            row = self._connection().execute('SELECT data FROM users WHERE id = ?', (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def delete(self, user_id):
+        with self._lock:
+            conn = self._connection()
+            conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+            conn.commit()
+
+class RedisUserStore:
+    """User storage in Redis (or anything speaking its get/set/delete API), shared across nodes"""
+    
+    def __init__(self, client, prefix='user:', ttl=None):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl  # seconds; entries expire like the login session they back
+    
+    def save(self, user_id, data):
+        self.client.set(self.prefix + user_id, json.dumps(data), ex=self.ttl)
+    
+    def load(self, user_id):
+        value = self.client.get(self.prefix + user_id)
+        return json.loads(value) if value else None
+    
+    def delete(self, user_id):
+        self.client.delete(self.prefix + user_id)
+
+def create_user_store(url, ttl=None):
+    """Build a user store from a URL: sqlite:///path, redis://host:port/db or memory://"""
+    if url.startswith('sqlite:///'):
+        return SQLiteUserStore(url[len('sqlite:///'):] or ':memory:')
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisUserStore(redis.Redis.from_url(url), ttl=ttl)
+    if url.startswith('memory://'):
+        return MemoryUserStore()
+    raise ValueError(f"Unsupported user store URL: {url}")
+
+class UserSession:
+    """User storage shared across workers, with a small in-process LRU in front"""
+    
+    def __init__(self, store=None, cache_size=1000, cache_ttl=60):
+        self.store = store or MemoryUserStore()
+        # Short TTL so a user removed by another worker disappears here too
+        self.cache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+    
     def add_user(self, user):
         """Add or update user in session storage"""
-        self.users[user.id] = user
+        user_id = str(user.id)
+        self.store.save(user_id, user.to_dict())
+        self.cache.set(user_id, user)
         return user
     
     def get_user(self, user_id):
         """Get user by ID"""
-        return self.users.get(user_id)
+        user_id = str(user_id)
+        
+        def load():
+            try:
+                data = self.store.load(user_id)
+                return User.from_dict(data) if data else None
+            except Exception as e:
+                print(f"Error loading user {user_id}: {e}")
+                return None
+        
+        return self.cache.get_or_load(user_id, load)
     
     def remove_user(self, user_id):
         """Remove user from session storage"""
-        if user_id in self.users:
-            del self.users[user_id]
+        user_id = str(user_id)
+        self.store.delete(user_id)
+        self.cache.invalidate(user_id)
+    
+    def stats(self):
+        """Return the backend name and LRU cache statistics"""
+        return dict(self.cache.stats(), backend=type(self.store).__name__)
 
 # Global session storage instance
-user_session = UserSession() 
\ No newline at end of file
+user_session = UserSession(
+    create_user_store(Config.USER_STORE_URL, ttl=int(Config.PERMANENT_SESSION_LIFETIME.total_seconds())),
+    cache_size=Config.USER_CACHE_SIZE,
+    cache_ttl=Config.USER_CACHE_TTL
+)
\ No newline at end of file
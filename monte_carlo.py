@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config import Config
+
+METHODS = ('gbm', 'bootstrap')
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+TRADING_DAYS_PER_MONTH = 21  # one step per trading day; trend projections use the same horizon
+
+
+def log_returns_matrix(prices):
+    """Daily log returns of a dates x assets price array, dropping rows with gaps"""
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim == 1:
+        prices = prices[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(prices), axis=0)
+    return returns[~np.isnan(returns).any(axis=1)]
+
+
+def checkpoint_steps(n_steps, band_every):
+    """Steps (1-based) at which path values are recorded; always includes the horizon"""
+    steps = np.arange(band_every, n_steps + 1, band_every)
+    if len(steps) == 0 or steps[-1] != n_steps:
+        steps = np.append(steps, n_steps)
+    return steps
+
+
+def _simulate_chunk(args):
+    """Simulate one chunk of paths; returns cumulative log returns at the checkpoints.
+
+    Runs in worker processes too, so it only takes plain arrays and a seed.
+    """
+    method, seed, n_paths, checkpoints, drift, cholesky, log_returns, antithetic = args
+    rng = np.random.default_rng(seed)
+    n_assets = len(drift)
+
+    if method == 'gbm':
+        # GBM increments are independent, so the sum over the days between two
+        # checkpoints is drawn directly: N(days * mu, days * cov)
+        days = np.diff(np.concatenate(([0], checkpoints))).astype(np.float32)
+        if antithetic:
+            half = rng.standard_normal(((n_paths + 1) // 2, len(checkpoints), n_assets), dtype=np.float32)
+            shocks = np.concatenate([half, -half])[:n_paths]
+        else:
+            shocks = rng.standard_normal((n_paths, len(checkpoints), n_assets), dtype=np.float32)
+        increments = shocks @ cholesky.T.astype(np.float32)
+        increments *= np.sqrt(days)[None, :, None]
+        increments += drift.astype(np.float32)[None, None, :] * days[None, :, None]
+        np.cumsum(increments, axis=1, out=increments)
+        return increments
+
+    # Bootstrap: resample whole historical days so cross-asset correlation is preserved
+    sampled = rng.integers(0, len(log_returns), size=(n_paths, checkpoints[-1]))
+    increments = log_returns.astype(np.float32)[sampled]
+    np.cumsum(increments, axis=1, out=increments)
+    return increments[:, checkpoints - 1, :]
+
+
+class MonteCarloSimulator:
+    """Vectorized GBM / bootstrap path simulation with chunked, reproducible generation"""
+
+    def __init__(self, n_paths=10000, chunk_size=1000, seed=42, processes=1, antithetic=True):
+        self.n_paths = n_paths
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.processes = processes
+        self.antithetic = antithetic
+
+    def simulate(self, prices, n_steps, method='gbm', band_every=1, seed=None, n_paths=None):
+        """Simulate future prices for every asset column of a dates x assets array.
+
+        Returns (checkpoints, paths) where paths has shape
+        (n_paths, len(checkpoints), n_assets) and holds simulated prices.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown simulation method: {method}")
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.ndim == 1:
+            prices = prices[:, None]
+        log_returns = log_returns_matrix(prices)
+        if len(log_returns) < 2:
+            raise ValueError("Not enough history to simulate")
+
+        n_assets = log_returns.shape[1]
+        mean = log_returns.mean(axis=0)
+        cov = np.atleast_2d(np.cov(log_returns, rowvar=False))
+        # Jitter the diagonal so near-singular covariances still factorize
+        cholesky = np.linalg.cholesky(cov + np.eye(n_assets) * 1e-12)
+        drift = mean  # mean log return already includes the -sigma^2/2 GBM correction
+        checkpoints = checkpoint_steps(n_steps, band_every)
+
+        # One child seed per chunk, so results do not depend on how chunks are split across processes
+        seed = self.seed if seed is None else seed
+        n_paths = n_paths or self.n_paths
+        sizes = [min(self.chunk_size, n_paths - start) for start in range(0, n_paths, self.chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        tasks = [
+            (method, child, size, checkpoints, drift, cholesky, log_returns, self.antithetic)
+            for child, size in zip(seeds, sizes)
+        ]
+
+        paths = np.empty((n_paths, len(checkpoints), n_assets), dtype=np.float32)
+        if self.processes > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                chunks = executor.map(_simulate_chunk, tasks)
+                self._fill(paths, chunks)
+        else:
+            self._fill(paths, map(_simulate_chunk, tasks))
+
+        np.exp(paths, out=paths)
+        paths *= prices[-1].astype(np.float32)
+        return checkpoints, paths
+
+    def _fill(self, paths, chunks):
+        start = 0
+        for chunk in chunks:
+            paths[start:start + len(chunk)] = chunk
+            start += len(chunk)
+
+    def portfolio_values(self, paths, prices, weights):
+        """Value of $1 invested with the given weights along every simulated path"""
+        weights = np.asarray(weights, dtype=np.float32)
+        weights = weights / weights.sum()
+        last = np.asarray(prices, dtype=np.float64)[-1].astype(np.float32)
+        return (paths / last) @ weights  # (n_paths, checkpoints)
+
+
+def simulation_summary(values, checkpoints, start_value):
+    """Percentile bands plus end-of-horizon statistics for one simulated series"""
+    final = values[:, -1]
+    return {
+        'days': checkpoints.astype(int).tolist(),
+        'percentiles': percentile_bands(values),
+        'expected_value': float(final.mean()),
+        'probability_of_gain': float((final > start_value).mean())
+    }
+
+
+def percentile_bands(values, percentiles=DEFAULT_PERCENTILES):
+    """Percentiles across paths (axis 0) for every checkpoint, as JSON-friendly lists"""
+    bands = np.percentile(values, percentiles, axis=0)
+    return {str(p): band.astype(float).tolist() for p, band in zip(percentiles, bands)}
+
+
+# Global simulator instance
+simulator = MonteCarloSimulator(
+    n_paths=Config.MONTE_CARLO_PATHS,
+    chunk_size=Config.MONTE_CARLO_CHUNK_SIZE,
+    processes=Config.MONTE_CARLO_PROCESSES
+)
@@ -0,0 +1,107 @@
+from config import Config
+from cache import TTLCache
+from transport import http_transport
+
+GOOGLE_ISSUERS = ('https://accounts.google.com', 'accounts.google.com')
+
+# Used when the discovery document cannot be fetched
+DEFAULT_ENDPOINTS = {
+    'authorization_endpoint': 'https://accounts.google.com/o/oauth2/v2/auth',
+    'token_endpoint': 'https://oauth2.googleapis.com/token',
+    'userinfo_endpoint': 'https://openidconnect.googleapis.com/v1/userinfo'
+}
+
+
+class OIDCProvider:
+    """OpenID Connect discovery and signing keys, cached, plus local ID token verification.
+
+    Verifying the ID token returned with the access token makes the userinfo
+    request unnecessary. It needs PyJWT with cryptography for RS256 (in
+    requirements.txt); if they are missing verify_id_token() returns None
+    and callers fall back to userinfo.
+    """
+
+    def __init__(self, discovery_url, client_id, transport, ttl=86400, issuers=GOOGLE_ISSUERS):
+        self.discovery_url = discovery_url
+        self.client_id = client_id
+        self.transport = transport
+        self.issuers = issuers
+        self.cache = TTLCache(max_size=8, ttl=ttl)
+        self.verified = 0
+        self.fallbacks = 0
+
+    def _fetch_json(self, url):
+        response = self.transport.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def discovery(self):
+        """Return the provider's discovery document"""
+        return self.cache.get_or_load('discovery', lambda: self._fetch_json(self.discovery_url))
+
+    def endpoint(self, name):
+        """Return an endpoint URL from discovery, or the built-in default if discovery fails"""
+        try:
+            return self.discovery().get(name) or DEFAULT_ENDPOINTS[name]
+        except Exception as e:
+            print(f"Error fetching OpenID discovery document: {e}")
+            return DEFAULT_ENDPOINTS[name]
+
+    def jwks(self, refresh=False):
+        """Return the provider's signing keys as a {kid: jwk} dict"""
+        if refresh:
+            self.cache.invalidate('jwks')
+
+        def load():
+            keys = self._fetch_json(self.discovery()['jwks_uri']).get('keys', [])
+            return {key.get('kid'): key for key in keys}
+
+        return self.cache.get_or_load('jwks', load)
+
+    def verify_id_token(self, id_token):
+        """Return the verified claims of an ID token, or None if it cannot be verified locally"""
+        if not id_token:
+            return None
+        try:
+            import jwt
+        except ImportError:
+            self.fallbacks += 1
+            return None
+
+        try:
+            header = jwt.get_unverified_header(id_token)
+            key = self.jwks().get(header.get('kid'))
+            if key is None:
+                # Keys rotate; refetch once before giving up
+                key = self.jwks(refresh=True).get(header.get('kid'))
+            if key is None:
+                raise ValueError(f"Unknown signing key {header.get('kid')}")
+            claims = jwt.decode(
+                id_token,
+                jwt.PyJWK(key).key,
+                algorithms=['RS256'],
+                audience=self.client_id,
+                options={'verify_iss': False},
+                leeway=60
+            )
+            if claims.get('iss') not in self.issuers:
+                raise ValueError(f"Unexpected issuer {claims.get('iss')}")
+            self.verified += 1
+            return claims
+        except Exception as e:
+            print(f"Error verifying ID token: {e}")
+            self.fallbacks += 1
+            return None
+
+    def stats(self):
+        """Return token verification counters and discovery/JWKS cache statistics"""
+        return dict(self.cache.stats(), verified=self.verified, userinfo_fallbacks=self.fallbacks)
+
+
+# Global Google OpenID Connect provider
+google_oidc = OIDCProvider(
+    Config.GOOGLE_DISCOVERY_URL,
+    Config.GOOGLE_CLIENT_ID,
+    http_transport,
+    ttl=Config.OIDC_CACHE_TTL
+)
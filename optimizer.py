@@ -0,0 +1,290 @@
+import numpy as np
+from config import Config
+from cache import TTLCache
+
+STRATEGIES = ('equal', 'min_variance', 'max_sharpe', 'risk_parity')
+TRADING_DAYS_PER_YEAR = 252
+
+
+def ledoit_wolf(returns):
+    """Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+
+    `returns` is a days x assets array without gaps. Returns (covariance,
+    shrinkage) where shrinkage is the weight given to the identity target.
+    """
+    X = np.asarray(returns, dtype=np.float64)
+    n, p = X.shape
+    X = X - X.mean(axis=0)
+    sample = X.T @ X / n
+    X2 = X ** 2
+    trace = X2.sum(axis=0) / n
+    mu = trace.sum() / p
+
+    # Squared Frobenius distance to the target and the estimation error of
+    # the sample covariance, both without forming any p x p x n tensor
+    delta_ = (sample ** 2).sum()
+    beta_ = (X2.T @ X2).sum()
+    beta = (beta_ / n - delta_) / (p * n)
+    delta = (delta_ - 2.0 * mu * trace.sum() + p * mu ** 2) / p
+    beta = min(beta, delta)
+    shrinkage = 0.0 if beta == 0 else beta / delta
+
+    covariance = (1.0 - shrinkage) * sample
+    covariance.flat[::p + 1] += shrinkage * mu
+    return covariance, shrinkage
+
+
+def project_capped_simplex(v, cap=1.0):
+    """Euclidean projection onto {w : 0 <= w <= cap, sum(w) = 1}.
+
+    The projection is clip(v - tau, 0, cap) for the tau where the clipped sum
+    is one. That sum is piecewise linear in tau with kinks at v_i and v_i - cap,
+    so it is evaluated at every kink at once and interpolated in closed form.
+    """
+    v = np.asarray(v, dtype=np.float64)
+    n = len(v)
+    cap = min(cap, 1.0)
+    ordered = np.sort(v)
+    prefix = np.concatenate(([0.0], np.cumsum(ordered)))
+    kinks = np.sort(np.concatenate((v, v - cap)))
+    below = np.searchsorted(ordered, kinks, side='right')  # v_i <= tau contribute 0
+    capped = np.searchsorted(ordered, kinks + cap, side='left')  # v_i >= tau + cap contribute cap
+    totals = cap * (n - capped) + (prefix[capped] - prefix[below]) - kinks * (capped - below)
+
+    # totals decreases from n * cap to 0; find the segment that crosses one
+    k = min(max(np.searchsorted(-totals, -1.0, side='left') - 1, 0), len(kinks) - 2)
+    span = totals[k] - totals[k + 1]
+    tau = kinks[k] + (totals[k] - 1.0) * (kinks[k + 1] - kinks[k]) / span if span > 0 else kinks[k]
+    return np.clip(v - tau, 0.0, cap)
+
+
+def _solve_active_set(covariance, w, cap, rounds=10, tol=1e-9):
+    """Exact minimum-variance weights, starting from the active set guessed from `w`.
+
+    Weights at zero or at the cap stay fixed and the rest solve the equality-
+    constrained problem in closed form; weights that violate the optimality
+    conditions then switch sides and the solve repeats. Returns None if the
+    active set does not settle within `rounds` solves.
+    """
+    upper = w >= cap - tol
+    free = (w > tol) & ~upper
+    for _ in range(rounds):
+        if not free.any():
+            return None
+        fixed = np.where(upper, cap, 0.0)
+        sub = covariance[np.ix_(free, free)]
+        rhs = np.column_stack((np.ones(free.sum()), covariance[free] @ fixed))
+        solved = np.linalg.solve(sub, rhs)
+        # w_F = lam * inv(S_FF) 1 - inv(S_FF) S_FU w_U with lam chosen so weights sum to one
+        lam = (1.0 - fixed.sum() + solved[:, 1].sum()) / solved[:, 0].sum()
+        candidate = fixed.copy()
+        candidate[free] = lam * solved[:, 0] - solved[:, 1]
+        gradient = covariance @ candidate
+
+        to_zero = free & (candidate < -tol)
+        to_upper = free & (candidate > cap + tol)
+        release = (~free & ~upper & (gradient < lam - tol)) | (upper & (gradient > lam + tol))
+        if not (to_zero.any() or to_upper.any() or release.any()):
+            return np.clip(candidate, 0.0, cap)
+        free = (free & ~to_zero & ~to_upper) | release
+        upper = (upper & ~release) | to_upper
+    return None
+
+
+def min_variance_weights(covariance, max_weight=1.0, lipschitz=None, iterations=1000, tol=1e-9, check_every=20):
+    """Long-only minimum-variance weights.
+
+    Accelerated projected gradient (FISTA) finds which weights sit at zero or
+    at the cap; every `check_every` iterations that guess is solved exactly
+    and returned as soon as it satisfies the optimality conditions.
+    """
+    n = len(covariance)
+    cap = min(max_weight, 1.0)
+    lipschitz = lipschitz or 2 * np.linalg.eigvalsh(covariance)[-1]
+    step = 1.0 / lipschitz
+    w = project_capped_simplex(np.full(n, 1.0 / n), cap)
+    y, t = w, 1.0
+    for i in range(1, iterations + 1):
+        w_next = project_capped_simplex(y - step * 2 * (covariance @ y), cap)
+        change = w_next - w
+        if np.abs(change).max() < tol:
+            return w_next
+        if (y - w_next) @ change > 0:
+            t = 1.0  # momentum is pointing uphill; restart the acceleration
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + ((t - 1) / t_next) * change
+        w, t = w_next, t_next
+        if i % check_every == 0:
+            exact = _solve_active_set(covariance, w, cap)
+            if exact is not None:
+                return exact
+    return w
+
+
+def max_sharpe_weights(expected_returns, covariance, risk_free_rate=0.0, max_weight=1.0, iterations=500, tol=1e-10):
+    """Long-only maximum-Sharpe weights by projected gradient ascent with backtracking"""
+    excess = np.asarray(expected_returns, dtype=np.float64) - risk_free_rate
+    if excess.max() <= 0:
+        # No asset beats the risk-free rate; fall back to the least risky portfolio
+        return min_variance_weights(covariance, max_weight)
+
+    def sharpe(w):
+        return (excess @ w) / np.sqrt(w @ covariance @ w)
+
+    n = len(excess)
+    w = project_capped_simplex(np.full(n, 1.0 / n), max_weight)
+    value = sharpe(w)
+    step = 1.0
+    for _ in range(iterations):
+        cov_w = covariance @ w
+        variance = w @ cov_w
+        gradient = excess / np.sqrt(variance) - (excess @ w) * cov_w / variance ** 1.5
+        while True:
+            candidate = project_capped_simplex(w + step * gradient, max_weight)
+            candidate_value = sharpe(candidate)
+            if candidate_value >= value or step < 1e-12:
+                break
+            step /= 2
+        converged = np.abs(candidate - w).max() < tol
+        w, value = candidate, max(candidate_value, value)
+        step *= 2
+        if converged:
+            break
+    return w
+
+
+def risk_parity_weights(covariance, budgets=None, max_weight=1.0, iterations=100, tol=1e-9):
+    """Weights whose risk contributions match `budgets` (equal by default).
+
+    Solves the convex problem min 1/2 y'Σy - Σ b_i log(y_i) with damped Newton
+    steps and normalizes the solution to sum to one. If that exceeds
+    max_weight it is projected onto the capped simplex, so the cap holds at
+    the cost of exactly matching the budgets.
+    """
+    n = len(covariance)
+    b = np.full(n, 1.0 / n) if budgets is None else np.asarray(budgets, dtype=np.float64) / np.sum(budgets)
+    y = b / np.sqrt(np.diag(covariance))
+
+    def objective(y):
+        return 0.5 * y @ covariance @ y - b @ np.log(y)
+
+    value = objective(y)
+    for _ in range(iterations):
+        gradient = covariance @ y - b / y
+        # y * gradient is each asset's risk contribution minus its budget
+        if np.abs(y * gradient).max() < tol:
+            break
+        hessian = covariance + np.diag(b / y ** 2)
+        direction = np.linalg.solve(hessian, gradient)
+        step = 1.0
+        # Stay strictly positive, then backtrack until the objective decreases
+        negative = direction > 0
+        if negative.any():
+            step = min(1.0, 0.99 * (y[negative] / direction[negative]).min())
+        while objective(y - step * direction) > value and step > 1e-12:
+            step /= 2
+        y = y - step * direction
+        value = objective(y)
+    weights = y / y.sum()
+    if weights.max() > max_weight:
+        weights = project_capped_simplex(weights, max_weight)
+    return weights
+
+
+def risk_contributions(weights, covariance):
+    """Fraction of portfolio variance contributed by each asset"""
+    marginal = covariance @ weights
+    return weights * marginal / (weights @ marginal)
+
+
+class CovarianceModel:
+    """Shrunk covariance of one universe's returns plus values reused by every allocation"""
+
+    def __init__(self, symbols, returns, as_of):
+        self.symbols = list(symbols)
+        self.as_of = as_of
+        self.observations = len(returns)
+        daily, self.shrinkage = ledoit_wolf(returns)
+        self.covariance = daily * TRADING_DAYS_PER_YEAR
+        self.expected_returns = returns.mean(axis=0) * TRADING_DAYS_PER_YEAR
+        self.volatility = np.sqrt(np.diag(self.covariance))
+        self.lipschitz = 2 * np.linalg.eigvalsh(self.covariance)[-1]
+
+
+class PortfolioOptimizer:
+    """Allocates weights from shrunk covariances cached per (universe, window, as-of date)"""
+
+    def __init__(self, cache_size=100, ttl=86400, risk_free_rate=0.02):
+        self.cache = TTLCache(max_size=cache_size, ttl=ttl)
+        self.risk_free_rate = risk_free_rate
+
+    def covariance(self, histories, window=252):
+        """Return the CovarianceModel for the symbols' last `window` daily returns"""
+        from screening import build_price_matrix
+
+        histories = {symbol: hist for symbol, hist in histories.items() if hist is not None and len(hist) > 1}
+        if len(histories) < 2:
+            raise ValueError("Need price history for at least two stocks")
+        # The key only needs the symbols and the latest bar, so cache hits skip building the matrix
+        symbols = tuple(sorted(histories))
+        as_of = max(hist.index[-1] for hist in histories.values())
+        key = (symbols, window, as_of)
+
+        def load():
+            prices = build_price_matrix(histories)
+            values = prices[list(symbols)].to_numpy(dtype=np.float64)[-(window + 1):]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns = np.diff(values, axis=0) / values[:-1]
+            returns = returns[np.isfinite(returns).all(axis=1)]
+            if len(returns) < 2:
+                raise ValueError("Not enough overlapping history to estimate covariance")
+            return CovarianceModel(symbols, returns, as_of)
+
+        return self.cache.get_or_load(key, load)
+
+    def optimize(self, histories, strategy='min_variance', window=252, max_weight=1.0):
+        """Return ({symbol: weight}, risk summary) for the chosen strategy"""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        model = self.covariance(histories, window)
+        n = len(model.symbols)
+        # A cap below 1/n is infeasible; relax it to equal weight
+        max_weight = max(max_weight, 1.0 / n)
+
+        if strategy == 'equal':
+            weights = np.full(n, 1.0 / n)
+        elif strategy == 'min_variance':
+            weights = min_variance_weights(model.covariance, max_weight, model.lipschitz)
+        elif strategy == 'max_sharpe':
+            weights = max_sharpe_weights(model.expected_returns, model.covariance, self.risk_free_rate, max_weight)
+        else:
+            weights = risk_parity_weights(model.covariance, max_weight=max_weight)
+
+        return dict(zip(model.symbols, weights.tolist())), self.summary(model, weights)
+
+    def summary(self, model, weights):
+        """Expected return, volatility and diversification measures of a weight vector"""
+        volatility = float(np.sqrt(weights @ model.covariance @ weights))
+        expected_return = float(model.expected_returns @ weights)
+        return {
+            'expected_return': expected_return,
+            'volatility': volatility,
+            'sharpe_ratio': (expected_return - self.risk_free_rate) / volatility if volatility else None,
+            'diversification_ratio': float(model.volatility @ weights) / volatility if volatility else None,
+            'effective_holdings': float(1.0 / np.sum(weights ** 2)),
+            'risk_contributions': dict(zip(model.symbols, risk_contributions(weights, model.covariance).tolist())),
+            'shrinkage': float(model.shrinkage),
+            'observations': model.observations,
+            'as_of': str(model.as_of)
+        }
+
+    def stats(self):
+        """Return covariance cache statistics"""
+        return self.cache.stats()
+
+
+# Global optimizer instance
+portfolio_optimizer = PortfolioOptimizer(
+    cache_size=Config.COVARIANCE_CACHE_SIZE,
+    risk_free_rate=Config.RISK_FREE_RATE
+)
@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class SnapshotScheduler:
+    """Recomputes a result in a background thread and serves the latest versioned snapshot"""
+
+    def __init__(self, compute, interval, name='snapshot-refresh'):
+        self.compute = compute
+        self.interval = interval
+        self.name = name
+        self._snapshot = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_duration = None
+
+    def latest(self):
+        """Return the most recent snapshot, or None if nothing has been computed yet"""
+        return self._snapshot
+
+    def refresh(self):
+        """Recompute now and publish a new snapshot; concurrent callers share one run"""
+        version = self._version
+        with self._refresh_lock:
+            if self._version != version and self._snapshot is not None:
+                # Another caller finished a refresh while we waited for the lock
+                return self._snapshot
+            started = time.time()
+            try:
+                data = self.compute()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Error refreshing {self.name}: {e}")
+                raise
+            with self._lock:
+                self._version += 1
+                self._snapshot = {
+                    'version': self._version,
+                    'computed_at': time.time(),
+                    'data': data
+                }
+                self.refreshes += 1
+                self.last_duration = time.time() - started
+            return self._snapshot
+
+    def get_or_refresh(self):
+        """Return the latest snapshot, computing the first one synchronously if needed"""
+        return self._snapshot or self.refresh()
+
+    def request_refresh(self):
+        """Ask the background thread to refresh as soon as possible"""
+        self._wake.set()
+
+    def ensure_started(self):
+        """Start the background refresh thread once"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                pass  # Keep serving the previous snapshot; retry on the next tick
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stats(self):
+        """Return refresh counters and the age of the current snapshot"""
+        snapshot = self._snapshot
+        return {
+            'version': snapshot['version'] if snapshot else None,
+            'age_seconds': time.time() - snapshot['computed_at'] if snapshot else None,
+            'interval': self.interval,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_duration': self.last_duration,
+            'last_error': self.last_error,
+            'running': self._thread is not None and self._thread.is_alive()
+        }
@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DATE_FILE = 'date.i8'  # trading dates as int64 days since the epoch
+
+
+def period_start(period, today=None):
+    """Translate a yfinance-style period ('5d', '6mo', '2y', 'max') into a start date"""
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period or '')
+    if not match:
+        return None  # 'max' or unknown: no lower bound
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        return today - pd.DateOffset(days=count)
+    if unit == 'wk':
+        return today - pd.DateOffset(weeks=count)
+    if unit == 'mo':
+        return today - pd.DateOffset(months=count)
+    return today - pd.DateOffset(years=count)
+
+
+class PriceStore:
+    """On-disk columnar daily price store, one raw array file per symbol and column.
+
+    Each column is a flat little-endian array that is appended to in place and
+    read back through np.memmap, so loads touch only the pages they need.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, name):
+        return os.path.join(self.root, symbol, name)
+
+    def _column_file(self, column):
+        return f"{column.lower()}.f8"
+
+    def _map(self, symbol, name, dtype):
+        """Memory-map one column file read-only (empty array if missing)"""
+        path = self._path(symbol, name)
+        if not os.path.exists(path) or os.path.getsize(path) < 8:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(os.path.getsize(path) // 8,))
+
+    def _row_count(self, symbol):
+        """Rows fully written to every column (guards against interrupted appends)"""
+        counts = []
+        for name in [DATE_FILE] + [self._column_file(column) for column in COLUMNS]:
+            path = self._path(symbol, name)
+            counts.append(os.path.getsize(path) // 8 if os.path.exists(path) else 0)
+        return min(counts)
+
+    def symbols(self):
+        """Symbols that have stored data"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if self._row_count(name) > 0)
+
+    def last_date(self, symbol):
+        """Most recent stored trading date, or None if the symbol is not stored"""
+        rows = self._row_count(symbol)
+        if rows == 0:
+            return None
+        dates = self._map(symbol, DATE_FILE, '<i8')
+        return pd.Timestamp(np.datetime64(int(dates[rows - 1]), 'D'))
+
+    def read(self, symbol, start=None):
+        """Return stored OHLCV history as a DataFrame, optionally from a start date"""
+        rows = self._row_count(symbol)
+        if rows == 0:
+            return None
+        dates = self._map(symbol, DATE_FILE, '<i8')[:rows]
+        first = 0
+        if start is not None:
+            start_day = np.datetime64(pd.Timestamp(start).date(), 'D').astype(np.int64)
+            first = int(np.searchsorted(dates, start_day, side='left'))
+        index = pd.DatetimeIndex(dates[first:].astype('datetime64[D]').astype('datetime64[ns]'))
+        data = {column: np.asarray(self._map(symbol, self._column_file(column), '<f8')[first:rows]) for column in COLUMNS}
+        return pd.DataFrame(data, index=index)
+
+    def append(self, symbol, hist):
+        """Append bars newer than the last stored date, refreshing that last bar in place.
+
+        Returns the number of rows written.
+        """
+        if hist is None or len(hist) == 0:
+            return 0
+        hist = hist[~hist.index.duplicated(keep='last')].sort_index()
+        index = pd.DatetimeIndex(hist.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        days = index.normalize().values.astype('datetime64[D]').astype(np.int64)
+
+        with self._locked(symbol):
+            rows = self._row_count(symbol)
+            last_day = None
+            if rows > 0:
+                last_day = int(self._map(symbol, DATE_FILE, '<i8')[rows - 1])
+                keep = days >= last_day
+                days = days[keep]
+                hist = hist[keep]
+            if len(days) == 0:
+                return 0
+
+            # A bar for the last stored date replaces it (it may have been partial)
+            offset = rows - 1 if last_day is not None and days[0] == last_day else rows
+            for column in COLUMNS:
+                values = hist[column].to_numpy(dtype='<f8') if column in hist else np.full(len(days), np.nan, dtype='<f8')
+                self._write(symbol, self._column_file(column), offset, values)
+            # Dates are written last so readers never see a row without its prices
+            self._write(symbol, DATE_FILE, offset, days.astype('<i8'))
+            return len(days)
+
+    @contextmanager
+    def _locked(self, symbol):
+        """Serialize writers to one symbol across threads and worker processes"""
+        os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(symbol, '.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, symbol, name, offset, values):
+        """Write values in place starting at row offset"""
+        path = self._path(symbol, name)
+        mode = 'r+b' if os.path.exists(path) else 'wb'
+        with open(path, mode) as f:
+            f.seek(offset * 8)
+            f.write(values.tobytes())
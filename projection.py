@@ -0,0 +1,146 @@
+import numpy as np
+from config import Config
+from cache import TTLCache
+from screening import first_valid_rows
+from monte_carlo import TRADING_DAYS_PER_MONTH
+
+MODELS = ('linear', 'log_linear', 'ewma')
+EWMA_HALFLIFE = 63  # trading days (~3 months) for the EWMA drift model
+
+
+def fit_trend(prices, model='linear'):
+    """Fit a trend to every column of a dates x symbols price array in closed form.
+
+    Columns may start with NaNs (shorter histories); each column is fitted on
+    its own bars with x = 0..n-1, like a per-symbol regression. Returns a dict
+    of per-column arrays: intercept, slope, n and last price.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown projection model: {model}")
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim == 1:
+        prices = prices[:, None]
+
+    rows = np.arange(len(prices), dtype=np.float64)[:, None]
+    starts = first_valid_rows(prices)
+    valid = ~np.isnan(prices)
+    n = valid.sum(axis=0).astype(np.float64)
+    last = prices[-1]
+
+    if model == 'ewma':
+        # Drift is the exponentially weighted mean of daily log returns
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_returns = np.diff(np.log(prices), axis=0)
+        ages = np.arange(len(log_returns))[::-1][:, None]
+        weights = np.where(np.isnan(log_returns), 0.0, 0.5 ** (ages / EWMA_HALFLIFE))
+        with np.errstate(invalid='ignore'):
+            drift = (weights * np.nan_to_num(log_returns)).sum(axis=0) / weights.sum(axis=0)
+        return {'intercept': np.log(last), 'slope': drift, 'n': n, 'last': last}
+
+    x = np.where(valid, rows - starts, 0.0)
+    y = prices
+    if model == 'log_linear':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = np.log(prices)
+    y = np.where(valid, y, 0.0)
+
+    # Ordinary least squares from the normal equations
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = x.sum(axis=0) / n
+        mean_y = y.sum(axis=0) / n
+        cov_xy = (np.where(valid, x - mean_x, 0.0) * np.where(valid, y - mean_y, 0.0)).sum(axis=0)
+        var_x = (np.where(valid, x - mean_x, 0.0) ** 2).sum(axis=0)
+        slope = cov_xy / var_x
+    intercept = mean_y - slope * mean_x
+    return {'intercept': intercept, 'slope': slope, 'n': n, 'last': last}
+
+
+def project(coefficients, model, steps):
+    """Projected prices `steps` bars after the last fitted bar (steps may be an array)"""
+    steps = np.asarray(steps, dtype=np.float64)
+    if steps.ndim == 1:
+        steps = steps[:, None]
+    if model == 'ewma':
+        return np.exp(coefficients['intercept'] + coefficients['slope'] * steps)
+    t = coefficients['n'] - 1 + steps
+    fitted = coefficients['intercept'] + coefficients['slope'] * t
+    return np.exp(fitted) if model == 'log_linear' else fitted
+
+
+def stack_closes(histories):
+    """Right-align each history's closes into one array so every column ends on its last bar"""
+    closes = [hist['Close'].dropna().to_numpy(dtype=np.float64) for hist in histories]
+    length = max((len(close) for close in closes), default=0)
+    prices = np.full((length, len(closes)), np.nan)
+    for i, close in enumerate(closes):
+        prices[length - len(close):, i] = close
+    return prices
+
+
+def projection_result(current_price, projected_price, months):
+    """Build the growth projection payload returned by /growth_projection"""
+    growth_percentage = ((projected_price - current_price) / current_price) * 100
+    return {
+        'current_price': float(current_price),
+        'projected_price': float(projected_price),
+        'growth_percentage': float(growth_percentage),
+        'monthly_growth': float(growth_percentage / months)
+    }
+
+
+class ProjectionEngine:
+    """Batch trend projections with fitted coefficients cached per (symbol, last bar)"""
+
+    def __init__(self, cache_size=5000, ttl=86400):
+        self.cache = TTLCache(max_size=cache_size, ttl=ttl)
+
+    def _key(self, symbol, hist, model):
+        return (symbol, hist.index[-1], len(hist), model)
+
+    def coefficients(self, histories, model='linear'):
+        """Return {symbol: coefficient tuple}, fitting all cache misses in one batch"""
+        histories = {symbol: hist for symbol, hist in histories.items() if hist is not None and len(hist) > 1}
+        keys = {self._key(symbol, hist, model): symbol for symbol, hist in histories.items()}
+
+        def load(missing):
+            symbols = [keys[key] for key in missing]
+            # Wide batches are split across the compute pool's worker processes when it is enabled
+            from compute_pool import compute_pool
+            fits = compute_pool.fit_trends(stack_closes([histories[symbol] for symbol in symbols]), model)
+            return {
+                key: (fits['intercept'][i], fits['slope'][i], fits['n'][i], fits['last'][i])
+                for i, key in enumerate(missing)
+            }
+
+        cached = self.cache.get_many_or_load(list(keys), load)
+        return {symbol: cached[key] for key, symbol in keys.items() if key in cached}
+
+    def project(self, histories, horizons, model='linear'):
+        """Project many symbols over many horizons (in months) in one call.
+
+        Returns {symbol: {months: projection_result}}.
+        """
+        coefficients = self.coefficients(histories, model)
+        if not coefficients:
+            return {}
+        symbols = list(coefficients)
+        stacked = np.array([coefficients[symbol] for symbol in symbols], dtype=np.float64)
+        fits = {'intercept': stacked[:, 0], 'slope': stacked[:, 1], 'n': stacked[:, 2], 'last': stacked[:, 3]}
+        steps = [months * TRADING_DAYS_PER_MONTH for months in horizons]
+        projected = project(fits, model, steps)  # horizons x symbols
+
+        results = {}
+        for j, symbol in enumerate(symbols):
+            results[symbol] = {
+                months: projection_result(fits['last'][j], projected[h, j], months)
+                for h, months in enumerate(horizons)
+            }
+        return results
+
+    def stats(self):
+        """Return coefficient cache statistics"""
+        return self.cache.stats()
+
+
+# Global projection engine instance
+projection_engine = ProjectionEngine(cache_size=Config.PROJECTION_CACHE_SIZE)
@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class QuoteFeed:
+    """Latest-quote table for every watched symbol, kept current by one upstream poller.
+
+    Subscribers register the symbols they watch and block on a shared
+    condition; each poll is one batched upstream fetch for the union of
+    watched symbols, and only prices that changed are published as a new
+    version. Hundreds of connected dashboards therefore cost one fetch per
+    interval, and each of them receives just the deltas for its symbols.
+    """
+
+    def __init__(self, fetch, interval=15, history=256, autostart=True):
+        self.fetch = fetch  # fetch(symbols) -> {symbol: price}
+        self.interval = interval
+        self.autostart = autostart
+        self.quotes = {}  # symbol -> latest quote dict
+        self.version = 0
+        self._changes = deque(maxlen=history)  # (version, {symbol: quote}, encoded JSON)
+        self._watchers = {}  # symbol -> number of subscribers watching it
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_poll = None
+        self.subscribers = 0
+
+    def publish(self, prices, timestamp=None):
+        """Merge {symbol: price} into the table; returns the quotes that changed"""
+        timestamp = timestamp or time.time()
+        with self._cond:
+            changes = {}
+            for symbol, price in prices.items():
+                if price is None:
+                    continue
+                price = float(price)
+                previous = self.quotes.get(symbol)
+                if previous is not None and previous['price'] == price:
+                    continue
+                changes[symbol] = {
+                    'symbol': symbol,
+                    'price': price,
+                    'change': price - previous['price'] if previous else 0.0,
+                    'time': timestamp
+                }
+            if changes:
+                self.version += 1
+                self.quotes.update(changes)
+                self._changes.append((self.version, changes, json.dumps(changes)))
+                self._cond.notify_all()
+            return changes
+
+    def poll_once(self):
+        """Fetch every watched symbol in one upstream call and publish the changes"""
+        symbols = self.watched()
+        if not symbols:
+            return {}
+        try:
+            prices = self.fetch(symbols)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"Error polling quotes: {e}")
+            return {}
+        self.polls += 1
+        self.last_poll = time.time()
+        return self.publish(prices)
+
+    def watched(self):
+        """Symbols with at least one subscriber"""
+        with self._cond:
+            return sorted(self._watchers)
+
+    def snapshot(self, symbols):
+        """Return (version, {symbol: quote}) for the symbols that have a quote"""
+        with self._cond:
+            return self.version, {symbol: self.quotes[symbol] for symbol in symbols if symbol in self.quotes}
+
+    def _watch(self, symbols):
+        with self._cond:
+            new = [symbol for symbol in symbols if symbol not in self._watchers]
+            for symbol in symbols:
+                self._watchers[symbol] = self._watchers.get(symbol, 0) + 1
+            self.subscribers += 1
+        if any(symbol not in self.quotes for symbol in new):
+            self._wake.set()  # poll now instead of leaving the new symbols blank until the next tick
+
+    def _unwatch(self, symbols):
+        with self._cond:
+            for symbol in symbols:
+                self._watchers[symbol] -= 1
+                if not self._watchers[symbol]:
+                    del self._watchers[symbol]
+            self.subscribers -= 1
+
+    def _changes_since(self, version, symbols):
+        """Return (latest version, payload) of the changes after `version`; caller must hold the condition.
+
+        The payload is the pre-encoded JSON shared by every subscriber when one
+        version is pending and all of it is relevant, else a filtered dict.
+        None means the subscriber fell behind the kept history.
+        """
+        if version == self.version:
+            return version, {}
+        pending = [entry for entry in self._changes if entry[0] > version]
+        if not pending or pending[0][0] != version + 1:
+            return self.version, None
+        if len(pending) == 1 and symbols.issuperset(pending[0][1]):
+            return self.version, pending[0][2]
+        merged = {}
+        for _, changes, _ in pending:
+            merged.update((symbol, quote) for symbol, quote in changes.items() if symbol in symbols)
+        return self.version, merged
+
+    def events(self, symbols, since=None, timeout=15):
+        """Yield (event, version, data) for one subscriber until the consumer goes away.
+
+        Starts with a 'snapshot' of the watched quotes (or the 'quotes' missed
+        since `since`, e.g. an SSE Last-Event-ID), then one 'quotes' delta per
+        published version that touches these symbols. Yields ('keepalive',
+        None, None) after `timeout` idle seconds.
+        """
+        symbols = set(symbols)
+        self._watch(symbols)
+        if self.autostart:
+            self.ensure_started()
+        try:
+            with self._cond:
+                seen, payload = self._changes_since(since, symbols) if since is not None else (self.version, None)
+            if payload is None:
+                seen, payload = self.snapshot(symbols)
+                yield 'snapshot', seen, payload
+            elif payload:
+                yield 'quotes', seen, payload
+            while True:
+                with self._cond:
+                    if self.version == seen:
+                        self._cond.wait(timeout)
+                    version, payload = self._changes_since(seen, symbols)
+                if version == seen:
+                    yield 'keepalive', None, None
+                elif payload is None:
+                    seen, payload = self.snapshot(symbols)
+                    yield 'snapshot', seen, payload
+                else:
+                    seen = version
+                    if payload:
+                        yield 'quotes', seen, payload
+        finally:
+            self._unwatch(symbols)
+
+    def ensure_started(self):
+        """Start the background poller once"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='quote-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background poller"""
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll_once()  # no-op while nobody is watching
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stats(self):
+        """Return poller counters and the number of connected subscribers"""
+        with self._cond:
+            return {
+                'version': self.version,
+                'quotes': len(self.quotes),
+                'watched_symbols': len(self._watchers),
+                'subscribers': self.subscribers,
+                'interval': self.interval,
+                'polls': self.polls,
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'age_seconds': time.time() - self.last_poll if self.last_poll else None,
+                'running': self._thread is not None and self._thread.is_alive()
+            }
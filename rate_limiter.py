@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from config import Config
+
+# Lower numbers are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+# Status phrases only, so other numbers in a message (symbol counts, row numbers) don't count
+RETRYABLE_MESSAGE = re.compile(
+    r'\bHTTP(?: Error)?[ :/]*(?:429|5\d\d)\b'
+    r'|\bstatus(?: code)?[ :=]+(?:429|5\d\d)\b'
+    r'|\b(?:429 Client|5\d\d Server) Error\b'
+    r'|\b429\b|too many requests|rate limit',
+    re.IGNORECASE
+)
+
+
+def is_retryable(error):
+    """Return True for throttling (429) and server (5xx) errors"""
+    status = getattr(error, 'status_code', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+    if status is not None:
+        return status == 429 or 500 <= status < 600
+    return bool(RETRYABLE_MESSAGE.search(str(error)))
+
+
+class RequestScheduler:
+    """Token-bucket rate limiter with a priority queue and retry/backoff"""
+
+    def __init__(self, rate_per_minute, burst=None, max_retries=3, base_delay=1.0, max_delay=30.0,
+                 clock=time.monotonic, sleep=time.sleep, rng=random.random):
+        if rate_per_minute <= 0:
+            raise ValueError(f"rate_per_minute must be positive, got {rate_per_minute}")
+        self.rate = rate_per_minute / 60.0  # tokens per second
+        self.capacity = burst or rate_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._queue = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self):
+        """Add tokens earned since the last refill; caller must hold the lock"""
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=PRIORITY_BULK, cost=1):
+        """Block until this request may go upstream, serving higher priorities first.
+
+        A request costing more than the bucket holds waits for a full bucket
+        and then leaves it in debt, so large batches are still paced.
+        """
+        needed = min(cost, self.capacity)
+        ticket = (priority, next(self._sequence))
+        started = self.clock()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify_all()
+            while True:
+                self._refill()
+                if self._queue[0] == ticket and self._tokens >= needed:
+                    heapq.heappop(self._queue)
+                    self._tokens -= cost
+                    break
+                if self._queue[0] == ticket:
+                    self._cond.wait((needed - self._tokens) / self.rate)
+                else:
+                    self._cond.wait()
+            self._cond.notify_all()
+            waited = self.clock() - started
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with jitter for the given retry attempt"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay / 2 + self.rng() * delay / 2
+
+    def call(self, func, *args, priority=PRIORITY_BULK, cost=1, **kwargs):
+        """Run func under the rate limit, retrying throttled and server errors"""
+        attempt = 0
+        while True:
+            self.acquire(priority, cost)
+            with self._cond:
+                self.calls += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                with self._cond:
+                    self.throttled += 1
+                    if attempt >= self.max_retries:
+                        self.failures += 1
+                        raise
+                    self.retries += 1
+                self.sleep(self.backoff_delay(attempt))
+                attempt += 1
+
+    def queue_depth(self):
+        """Number of requests currently waiting for a token"""
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        """Return queue depth, wait time and retry counters"""
+        with self._cond:
+            self._refill()
+            return {
+                'rate_per_minute': self.rate * 60,
+                'tokens': self._tokens,
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self.max_queue_depth,
+                'calls': self.calls,
+                'retries': self.retries,
+                'failures': self.failures,
+                'throttled': self.throttled,
+                'total_wait': self.total_wait,
+                'max_wait': self.max_wait,
+                'avg_wait': self.total_wait / self.calls if self.calls else 0.0
+            }
+
+
+# Global scheduler shared by every Yahoo Finance call
+scheduler = RequestScheduler(
+    Config.YAHOO_FINANCE_RATE_LIMIT,
+    burst=Config.YAHOO_FINANCE_BURST,
+    max_retries=Config.YAHOO_FINANCE_MAX_RETRIES
+)
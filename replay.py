@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Offline market data sources for development, tests and load testing.
+
+SyntheticSource generates realistic OHLC history and Ticker.info payloads for
+any symbol; ReplaySource serves fixture files recorded from any source. Both
+can inject upstream latency and throttling errors.
+
+Record fixtures: python3 replay.py data/fixtures --synthetic 600
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+SECTORS = [
+    'Technology', 'Healthcare', 'Financial Services', 'Consumer Cyclical', 'Industrials',
+    'Communication Services', 'Consumer Defensive', 'Energy', 'Utilities', 'Real Estate', 'Basic Materials'
+]
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class SimulatedUpstreamError(Exception):
+    """Injected upstream failure; carries a status code the rate limiter retries"""
+
+    def __init__(self, status_code=429):
+        super().__init__(f"{status_code} simulated upstream error")
+        self.status_code = status_code
+
+
+def _symbol_seed(symbol, seed):
+    return zlib.crc32(symbol.encode()) ^ seed
+
+
+def _window(hist, period=None, start=None):
+    """Slice a full history to a yfinance-style period or start date"""
+    from price_store import period_start
+
+    start = pd.Timestamp(start) if start else period_start(period)
+    return hist if start is None else hist[hist.index >= start]
+
+
+class SimulatedSource:
+    """Base for offline sources: optional per-call latency and error injection"""
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=42):
+        self.latency = latency  # seconds per upstream call, jittered +-50%
+        self.error_rate = error_rate  # probability that a call fails with 429/503
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _simulate(self):
+        """Sleep for the simulated round trip, then fail the call at error_rate"""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency * (0.5 + self._random.random())
+            failed = self._random.random() < self.error_rate
+            status = self._random.choice((429, 503))
+            if failed:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            raise SimulatedUpstreamError(status)
+
+    def download(self, symbols, period=None, start=None):
+        """Daily OHLC history for many symbols in one simulated batched call"""
+        self._simulate()
+        histories = {}
+        for symbol in symbols:
+            hist = self.history(symbol)
+            if hist is not None:
+                hist = _window(hist, period, start)
+                if len(hist) > 0:
+                    histories[symbol] = hist
+        return histories
+
+    def info(self, symbol):
+        """Info dictionary for a single symbol"""
+        self._simulate()
+        return self.fundamentals(symbol)
+
+    def quotes(self, symbols):
+        """Last close of each symbol, nudged so live quote streams see changes"""
+        self._simulate()
+        rng = np.random.default_rng()
+        prices = {}
+        for symbol in symbols:
+            hist = self.history(symbol)
+            if hist is not None and len(hist) > 0:
+                prices[symbol] = round(float(hist['Close'].iloc[-1]) * float(np.exp(rng.normal(0, 0.001))), 2)
+        return prices
+
+    def stats(self):
+        """Return simulated call and error counts"""
+        return {'source': type(self).__name__, 'calls': self.calls, 'errors': self.errors}
+
+
+class SyntheticSource(SimulatedSource):
+    """Deterministic random-walk market for any symbol.
+
+    Daily returns follow a one-factor market model plus a sector factor, so
+    symbols are realistically correlated. Each symbol's series depends only on
+    its name and the seed, never on which batch requested it.
+    """
+
+    def __init__(self, days=1260, end=None, latency=0.0, error_rate=0.0, seed=42):
+        super().__init__(latency, error_rate, seed)
+        self.dates = pd.bdate_range(end=pd.Timestamp(end or pd.Timestamp.now()).normalize(), periods=days)
+        rng = np.random.default_rng(seed)
+        self.market = rng.normal(0.0004, 0.010, days)
+        self.sectors = {sector: rng.normal(0.0, 0.006, days) for sector in SECTORS}
+        self._histories = {}
+
+    def sector(self, symbol):
+        return SECTORS[_symbol_seed(symbol, self.seed) % len(SECTORS)]
+
+    def history(self, symbol):
+        hist = self._histories.get(symbol)
+        if hist is not None:
+            return hist
+
+        days = len(self.dates)
+        rng = np.random.default_rng(_symbol_seed(symbol, self.seed))
+        beta = rng.uniform(0.5, 1.6)
+        volatility = rng.uniform(0.008, 0.025)
+        returns = beta * self.market + self.sectors[self.sector(symbol)] + rng.normal(rng.uniform(-0.0002, 0.0005), volatility, days)
+        close = rng.uniform(10, 400) * np.exp(np.cumsum(returns))
+        open_ = np.concatenate(([close[0]], close[:-1])) * np.exp(rng.normal(0, volatility / 3, days))
+        high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, volatility / 2, days)))
+        low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, volatility / 2, days)))
+        volume = np.round(rng.lognormal(14, 0.5, days))
+        hist = pd.DataFrame(
+            {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+            index=self.dates.rename('Date')
+        ).round({'Open': 4, 'High': 4, 'Low': 4, 'Close': 4})
+        with self._lock:
+            return self._histories.setdefault(symbol, hist)
+
+    def fundamentals(self, symbol):
+        rng = np.random.default_rng(_symbol_seed(symbol, self.seed) + 1)
+        price = round(float(self.history(symbol)['Close'].iloc[-1]), 2)
+        shares = rng.lognormal(20, 1.0)
+        pe = float(rng.lognormal(3.0, 0.45))
+        pays_dividend = rng.random() < 0.7
+        return {
+            'symbol': symbol,
+            'shortName': f"{symbol} Corp",
+            'longName': f"{symbol} Corporation",
+            'sector': self.sector(symbol),
+            'currency': 'USD',
+            'quoteType': 'EQUITY',
+            'regularMarketPrice': price,
+            'currentPrice': price,
+            'previousClose': round(float(self.history(symbol)['Close'].iloc[-2]), 2),
+            'marketCap': int(price * shares),
+            'sharesOutstanding': int(shares),
+            'trailingPE': round(pe, 2) if rng.random() > 0.08 else None,  # unprofitable companies have no P/E
+            'forwardPE': round(pe * rng.uniform(0.7, 1.1), 2),
+            'priceToBook': round(float(rng.lognormal(1.0, 0.6)), 2),
+            'dividendYield': round(float(rng.uniform(0.002, 0.05)), 4) if pays_dividend else None,
+            'beta': round(float(rng.uniform(0.5, 1.6)), 2),
+            'fiftyTwoWeekHigh': round(float(self.history(symbol)['High'].iloc[-252:].max()), 2),
+            'fiftyTwoWeekLow': round(float(self.history(symbol)['Low'].iloc[-252:].min()), 2)
+        }
+
+
+class ReplaySource(SimulatedSource):
+    """Serves fixtures written by record_fixtures: history/<SYMBOL>.csv plus info.json"""
+
+    def __init__(self, directory, latency=0.0, error_rate=0.0, seed=42):
+        super().__init__(latency, error_rate, seed)
+        self.directory = directory
+        with open(os.path.join(directory, 'info.json')) as f:
+            self.infos = json.load(f)
+        self._histories = {}
+
+    def history(self, symbol):
+        hist = self._histories.get(symbol)
+        if hist is None:
+            path = os.path.join(self.directory, 'history', f"{symbol}.csv")
+            if not os.path.exists(path):
+                return None
+            hist = pd.read_csv(path, index_col='Date', parse_dates=['Date'])
+            with self._lock:
+                hist = self._histories.setdefault(symbol, hist)
+        return hist
+
+    def fundamentals(self, symbol):
+        info = self.infos.get(symbol)
+        if info is None:
+            raise SimulatedUpstreamError(404)
+        return dict(info)
+
+
+def record_fixtures(source, symbols, directory, period='5y', batch_size=100):
+    """Download history and info for symbols from any source and write replay fixtures"""
+    os.makedirs(os.path.join(directory, 'history'), exist_ok=True)
+    infos = {}
+    for i in range(0, len(symbols), batch_size):
+        batch = symbols[i:i + batch_size]
+        for symbol, hist in source.download(batch, period).items():
+            hist[[column for column in COLUMNS if column in hist]].to_csv(
+                os.path.join(directory, 'history', f"{symbol}.csv"), index_label='Date'
+            )
+        for symbol in batch:
+            try:
+                infos[symbol] = source.info(symbol)
+            except Exception as e:
+                print(f"Error recording info for {symbol}: {e}")
+    with open(os.path.join(directory, 'info.json'), 'w') as f:
+        json.dump(infos, f, default=str)
+    return len(infos)
+
+
+def synthetic_symbols(count, start=None):
+    """`count` symbols: the given list first, then generated SYN0000-style tickers"""
+    symbols = list(start or [])[:count]
+    symbols += [f"SYN{i:04d}" for i in range(count - len(symbols))]
+    return symbols
+
+
+def main():
+    """Record replay fixtures from Yahoo Finance or the synthetic market"""
+    import argparse
+    from config import Config
+    from universes import Universe
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('directory')
+    parser.add_argument('--synthetic', type=int, metavar='N', help='record N synthetic symbols instead of live Yahoo data')
+    parser.add_argument('--universe', default=os.path.join(Config.UNIVERSE_DIR, f"{Config.DEFAULT_UNIVERSE}.txt"))
+    parser.add_argument('--period', default='5y')
+    args = parser.parse_args()
+
+    symbols = Universe.from_file(args.universe).all_symbols()
+    if args.synthetic:
+        source = SyntheticSource()
+        symbols = synthetic_symbols(args.synthetic, symbols)
+    else:
+        from market_data import YahooFinanceSource
+        source = YahooFinanceSource()
+    count = record_fixtures(source, symbols, args.directory, args.period)
+    print(f"Recorded {count} symbols to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
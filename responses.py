@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+from flask import Response
+from cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+class CachedResponse:
+    """A serialized JSON body with its ETag and pre-compressed variants"""
+
+    __slots__ = ('body', 'etag', 'variants')
+
+    def __init__(self, body, etag, variants):
+        self.body = body
+        self.etag = etag
+        self.variants = variants  # content coding -> compressed body
+
+    def size(self):
+        return len(self.body) + sum(len(variant) for variant in self.variants.values())
+
+
+class ResponseCache:
+    """Serialized JSON responses keyed on normalized request parameters plus the data version.
+
+    Bodies are serialized and compressed once, then served to every request
+    with the same key; the ETag is a hash of the body, so clients holding it
+    get a 304 until the data changes. Only successful payloads are stored.
+    Memory is bounded by entry count and by the total size of the stored bodies.
+    """
+
+    def __init__(self, dumps, max_entries=2000, max_bytes=64 * 1024 * 1024, ttl=3600,
+                 compress_level=6, brotli_quality=5, min_compress_size=512):
+        self.dumps = dumps
+        self.compress_level = compress_level
+        self.brotli_quality = brotli_quality
+        self.min_compress_size = min_compress_size
+        self.cache = TTLCache(max_size=max_entries, ttl=ttl, max_weight=max_bytes, weigher=CachedResponse.size)
+
+    def serialize(self, payload):
+        """Serialize and compress a payload into a CachedResponse"""
+        body = self.dumps(payload).encode()
+        variants = {}
+        # Small bodies are not worth the compression framing
+        if len(body) >= self.min_compress_size:
+            variants['gzip'] = gzip.compress(body, self.compress_level)
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, quality=self.brotli_quality)
+        return CachedResponse(body, hashlib.sha1(body).hexdigest()[:20], variants)
+
+    def get_or_build(self, key, build):
+        """Return the CachedResponse for key, calling build() for its payload once on a miss.
+
+        Failure payloads ({'success': False, ...}) are served but not stored,
+        so a transient error is not repeated until the entry expires.
+        """
+        failed = []
+
+        def load(keys):
+            payload = build()
+            entry = self.serialize(payload)
+            if isinstance(payload, dict) and payload.get('success') is False:
+                failed.append(entry)
+                return {}
+            return {key: entry}
+
+        entry = self.cache.get_many_or_load([key], load).get(key)
+        if entry is None:
+            # Our own build failed, or we waited on a build that failed: serve a fresh, uncached attempt
+            entry = failed[0] if failed else self.serialize(build())
+        return entry
+
+    def respond(self, entry, request, max_age=None):
+        """Response for an entry in the best encoding the client accepts, answering 304 on a matching ETag.
+
+        max_age=None means clients must revalidate on every use (no-cache).
+        """
+        coding = request.accept_encodings.best_match([coding for coding in ('br', 'gzip') if coding in entry.variants])
+        response = Response(entry.variants[coding] if coding else entry.body, mimetype='application/json')
+        if coding:
+            response.headers['Content-Encoding'] = coding
+        # Each encoding is its own representation, so each gets its own ETag
+        response.set_etag(entry.etag + (f'-{coding}' if coding else ''))
+        response.vary.add('Accept-Encoding')
+        response.cache_control.private = True
+        if max_age is None:
+            response.cache_control.no_cache = True
+        else:
+            response.cache_control.max_age = max_age
+        return response.make_conditional(request)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        """Return cache statistics, including the stored bytes"""
+        return dict(self.cache.stats(), brotli=brotli is not None)
@@ -0,0 +1,241 @@
+from statistics import NormalDist
+import numpy as np
+from config import Config
+from cache import TTLCache
+
+TRADING_DAYS_PER_YEAR = 252
+BENCHMARK_COLUMN = '__benchmark__'  # kept apart from the portfolio's own columns, even when it holds the benchmark symbol
+
+
+def tail_size(observations, confidence):
+    """Number of worst days in the (1 - confidence) tail, at least one"""
+    return max(int(np.floor(observations * (1.0 - confidence))), 1)
+
+
+def historical_var_cvar(pnl, confidence=0.95):
+    """Historical VaR and CVaR (as positive losses) of every column of a days x portfolios return array.
+
+    VaR is the k-th worst return for k = floor(days * (1 - confidence)) and
+    CVaR the mean of the k worst, found with one partition per column rather
+    than a full sort.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    k = tail_size(len(pnl), confidence)
+    tail = np.partition(pnl, k - 1, axis=0)[:k]
+    return -tail.max(axis=0), -tail.mean(axis=0)
+
+
+def parametric_var_cvar(mean, volatility, confidence=0.95):
+    """Gaussian VaR and CVaR (as positive losses) from mean and volatility arrays"""
+    z = NormalDist().inv_cdf(confidence)
+    density = np.exp(-0.5 * z * z) / np.sqrt(2 * np.pi)
+    return z * volatility - mean, volatility * density / (1.0 - confidence) - mean
+
+
+def component_cvar(returns, weights, confidence=0.95):
+    """Each position's share of the historical CVaR of one portfolio (Euler allocation).
+
+    Component i is minus the weighted return of asset i averaged over the
+    portfolio's tail days, so the components add up to the CVaR.
+    """
+    pnl = returns @ weights
+    k = tail_size(len(pnl), confidence)
+    tail_days = np.argpartition(pnl, k - 1)[:k]
+    return -weights * returns[tail_days].mean(axis=0)
+
+
+def betas(returns, benchmark):
+    """Beta of every column of a days x n return array against a benchmark return series"""
+    centered = benchmark - benchmark.mean()
+    variance = centered @ centered
+    if variance == 0:
+        return np.full(returns.shape[1], np.nan)
+    return centered @ (returns - returns.mean(axis=0)) / variance
+
+
+def correlation_clusters(correlation, threshold=0.5):
+    """Average-linkage hierarchical clustering of assets on correlation distance.
+
+    The distance sqrt((1 - rho) / 2) is 0 for perfectly correlated assets and
+    1 for perfectly anti-correlated ones. Clusters are merged, closest pair
+    first, while their average distance corresponds to a correlation of at
+    least `threshold`. Returns a cluster label per asset, numbered by first
+    appearance.
+    """
+    n = len(correlation)
+    distance = np.sqrt(np.clip((1.0 - np.asarray(correlation, dtype=np.float64)) / 2.0, 0.0, 1.0))
+    cutoff = np.sqrt((1.0 - threshold) / 2.0)
+    np.fill_diagonal(distance, np.inf)
+    members = [[i] for i in range(n)]
+    active = np.ones(n, dtype=bool)
+
+    while active.sum() > 1:
+        masked = np.where(active[:, None] & active[None, :], distance, np.inf)
+        a, b = np.unravel_index(np.argmin(masked), masked.shape)
+        if masked[a, b] > cutoff:
+            break
+        # Lance-Williams update: the merged cluster's distance is the size-weighted average
+        size_a, size_b = len(members[a]), len(members[b])
+        merged = (size_a * distance[a] + size_b * distance[b]) / (size_a + size_b)
+        distance[a], distance[:, a] = merged, merged
+        distance[a, a] = np.inf
+        members[a] += members[b]
+        active[b] = False
+
+    labels = np.empty(n, dtype=np.int64)
+    order = sorted((members[i] for i in np.flatnonzero(active)), key=min)
+    for label, cluster in enumerate(order):
+        labels[cluster] = label
+    return labels
+
+
+class RiskModel:
+    """Aligned daily returns of a set of symbols (and a benchmark), with the statistics every portfolio reuses"""
+
+    def __init__(self, symbols, returns, benchmark_returns, as_of, cluster_threshold=0.5):
+        self.symbols = list(symbols)
+        self.returns = returns
+        self.benchmark_returns = benchmark_returns
+        self.as_of = as_of
+        self.observations = len(returns)
+        self.mean = returns.mean(axis=0)
+        self.covariance = np.atleast_2d(np.cov(returns, rowvar=False))
+        volatility = np.sqrt(np.diag(self.covariance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.correlation = np.nan_to_num(self.covariance / np.outer(volatility, volatility))
+        np.fill_diagonal(self.correlation, 1.0)
+        self.asset_betas = betas(returns, benchmark_returns) if benchmark_returns is not None else None
+        self.clusters = correlation_clusters(self.correlation, cluster_threshold)
+
+
+class RiskEngine:
+    """Portfolio risk from return matrices cached per (symbols, benchmark, window, as-of date).
+
+    One model serves any number of weight vectors: evaluate() takes a
+    portfolios x assets weight matrix and computes every measure for all
+    of them with a handful of matrix operations.
+    """
+
+    def __init__(self, cache_size=100, ttl=86400, confidence=0.95, cluster_threshold=0.5):
+        self.cache = TTLCache(max_size=cache_size, ttl=ttl)
+        self.confidence = confidence
+        self.cluster_threshold = cluster_threshold
+
+    def model(self, histories, benchmark=None, window=252):
+        """Return the RiskModel for the symbols' (and benchmark's) last `window` common daily returns"""
+        from screening import build_price_matrix
+
+        histories = {symbol: hist for symbol, hist in histories.items() if hist is not None and len(hist) > 1}
+        if not histories:
+            raise ValueError("No price history for the portfolio")
+        symbols = tuple(sorted(histories))
+        as_of = max(hist.index[-1] for hist in histories.values())
+        has_benchmark = benchmark is not None and len(benchmark) > 1
+        key = (symbols, window, as_of, benchmark.index[-1] if has_benchmark else None)
+
+        def load():
+            columns = dict(histories)
+            if has_benchmark:
+                columns[BENCHMARK_COLUMN] = benchmark
+            prices = build_price_matrix(columns)
+            values = prices[list(symbols) + ([BENCHMARK_COLUMN] if has_benchmark else [])].to_numpy(dtype=np.float64)[-(window + 1):]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns = np.diff(values, axis=0) / values[:-1]
+            returns = returns[np.isfinite(returns).all(axis=1)]
+            if len(returns) < 30:
+                raise ValueError("Not enough overlapping history to estimate risk")
+            benchmark_returns = returns[:, -1] if has_benchmark else None
+            asset_returns = returns[:, :-1] if has_benchmark else returns
+            return RiskModel(symbols, asset_returns, benchmark_returns, as_of, self.cluster_threshold)
+
+        return self.cache.get_or_load(key, load)
+
+    def evaluate(self, model, weights, confidence=None, horizon_days=1):
+        """VaR, CVaR, volatility and beta of many portfolios at once.
+
+        weights is a portfolios x assets array (or one weight vector) in the
+        order of model.symbols. Returns {measure: array per portfolio}, as
+        fractions of portfolio value over horizon_days; multi-day figures use
+        the square-root-of-time rule. Beta is included when the model has a
+        benchmark.
+        """
+        confidence = confidence or self.confidence
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        pnl = model.returns @ weights.T  # days x portfolios
+        historical_var, historical_cvar = historical_var_cvar(pnl, confidence)
+        mean = weights @ model.mean
+        volatility = np.sqrt(np.maximum(np.einsum('pi,ij,pj->p', weights, model.covariance, weights), 0.0))
+        parametric_var, parametric_cvar = parametric_var_cvar(mean, volatility, confidence)
+        scale = np.sqrt(horizon_days)
+        measures = {
+            'historical_var': historical_var * scale,
+            'historical_cvar': historical_cvar * scale,
+            'parametric_var': parametric_var * scale,
+            'parametric_cvar': parametric_cvar * scale,
+            'volatility': volatility * np.sqrt(TRADING_DAYS_PER_YEAR)
+        }
+        if model.asset_betas is not None:
+            measures['beta'] = weights @ model.asset_betas
+        return measures
+
+    def report(self, model, weights, value, confidence=None, horizon_days=1):
+        """Risk measures of one portfolio in fractions and currency, per position and per correlation cluster"""
+        from optimizer import risk_contributions
+
+        confidence = confidence or self.confidence
+        weights = np.asarray(weights, dtype=np.float64)
+        measures = {name: float(values[0]) for name, values in self.evaluate(model, weights, confidence, horizon_days).items()}
+        contributions = risk_contributions(weights, model.covariance) if measures['volatility'] > 0 else np.zeros(len(weights))
+        components = component_cvar(model.returns, weights, confidence) * np.sqrt(horizon_days)
+
+        positions = []
+        for i, symbol in enumerate(model.symbols):
+            positions.append({
+                'symbol': symbol,
+                'weight': float(weights[i]),
+                'risk_contribution': float(contributions[i]),
+                'cvar_contribution': float(components[i] * value),
+                'beta': float(model.asset_betas[i]) if model.asset_betas is not None else None,
+                'cluster': int(model.clusters[i])
+            })
+
+        clusters = []
+        for label in range(int(model.clusters.max()) + 1 if len(model.clusters) else 0):
+            members = np.flatnonzero(model.clusters == label)
+            pairs = model.correlation[np.ix_(members, members)]
+            clusters.append({
+                'symbols': [model.symbols[i] for i in members],
+                'weight': float(weights[members].sum()),
+                'risk_contribution': float(contributions[members].sum()),
+                'average_correlation': float((pairs.sum() - len(members)) / (len(members) * (len(members) - 1))) if len(members) > 1 else 1.0
+            })
+
+        result = {
+            'confidence': confidence,
+            'horizon_days': horizon_days,
+            'value': float(value),
+            'beta': None
+        }
+        for name, measure in measures.items():
+            result[name] = measure
+            if name.endswith('var'):
+                result[f'{name}_amount'] = measure * value
+        result.update({
+            'positions': positions,
+            'clusters': clusters,
+            'observations': model.observations,
+            'as_of': str(model.as_of)
+        })
+        return result
+
+    def stats(self):
+        """Return return matrix cache statistics"""
+        return self.cache.stats()
+
+
+# Global risk engine instance
+risk_engine = RiskEngine(
+    cache_size=Config.RISK_CACHE_SIZE,
+    confidence=Config.RISK_CONFIDENCE,
+    cluster_threshold=Config.RISK_CLUSTER_THRESHOLD
+)
@@ -0,0 +1,332 @@
+import json
+import math
+import os
+import threading
+from collections import deque
+
+TRADING_DAYS = 252
+STATE_FILE = 'rolling.json'
+
+
+class RunningMoments:
+    """Mean, variance and covariance of (x, y) pairs with O(1) add and remove (Welford)"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
+
+    def add(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    def remove(self, x, y):
+        if self.n <= 1:
+            self.reset()
+            return
+        # Invert add(): recover the means without this pair, then undo its contribution
+        self.n -= 1
+        mean_x = self.mean_x - (x - self.mean_x) / self.n
+        mean_y = self.mean_y - (y - self.mean_y) / self.n
+        self.m2_x -= (x - mean_x) * (x - self.mean_x)
+        self.m2_y -= (y - mean_y) * (y - self.mean_y)
+        self.c_xy -= (x - mean_x) * (y - self.mean_y)
+        self.mean_x, self.mean_y = mean_x, mean_y
+
+    def variance_x(self):
+        return max(self.m2_x, 0.0) / (self.n - 1) if self.n > 1 else None
+
+    def beta(self):
+        return self.c_xy / self.m2_y if self.n > 1 and self.m2_y > 0 else None
+
+
+class RunningTrend:
+    """Least-squares line through the last closes (x = 0..n-1) with O(1) updates at either end"""
+
+    def __init__(self):
+        self.values = deque()
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+
+    def push_back(self, y):
+        self.sum_xy += len(self.values) * y
+        self.sum_y += y
+        self.values.append(y)
+
+    def pop_back(self):
+        y = self.values.pop()
+        self.sum_xy -= len(self.values) * y
+        self.sum_y -= y
+        return y
+
+    def push_front(self, y):
+        self.sum_xy += self.sum_y  # every existing point moves one step right
+        self.sum_y += y
+        self.values.appendleft(y)
+
+    def pop_front(self):
+        y = self.values.popleft()
+        self.sum_y -= y
+        self.sum_xy -= self.sum_y  # every remaining point moves one step left
+        return y
+
+    def rebase(self):
+        """Recompute the sums exactly from the stored values"""
+        self.sum_y = math.fsum(self.values)
+        self.sum_xy = math.fsum(x * y for x, y in enumerate(self.values))
+
+    def fit(self):
+        """Return (intercept, slope) or None with fewer than two points"""
+        n = len(self.values)
+        if n < 2:
+            return None
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        slope = (n * self.sum_xy - sum_x * self.sum_y) / (n * sum_xx - sum_x ** 2)
+        return (self.sum_y - slope * sum_x) / n, slope
+
+
+class SymbolStats:
+    """Rolling Sharpe, volatility, beta and trend for one symbol, updated one bar at a time.
+
+    Keeps the last `window` daily returns (paired with the benchmark's) and
+    closes. Appending a bar expires the oldest one; a new bar for the last
+    date (a partial day being refreshed) replaces the newest one instead.
+    """
+
+    def __init__(self, window=252):
+        self.window = window
+        self.pairs = deque()  # (return, benchmark return)
+        self.moments = RunningMoments()
+        self.trend = RunningTrend()
+        self.last = None  # (date ordinal, close, benchmark close) of the newest bar
+        self.previous = None  # the bar before it, to recompute a replaced newest return
+        self.expired = None  # (pair, close) dropped by the newest bar, restored on replace
+        self.updates = 0
+
+    def update(self, day, close, benchmark_close=None):
+        """Apply one bar; day is a date ordinal. Returns False for bars older than the newest"""
+        if self.last is not None and day < self.last[0]:
+            return False
+        if self.last is not None and day == self.last[0]:
+            self._pop_newest()
+        self._push(day, close, benchmark_close)
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self.rebase()  # bound floating point drift; amortized O(1)
+        return True
+
+    def _push(self, day, close, benchmark_close):
+        expired_pair = expired_close = None
+        if self.last is not None:
+            _, last_close, last_benchmark = self.last
+            pair = (close / last_close - 1.0, self._benchmark_return(benchmark_close, last_benchmark))
+            self.pairs.append(pair)
+            self.moments.add(*pair)
+            if len(self.pairs) > self.window:
+                expired_pair = self.pairs.popleft()
+                self.moments.remove(*expired_pair)
+        self.trend.push_back(close)
+        if len(self.trend.values) > self.window:
+            expired_close = self.trend.pop_front()
+        self.previous, self.last = self.last, (day, close, benchmark_close)
+        self.expired = (expired_pair, expired_close)
+
+    def _pop_newest(self):
+        if self.previous is not None:
+            self.moments.remove(*self.pairs.pop())
+        self.trend.pop_back()
+        expired_pair, expired_close = self.expired or (None, None)
+        if expired_pair is not None:
+            self.pairs.appendleft(expired_pair)
+            self.moments.add(*expired_pair)
+        if expired_close is not None:
+            self.trend.push_front(expired_close)
+        self.last, self.previous, self.expired = self.previous, None, None
+
+    def _benchmark_return(self, benchmark_close, last_benchmark):
+        if benchmark_close is None or last_benchmark is None or not last_benchmark:
+            return 0.0
+        return benchmark_close / last_benchmark - 1.0
+
+    def rebase(self):
+        """Recompute every accumulator exactly from the stored window"""
+        self.moments.reset()
+        for pair in self.pairs:
+            self.moments.add(*pair)
+        self.trend.rebase()
+
+    def metrics(self, risk_free_rate=0.02, min_periods=30):
+        """Annualized Sharpe and volatility, beta to the benchmark and the price trend.
+
+        Sharpe is None with fewer than min_periods bars, as in screening.compute_factors.
+        """
+        variance = self.moments.variance_x()
+        std = math.sqrt(variance) if variance else None
+        sharpe = None
+        if std and self.moments.n >= min_periods - 1:
+            sharpe = math.sqrt(TRADING_DAYS) * (self.moments.mean_x - risk_free_rate / TRADING_DAYS) / std
+        fit = self.trend.fit()
+        return {
+            'observations': self.moments.n,
+            'sharpe_ratio': sharpe,
+            'volatility': std * math.sqrt(TRADING_DAYS) if std is not None else None,
+            'beta': self.moments.beta(),
+            'trend_intercept': fit[0] if fit else None,
+            'trend_slope': fit[1] if fit else None,
+            'last_close': self.last[1] if self.last else None
+        }
+
+    def to_dict(self):
+        return {
+            'window': self.window,
+            'pairs': list(self.pairs),
+            'closes': list(self.trend.values),
+            'last': self.last,
+            'previous': self.previous,
+            'expired': self.expired,
+            'updates': self.updates
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls(state['window'])
+        stats.pairs = deque(tuple(pair) for pair in state['pairs'])
+        stats.trend.values = deque(state['closes'])
+        stats.last = tuple(state['last']) if state['last'] else None
+        stats.previous = tuple(state['previous']) if state['previous'] else None
+        expired = state.get('expired')
+        stats.expired = (tuple(expired[0]) if expired[0] else None, expired[1]) if expired else None
+        stats.updates = state['updates']
+        stats.rebase()
+        return stats
+
+
+def _naive(series):
+    """Drop the timezone and time of day so bars compare by calendar date"""
+    index = series.index
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return series.set_axis(index.normalize())
+
+
+class RollingStatsEngine:
+    """Per-symbol rolling statistics kept up to date bar by bar and persisted next to the price store"""
+
+    def __init__(self, window=252, directory=None, risk_free_rate=0.02):
+        self.window = window
+        self.directory = directory
+        self.risk_free_rate = risk_free_rate
+        self._stats = {}
+        self._lock = threading.RLock()
+        self.bars_applied = 0
+        self.loaded = 0
+
+    def _path(self, symbol):
+        return os.path.join(self.directory, symbol, STATE_FILE)
+
+    def get(self, symbol):
+        """Return the symbol's state, loading it from disk on first use"""
+        with self._lock:
+            stats = self._stats.get(symbol)
+            if stats is None:
+                stats = self._load(symbol) or SymbolStats(self.window)
+                self._stats[symbol] = stats
+            return stats
+
+    def _load(self, symbol):
+        if not self.directory or not os.path.exists(self._path(symbol)):
+            return None
+        try:
+            with open(self._path(symbol)) as f:
+                state = json.load(f)
+            if state.get('window') != self.window:
+                return None  # window changed; rebuild from history
+            self.loaded += 1
+            return SymbolStats.from_dict(state)
+        except Exception as e:
+            print(f"Error loading rolling stats for {symbol}: {e}")
+            return None
+
+    def save(self, symbol):
+        """Write the symbol's state atomically next to its price columns"""
+        if not self.directory:
+            return
+        with self._lock:
+            state = self.get(symbol).to_dict()
+        path = self._path(symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+    def last_date(self, symbol):
+        """Date of the newest applied bar as a pandas Timestamp, or None"""
+        import pandas as pd
+
+        last = self.get(symbol).last
+        return pd.Timestamp.fromordinal(last[0]) if last else None
+
+    def catch_up(self, symbol, hist, benchmark=None):
+        """Apply bars of `hist` from the newest applied date on; returns the number applied.
+
+        hist may hold older bars too; only the ones not yet seen (or a changed
+        newest bar) are touched, and a cold start only needs the last
+        `window` + 1 bars. State is written only when a bar was applied.
+        """
+        if hist is None or len(hist) == 0:
+            return 0
+        import pandas as pd
+
+        stats = self.get(symbol)
+        closes = _naive(hist['Close'].dropna())
+        if stats.last is not None:
+            closes = closes[closes.index >= pd.Timestamp.fromordinal(stats.last[0])]
+        else:
+            closes = closes.iloc[-(self.window + 1):]
+        if len(closes) == 0:
+            return 0
+
+        benchmark_closes = [None] * len(closes)
+        if benchmark is not None and len(benchmark) > 0:
+            aligned = _naive(benchmark['Close'].dropna()).reindex(closes.index, method='ffill')
+            benchmark_closes = [None if value != value else float(value) for value in aligned]
+
+        with self._lock:
+            applied = 0
+            for date, close, benchmark_close in zip(closes.index, closes.to_numpy(), benchmark_closes):
+                bar = (date.toordinal(), float(close), benchmark_close)
+                if bar == stats.last:
+                    continue  # the newest bar again, unchanged; only a refreshed close replaces it
+                applied += stats.update(*bar)
+            self.bars_applied += applied
+            if applied:
+                self.save(symbol)
+        return applied
+
+    def metrics(self, symbols):
+        """Return {symbol: metrics} for symbols with at least one applied bar"""
+        results = {}
+        for symbol in symbols:
+            stats = self.get(symbol)
+            if stats.last is not None:
+                results[symbol] = stats.metrics(self.risk_free_rate)
+        return results
+
+    def stats(self):
+        """Return counts of tracked symbols and applied bars"""
+        return {
+            'symbols': len(self._stats),
+            'window': self.window,
+            'bars_applied': self.bars_applied,
+            'loaded_from_disk': self.loaded
+        }
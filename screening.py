@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+MOMENTUM_WINDOW = 126  # ~6 months of trading days
+
+
+def build_price_matrix(histories, field='Close'):
+    """Align per-symbol histories into one dates x symbols price DataFrame"""
+    columns = {symbol: hist[field] for symbol, hist in histories.items() if hist is not None and len(hist) > 0}
+    if not columns:
+        return pd.DataFrame()
+    prices = pd.concat(columns, axis=1).sort_index()
+    # Carry prices over dates a symbol did not trade; leading gaps stay NaN
+    return prices.ffill()
+
+
+def first_valid_rows(values):
+    """Row index of the first non-NaN value in each column (len(values) if none)"""
+    valid = ~np.isnan(values)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(values))
+
+
+def compute_factors(prices, risk_free_rate=0.02, min_periods=30):
+    """Compute Sharpe, volatility, drawdown and return factors for every column at once"""
+    symbols = list(prices.columns)
+    factor_names = ['sharpe_ratio', 'volatility', 'max_drawdown', 'total_return', 'momentum']
+    if len(prices) < 2 or not symbols:
+        return pd.DataFrame(np.nan, index=symbols, columns=factor_names)
+
+    values = prices.to_numpy(dtype=np.float64)
+    returns = values[1:] / values[:-1] - 1.0
+    valid = ~np.isnan(returns)
+    counts = valid.sum(axis=0)
+
+    # Mean and sample standard deviation per column, ignoring NaNs
+    filled = np.where(valid, returns, 0.0)
+    safe_counts = np.maximum(counts, 1)
+    mean = filled.sum(axis=0) / safe_counts
+    centered = np.where(valid, returns - mean, 0.0)
+    std = np.sqrt((centered ** 2).sum(axis=0) / np.maximum(counts - 1, 1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.sqrt(TRADING_DAYS) * (mean - risk_free_rate / TRADING_DAYS) / std
+    sharpe[(counts < min_periods - 1) | ~np.isfinite(sharpe)] = np.nan
+    volatility = std * np.sqrt(TRADING_DAYS)
+    volatility[counts < 2] = np.nan
+
+    # Drawdown from the running peak of each column
+    running_max = np.fmax.accumulate(values, axis=0)
+    max_drawdown = np.nanmin(np.where(np.isnan(values), 0.0, values / running_max - 1.0), axis=0)
+
+    last = values[-1]
+    first_rows = first_valid_rows(values)
+    columns = np.arange(len(symbols))
+    first = values[np.minimum(first_rows, len(values) - 1), columns]
+    total_return = last / first - 1.0
+
+    window_start = max(len(values) - 1 - MOMENTUM_WINDOW, 0)
+    momentum = last / values[window_start] - 1.0
+
+    factors = pd.DataFrame({
+        'sharpe_ratio': sharpe,
+        'volatility': volatility,
+        'max_drawdown': max_drawdown,
+        'total_return': total_return,
+        'momentum': momentum
+    }, index=symbols)
+    factors.loc[counts == 0, :] = np.nan
+    return factors
+
+
+def ratio_array(values):
+    """Convert optional ratios (None or non-numeric for missing) to a float array with NaNs"""
+    array = []
+    for value in values:
+        try:
+            array.append(np.nan if value is None else float(value))
+        except (TypeError, ValueError):
+            array.append(np.nan)
+    return np.array(array, dtype=np.float64)
+
+
+def optional_float(value):
+    """Convert a NaN-able number back to a JSON-friendly float or None"""
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def average_ratios(*ratios, min_count=2):
+    """Element-wise mean of the ratio arrays, NaN where fewer than min_count are available.
+
+    Arrays are broadcast together, so per-symbol ratios can be averaged with a
+    dates x symbols matrix of ratios.
+    """
+    stacked = np.stack(np.broadcast_arrays(*[np.asarray(r, dtype=np.float64) for r in ratios]))
+    valid = ~np.isnan(stacked)
+    counts = valid.sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        average = np.where(valid, stacked, 0.0).sum(axis=0) / counts
+    average[counts < min_count] = np.nan
+    return average
+
+
+def top_k(scores, k):
+    """Indices of the k highest non-NaN scores, best first, without a full sort"""
+    scores = np.asarray(scores, dtype=np.float64)
+    candidates = np.flatnonzero(~np.isnan(scores))
+    if len(candidates) == 0:
+        return candidates
+    k = min(k, len(candidates))
+    if k < len(candidates):
+        partition = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = candidates[partition]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
@@ -2,6 +2,8 @@
 
 let analyzedStocks = [];
 let selectedStocks = [];
+let quoteSource = null;
+let quoteSymbols = '';
 
 // DOM elements
 const analyzeBtn = document.getElementById('analyzeBtn');
@@ -10,12 +12,14 @@ const analysisResults = document.getElementById('analysisResults');
 const stocksTableBody = document.getElementById('stocksTableBody');
 const portfolioSection = document.getElementById('portfolioSection');
 const portfolioAmount = document.getElementById('portfolioAmount');
+const portfolioStrategy = document.getElementById('portfolioStrategy');
 const createPortfolioBtn = document.getElementById('createPortfolioBtn');
 const portfolioResults = document.getElementById('portfolioResults');
 const portfolioTableBody = document.getElementById('portfolioTableBody');
 const projectionSection = document.getElementById('projectionSection');
 const projectionStock = document.getElementById('projectionStock');
 const projectionMonths = document.getElementById('projectionMonths');
+const projectionModel = document.getElementById('projectionModel');
 const calculateProjectionBtn = document.getElementById('calculateProjectionBtn');
 const projectionResults = document.getElementById('projectionResults');
 
@@ -26,34 +30,137 @@ calculateProjectionBtn.addEventListener('click', calculateProjection);
 
 // Start stock analysis
 async function startAnalysis() {
+    // Stream rows from an analysis job when the browser supports Server-Sent Events
+    if (window.EventSource) {
+        return startAnalysisJob();
+    }
+    
     try {
         // Show loading state
-        analyzeBtn.disabled = true;
-        analyzeBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Analyzing...';
-        loadingAnalysis.classList.remove('d-none');
+        setAnalysisLoading(true);
         
-        // Make API call
-        const response = await fetch('/analyze', {
+        // GET revalidates with the ETag, so an unchanged ranking comes back as a 304
+        const response = await fetch('/analyze', {cache: 'no-cache'});
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            analyzedStocks = data.stocks;
+            displayAnalysisResults(analyzedStocks);
+            watchQuotes(analyzedStocks);
+            if (data.mock_data) {
+                showMessage('Live market data was unavailable, so some results are sample data.', 'warning');
+            } else {
+                showSuccessMessage('Stock analysis completed successfully! ' + formatDataAge((Date.now() - Date.parse(data.as_of)) / 1000));
+            }
+        } else {
+            showErrorMessage('Error analyzing stocks: ' + data.error);
+        }
+    } catch (error) {
+        showErrorMessage('Network error: ' + error.message);
+    } finally {
+        setAnalysisLoading(false);
+    }
+}
+
+// Run the analysis as a background job and render rows as they are scored
+async function startAnalysisJob() {
+    try {
+        setAnalysisLoading(true);
+        
+        const response = await fetch('/analyze/jobs', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({})
+        });
+        
+        const data = await response.json();
+        
+        if (!data.success) {
+            showErrorMessage('Error analyzing stocks: ' + data.error);
+            setAnalysisLoading(false);
+            return;
+        }
+        
+        const liveStocks = [];
+        const source = new EventSource(data.stream_url);
+        
+        source.addEventListener('row', event => {
+            liveStocks.push(JSON.parse(event.data));
+            liveStocks.sort((a, b) => b.avg_ratio - a.avg_ratio);
+            displayAnalysisResults(liveStocks.slice(0, 10));
+        });
+        
+        source.addEventListener('progress', event => {
+            const progress = JSON.parse(event.data);
+            analyzeBtn.innerHTML = `<i class="fas fa-spinner fa-spin me-2"></i>Analyzing... ${progress.completed}/${progress.total}`;
+        });
+        
+        source.addEventListener('done', event => {
+            source.close();
+            analyzedStocks = JSON.parse(event.data).stocks;
+            displayAnalysisResults(analyzedStocks);
+            watchQuotes(analyzedStocks);
+            if (analyzedStocks.some(stock => stock.is_mock)) {
+                showMessage('Live market data was unavailable, so some results are sample data.', 'warning');
+            } else {
+                showSuccessMessage('Stock analysis completed successfully!');
             }
+            setAnalysisLoading(false);
         });
         
+        source.addEventListener('failed', event => {
+            source.close();
+            showErrorMessage('Error analyzing stocks: ' + JSON.parse(event.data).error);
+            setAnalysisLoading(false);
+        });
+        
+        source.onerror = () => {
+            // The stream dropped; fall back to polling the job status
+            source.close();
+            pollAnalysisJob(data.status_url);
+        };
+    } catch (error) {
+        showErrorMessage('Network error: ' + error.message);
+        setAnalysisLoading(false);
+    }
+}
+
+// Poll an analysis job until it finishes
+async function pollAnalysisJob(statusUrl) {
+    try {
+        const response = await fetch(statusUrl);
         const data = await response.json();
         
-        if (data.success) {
+        if (!data.success) {
+            showErrorMessage('Error analyzing stocks: ' + data.error);
+        } else if (data.status === 'done') {
             analyzedStocks = data.stocks;
             displayAnalysisResults(analyzedStocks);
+            watchQuotes(analyzedStocks);
             showSuccessMessage('Stock analysis completed successfully!');
-        } else {
+        } else if (data.status === 'failed') {
             showErrorMessage('Error analyzing stocks: ' + data.error);
+        } else {
+            analyzeBtn.innerHTML = `<i class="fas fa-spinner fa-spin me-2"></i>Analyzing... ${data.completed}/${data.total}`;
+            setTimeout(() => pollAnalysisJob(statusUrl), 1000);
+            return;
         }
     } catch (error) {
         showErrorMessage('Network error: ' + error.message);
-    } finally {
-        // Reset button state
-        analyzeBtn.disabled = false;
+    }
+    setAnalysisLoading(false);
+}
+
+// Toggle the analysis loading state
+function setAnalysisLoading(loading) {
+    analyzeBtn.disabled = loading;
+    if (loading) {
+        analyzeBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Analyzing...';
+        loadingAnalysis.classList.remove('d-none');
+    } else {
         analyzeBtn.innerHTML = '<i class="fas fa-play me-2"></i>Start Analysis';
         loadingAnalysis.classList.add('d-none');
     }
@@ -73,11 +180,12 @@ function displayAnalysisResults(stocks) {
             <td>${formatNumber(stock.sharpe_ratio)}</td>
             <td>${formatNumber(stock.dividend_yield)}%</td>
             <td><strong>${formatNumber(stock.avg_ratio)}</strong></td>
-            <td>$${formatNumber(stock.current_price)}</td>
+            <td class="quote-price" data-symbol="${stock.symbol}">$${formatNumber(stock.current_price)}</td>
             <td>
                 <div class="form-check">
                     <input class="form-check-input stock-checkbox" type="checkbox" 
-                           value="${stock.symbol}" data-stock='${JSON.stringify(stock)}'>
+                           value="${stock.symbol}" data-stock='${JSON.stringify(stock)}'
+                           ${selectedStocks.some(selected => selected.symbol === stock.symbol) ? 'checked' : ''}>
                 </div>
             </td>
         `;
@@ -96,6 +204,51 @@ function displayAnalysisResults(stocks) {
     portfolioSection.classList.add('fade-in');
 }
 
+// Stream live price changes for the displayed stocks; all dashboards share one upstream poller
+function watchQuotes(stocks) {
+    const symbols = stocks.filter(stock => !stock.is_mock).map(stock => stock.symbol).join(',');
+    if (!window.EventSource || symbols === quoteSymbols) {
+        return;
+    }
+    if (quoteSource) {
+        quoteSource.close();
+        quoteSource = null;
+    }
+    quoteSymbols = symbols;
+    if (!symbols) {
+        return;
+    }
+    
+    quoteSource = new EventSource('/quotes/stream?symbols=' + encodeURIComponent(symbols));
+    const apply = event => Object.values(JSON.parse(event.data)).forEach(updateQuote);
+    quoteSource.addEventListener('snapshot', apply);
+    quoteSource.addEventListener('quotes', apply);
+}
+
+// Update one price cell (and the stock data behind it) from a streamed quote
+function updateQuote(quote) {
+    [analyzedStocks, selectedStocks].forEach(stocks => stocks.forEach(stock => {
+        if (stock.symbol === quote.symbol) {
+            stock.current_price = quote.price;
+        }
+    }));
+    
+    document.querySelectorAll(`.quote-price[data-symbol="${quote.symbol}"]`).forEach(cell => {
+        cell.textContent = '$' + formatNumber(quote.price);
+        cell.classList.remove('price-up', 'price-down');
+        if (quote.change) {
+            void cell.offsetWidth;  // restart the flash animation
+            cell.classList.add(quote.change > 0 ? 'price-up' : 'price-down');
+        }
+    });
+    
+    document.querySelectorAll(`.stock-checkbox[value="${quote.symbol}"]`).forEach(checkbox => {
+        const stock = JSON.parse(checkbox.dataset.stock);
+        stock.current_price = quote.price;
+        checkbox.dataset.stock = JSON.stringify(stock);
+    });
+}
+
 // Handle stock selection
 function handleStockSelection(event) {
     const stockData = JSON.parse(event.target.dataset.stock);
@@ -149,7 +302,8 @@ async function createPortfolio() {
             },
             body: JSON.stringify({
                 selected_stocks: selectedStocks,
-                portfolio_amount: amount
+                portfolio_amount: amount,
+                strategy: portfolioStrategy.value
             })
         });
         
@@ -157,6 +311,7 @@ async function createPortfolio() {
         
         if (data.success) {
             displayPortfolioResults(data);
+            loadPortfolioRisk(data.portfolio, amount);
             showSuccessMessage('Portfolio created successfully!');
             projectionSection.classList.remove('d-none');
             projectionSection.classList.add('fade-in');
@@ -189,6 +344,7 @@ function displayPortfolioResults(data) {
     
     // Update summary
     document.getElementById('totalAllocation').textContent = formatNumber(data.total_allocation);
+    document.getElementById('cashRemaining').textContent = formatNumber(data.cash_remaining);
     document.getElementById('diversificationScore').textContent = formatNumber(data.diversification_score * 100);
     document.getElementById('diversificationBar').style.width = (data.diversification_score * 100) + '%';
     
@@ -197,6 +353,39 @@ function displayPortfolioResults(data) {
     portfolioResults.classList.add('fade-in');
 }
 
+// Fetch VaR, CVaR and beta of the new portfolio for the summary card
+async function loadPortfolioRisk(portfolio, amount) {
+    const portfolioRisk = document.getElementById('portfolioRisk');
+    portfolioRisk.innerHTML = '';
+    
+    try {
+        const response = await fetch('/portfolio_risk', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                portfolio: portfolio,
+                portfolio_amount: amount
+            })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            const risk = data.risk;
+            portfolioRisk.innerHTML = `
+                <p><strong>1-Day VaR (${Math.round(risk.confidence * 100)}%):</strong> $${formatNumber(risk.historical_var_amount)}</p>
+                <p><strong>1-Day CVaR:</strong> $${formatNumber(risk.historical_cvar_amount)}</p>
+                <p><strong>Beta vs ${data.benchmark}:</strong> ${risk.beta === null ? 'N/A' : formatNumber(risk.beta)}</p>
+                <p><strong>Correlation Clusters:</strong> ${risk.clusters.length}</p>
+            `;
+        }
+    } catch (error) {
+        // Risk figures are supplementary; the portfolio itself is already shown
+    }
+}
+
 // Calculate growth projection
 async function calculateProjection() {
     try {
@@ -217,22 +406,15 @@ async function calculateProjection() {
         calculateProjectionBtn.disabled = true;
         calculateProjectionBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Calculating...';
         
-        // Make API call
-        const response = await fetch('/growth_projection', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                symbol: symbol,
-                months: months
-            })
-        });
+        // GET so the browser can reuse or revalidate a projection it already has
+        const params = new URLSearchParams({symbol: symbol, months: months, model: projectionModel.value});
+        const response = await fetch('/growth_projection?' + params);
         
         const data = await response.json();
         
         if (data.success) {
             displayProjectionResults(data.projection);
+            drawProjectionChart(symbol, months, projectionModel.value);
             showSuccessMessage('Growth projection calculated successfully!');
         } else {
             showErrorMessage('Error calculating projection: ' + data.error);
@@ -258,6 +440,66 @@ function displayProjectionResults(projection) {
     projectionResults.classList.add('fade-in');
 }
 
+// Draw five years of history and the projected trend from the compact /chart payload
+async function drawProjectionChart(symbol, months, model) {
+    const container = document.getElementById('projectionChart');
+    if (typeof Plotly === 'undefined') {
+        return;
+    }
+    
+    try {
+        // One point per pixel; the browser revalidates the cached chart by ETag
+        const params = new URLSearchParams({
+            range: '5y',
+            points: Math.round(container.clientWidth || 800),
+            months: months,
+            model: model
+        });
+        const response = await fetch(`/chart/${encodeURIComponent(symbol)}?${params}`);
+        const chart = await response.json();
+        if (!chart.success) {
+            return;
+        }
+        
+        const traces = [{
+            x: decodeSeries(chart.x).map(dayToDate),
+            y: decodeSeries(chart.close),
+            name: symbol,
+            mode: 'lines'
+        }];
+        if (chart.projection) {
+            traces.push({
+                x: decodeSeries(chart.projection.x).map(dayToDate),
+                y: decodeSeries(chart.projection.y),
+                name: `${model} trend`,
+                mode: 'lines',
+                line: {dash: 'dash'}
+            });
+        }
+        Plotly.react(container, traces, {
+            height: 360,
+            margin: {t: 20, r: 10, b: 40, l: 60},
+            legend: {orientation: 'h'}
+        }, {displayModeBar: false, responsive: true});
+    } catch (error) {
+        console.error('Error drawing chart:', error);
+    }
+}
+
+// Decode a delta- or float32-encoded /chart series
+function decodeSeries(series) {
+    if (series.encoding === 'float32') {
+        const bytes = Uint8Array.from(atob(series.data), c => c.charCodeAt(0));
+        return Array.from(new Float32Array(bytes.buffer));
+    }
+    let total = 0;
+    return series.data.map(delta => (total += delta) / series.scale);
+}
+
+function dayToDate(day) {
+    return new Date(day * 86400000).toISOString().slice(0, 10);
+}
+
 // Utility functions
 function formatNumber(num) {
     if (num === null || num === undefined || isNaN(num)) {
@@ -269,6 +511,14 @@ function formatNumber(num) {
     });
 }
 
+function formatDataAge(ageSeconds) {
+    if (ageSeconds === null || ageSeconds === undefined) {
+        return '';
+    }
+    const minutes = Math.floor(ageSeconds / 60);
+    return minutes < 1 ? '(data updated just now)' : `(data updated ${minutes} min ago)`;
+}
+
 function showSuccessMessage(message) {
     showMessage(message, 'success');
 }
@@ -3,10 +3,23 @@
 Simple test script to verify core functionality of the Stock Portfolio Analyzer
 """
 
+import functools
 import yfinance as yf
 import numpy as np
 from datetime import datetime
 
+def script_test(func):
+    """Wrap a check that prints its result and returns True/False.
+    
+    main() calls the check itself (test.__wrapped__) and counts the result;
+    under pytest the wrapper asserts it instead of returning a value.
+    """
+    @functools.wraps(func)
+    def test():
+        assert func(), f"{func.__name__} failed, see the output above"
+    
+    return test
+
 def test_stock_data():
     """Test basic stock data retrieval"""
     print("Testing stock data retrieval...")
@@ -126,6 +139,1253 @@ def test_growth_projection():
         print(f"✗ Error calculating growth projection: {e}")
         return False
 
+@script_test
+def test_market_data_provider():
+    """Test batched history and pooled info fetching"""
+    print("\nTesting market data provider...")
+    
+    try:
+        import pandas as pd
+        from market_data import MarketDataProvider
+        
+        class FakeSource:
+            """Local stand-in for Yahoo Finance"""
+            
+            def __init__(self):
+                self.download_calls = 0
+                self.info_calls = 0
+            
+            def download(self, symbols, period):
+                self.download_calls += 1
+                dates = pd.bdate_range('2024-01-01', periods=60)
+                return {symbol: pd.DataFrame({'Close': np.linspace(100, 110, 60)}, index=dates) for symbol in symbols}
+            
+            def info(self, symbol):
+                self.info_calls += 1
+                return {'longName': symbol, 'trailingPE': 20.0}
+        
+        source = FakeSource()
+        provider = MarketDataProvider(source=source, max_workers=4)
+        symbols = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA']
+        
+        histories = provider.get_history(symbols, period="1y")
+        infos = provider.get_info(symbols)
+        
+        if source.download_calls == 1 and source.info_calls == len(symbols) and len(histories) == len(infos) == len(symbols):
+            print(f"✓ Fetched {len(symbols)} symbols with 1 history call and {source.info_calls} info calls")
+            return True
+        else:
+            print("✗ Unexpected number of upstream calls")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing market data provider: {e}")
+        return False
+
+@script_test
+def test_ttl_cache():
+    """Test cache expiry, LRU eviction and single-flight loading"""
+    print("\nTesting TTL cache...")
+    
+    try:
+        import threading
+        from cache import TTLCache
+        
+        now = [0.0]
+        cache = TTLCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.set('AAPL', 1)
+        cache.set('MSFT', 2)
+        cache.get('AAPL')
+        cache.set('GOOGL', 3)  # Evicts MSFT, the least recently used entry
+        evicted = cache.get('MSFT') is None and cache.get('AAPL') == 1
+        
+        now[0] = 11.0
+        expired = cache.get('AAPL') is None
+        
+        # Concurrent loads of the same key should share one upstream call
+        calls = []
+        release = threading.Event()
+        
+        def loader():
+            calls.append(1)
+            release.wait(1)
+            return 'loaded'
+        
+        threads = [threading.Thread(target=cache.get_or_load, args=('NVDA', loader)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        
+        if evicted and expired and len(calls) == 1 and cache.get('NVDA') == 'loaded':
+            print(f"✓ Cache evicts, expires and de-duplicates loads: {cache.stats()}")
+            return True
+        else:
+            print("✗ Cache did not behave as expected")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing TTL cache: {e}")
+        return False
+
+@script_test
+def test_rate_limiter():
+    """Test priority ordering and retry/backoff against a fake provider"""
+    print("\nTesting rate limiter...")
+    
+    try:
+        import threading
+        import time
+        from market_data import MarketDataProvider
+        from rate_limiter import RequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_BULK, is_retryable
+        
+        class ThrottledError(Exception):
+            status_code = 429
+        
+        class FlakySource:
+            """Fake provider that throttles the first two requests"""
+            
+            def __init__(self):
+                self.attempts = 0
+            
+            def download(self, symbols, period):
+                return {}
+            
+            def info(self, symbol):
+                self.attempts += 1
+                if self.attempts <= 2:
+                    raise ThrottledError("Too Many Requests")
+                return {'longName': symbol}
+        
+        delays = []
+        retrying = RequestScheduler(600, burst=10, sleep=delays.append, rng=lambda: 1.0)
+        provider = MarketDataProvider(source=FlakySource(), scheduler=retrying)
+        info = provider.get_info(['AAPL'])
+        retried = info == {'AAPL': {'longName': 'AAPL'}} and delays == [1.0, 2.0]
+        
+        # With an empty bucket, an interactive request queued after a bulk one goes first
+        order = []
+        limited = RequestScheduler(1200, burst=1)
+        limited.acquire()
+        bulk = threading.Thread(target=lambda: (limited.acquire(PRIORITY_BULK), order.append('bulk')))
+        interactive = threading.Thread(target=lambda: (limited.acquire(PRIORITY_INTERACTIVE), order.append('interactive')))
+        bulk.start()
+        time.sleep(0.01)
+        interactive.start()
+        bulk.join()
+        interactive.join()
+        
+        # Only status phrases are retryable, not any number in the 500s
+        classified = [is_retryable(Exception(message)) for message in
+                      ('HTTP Error 503: Service Unavailable', 'Too Many Requests', 'Scored 503 of 520 symbols')] == [True, True, False]
+        try:
+            RequestScheduler(0)
+            rejects_zero_rate = False
+        except ValueError:
+            rejects_zero_rate = True
+        
+        stats = retrying.stats()
+        if not (classified and rejects_zero_rate):
+            print(f"✗ Retry classification {classified}, zero rate rejected {rejects_zero_rate}")
+            return False
+        if retried and order == ['interactive', 'bulk'] and stats['retries'] == 2:
+            print(f"✓ Retried throttled calls and served interactive requests first: {stats}")
+            return True
+        else:
+            print(f"✗ Unexpected scheduling: delays={delays}, order={order}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing rate limiter: {e}")
+        return False
+
+@script_test
+def test_vectorized_screening():
+    """Test that the vectorized Sharpe ratios match the per-symbol calculation"""
+    print("\nTesting vectorized screening...")
+    
+    try:
+        import pandas as pd
+        from app import calculate_sharpe_ratio
+        from screening import build_price_matrix, compute_factors, top_k
+        
+        rng = np.random.default_rng(7)
+        dates = pd.bdate_range('2023-01-02', periods=252)
+        histories = {
+            symbol: pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, 252)))}, index=dates)
+            for symbol in ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META']
+        }
+        
+        factors = compute_factors(build_price_matrix(histories))
+        expected = np.array([calculate_sharpe_ratio(hist) for hist in histories.values()])
+        actual = factors['sharpe_ratio'].to_numpy()
+        best = [factors.index[i] for i in top_k(actual, 3)]
+        
+        if np.allclose(actual, expected) and best == list(factors['sharpe_ratio'].nlargest(3).index):
+            print(f"✓ Vectorized Sharpe ratios match; top 3: {best}")
+            return True
+        else:
+            print("✗ Vectorized Sharpe ratios differ from per-symbol results")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing vectorized screening: {e}")
+        return False
+
+@script_test
+def test_price_store():
+    """Test incremental appends and offline reads from the local price store"""
+    print("\nTesting price store...")
+    
+    try:
+        import tempfile
+        import pandas as pd
+        from market_data import MarketDataProvider
+        from price_store import PriceStore
+        
+        class FakeSource:
+            """Serves a fixed 300-day history, honoring start dates"""
+            
+            def __init__(self):
+                self.dates = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=300)
+                self.requests = []
+                self.offline = False
+            
+            def download(self, symbols, period=None, start=None):
+                if self.offline:
+                    raise ConnectionError("network unavailable")
+                self.requests.append(start)
+                dates = self.dates if start is None else self.dates[self.dates >= start]
+                closes = np.arange(len(self.dates), dtype=float)[-len(dates):] + 100
+                return {symbol: pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': 1.0}, index=dates) for symbol in symbols}
+            
+            def info(self, symbol):
+                return {}
+        
+        with tempfile.TemporaryDirectory() as root:
+            source = FakeSource()
+            store = PriceStore(root)
+            
+            # First run backfills; a restarted provider only asks for bars after the last stored date
+            MarketDataProvider(source=source, store=store).get_history(['AAPL'], period="1y")
+            restarted = MarketDataProvider(source=source, store=store)
+            hist = restarted.get_history(['AAPL'], period="1y")['AAPL']
+            incremental = source.requests[0] is None and source.requests[1] == source.dates[-1].strftime('%Y-%m-%d')
+            
+            # Once populated the store serves history without the network
+            source.offline = True
+            offline = MarketDataProvider(source=source, store=store).get_history(['AAPL'], period="2y")['AAPL']
+        
+        if incremental and len(offline) == 300 and hist['Close'].iloc[-1] == 399.0 and len(hist) < 300:
+            print(f"✓ Stored {len(offline)} bars, refreshed incrementally and read {len(hist)} 1y bars offline-capable")
+            return True
+        else:
+            print(f"✗ Unexpected store behavior: requests={source.requests}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing price store: {e}")
+        return False
+
+@script_test
+def test_snapshot_scheduler():
+    """Test that precomputed snapshots are versioned and served without recomputing"""
+    print("\nTesting snapshot scheduler...")
+    
+    try:
+        from precompute import SnapshotScheduler
+        
+        runs = []
+        
+        def compute():
+            runs.append(1)
+            return [{'symbol': 'AAPL', 'avg_ratio': float(len(runs))}]
+        
+        scheduler = SnapshotScheduler(compute, interval=3600)
+        first = scheduler.get_or_refresh()
+        cached = scheduler.get_or_refresh()
+        refreshed = scheduler.refresh()
+        
+        if len(runs) == 2 and cached is first and first['version'] == 1 and refreshed['version'] == 2:
+            print(f"✓ Served snapshot v{first['version']} from memory and refreshed to v{refreshed['version']}")
+            return True
+        else:
+            print(f"✗ Unexpected snapshot behavior: {len(runs)} computations")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing snapshot scheduler: {e}")
+        return False
+
+@script_test
+def test_analysis_jobs():
+    """Test that analysis jobs stream every scored row and then the final ranking"""
+    print("\nTesting analysis jobs...")
+    
+    try:
+        import threading
+        from jobs import JobLimitError, JobManager
+        
+        manager = JobManager(max_workers=2, chunk_size=2)
+        symbols = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA']
+        
+        def score_chunk(chunk):
+            return [{'symbol': symbol, 'avg_ratio': float(len(symbol))} for symbol in chunk]
+        
+        def finalize(rows):
+            return sorted(rows, key=lambda row: row['avg_ratio'], reverse=True)[:3]
+        
+        job = manager.submit('user-1', symbols, score_chunk, finalize)
+        events = list(job.events(timeout=1))
+        streamed = [data['symbol'] for event, data in events if event == 'row']
+        final = events[-1]
+        
+        # Unfinished jobs are bounded: a submit beyond max_jobs is rejected until one finishes
+        release = threading.Event()
+        limited = JobManager(max_workers=1, chunk_size=2, max_jobs=2)
+        blocked = [limited.submit('user-1', symbols, lambda chunk: release.wait(1) and [], finalize) for _ in range(2)]
+        try:
+            limited.submit('user-1', symbols, score_chunk, finalize)
+            rejected = False
+        except JobLimitError:
+            rejected = True
+        release.set()
+        list(blocked[-1].events(timeout=1))
+        accepted = limited.submit('user-1', symbols, score_chunk, finalize) is not None
+        
+        if not (rejected and accepted):
+            print("✗ Unfinished jobs are not bounded by max_jobs")
+            return False
+        if sorted(streamed) == sorted(symbols) and final[0] == 'done' and len(final[1]['stocks']) == 3 and manager.get(job.id, owner='someone-else') is None:
+            print(f"✓ Streamed {len(streamed)} rows in {len(job.chunks)} chunks, then the final top 3")
+            return True
+        else:
+            print(f"✗ Unexpected job events: {events}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing analysis jobs: {e}")
+        return False
+
+@script_test
+def test_projection_engine():
+    """Test closed-form projections against np.polyfit and coefficient caching"""
+    print("\nTesting projection engine...")
+    
+    try:
+        import pandas as pd
+        from projection import ProjectionEngine
+        
+        rng = np.random.default_rng(3)
+        dates = pd.bdate_range('2023-01-02', periods=500)
+        hist = pd.DataFrame({'Close': 100 + np.cumsum(rng.normal(0.1, 1.0, 500))}, index=dates)
+        
+        engine = ProjectionEngine()
+        projections = engine.project({'AAPL': hist}, [6, 12], model='linear')
+        engine.project({'AAPL': hist}, [24], model='linear')  # New horizon, same fit
+        
+        slope, intercept = np.polyfit(np.arange(len(hist)), hist['Close'].values, 1)
+        expected = intercept + slope * (len(hist) - 1 + 12 * 21)
+        stats = engine.stats()
+        
+        if np.isclose(projections['AAPL'][12]['projected_price'], expected) and stats['loads'] == 1 and stats['hits'] == 1:
+            print(f"✓ 12-month projection {expected:.2f} matches np.polyfit; horizon change reused cached fit")
+            return True
+        else:
+            print(f"✗ Projection mismatch or unexpected cache use: {stats}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing projection engine: {e}")
+        return False
+
+@script_test
+def test_monte_carlo():
+    """Test that Monte Carlo bands are reproducible and ordered"""
+    print("\nTesting Monte Carlo simulation...")
+    
+    try:
+        from monte_carlo import MonteCarloSimulator, percentile_bands
+        
+        rng = np.random.default_rng(11)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.01, size=(300, 3)), axis=0))
+        
+        simulator = MonteCarloSimulator(n_paths=2000, chunk_size=500, seed=5)
+        checkpoints, paths = simulator.simulate(prices, 63, band_every=21)
+        _, repeated = simulator.simulate(prices, 63, band_every=21)
+        _, bootstrapped = simulator.simulate(prices, 63, method='bootstrap', band_every=21)
+        bands = percentile_bands(paths[:, :, 0])
+        ordered = all(bands['5'][i] < bands['50'][i] < bands['95'][i] for i in range(len(checkpoints)))
+        
+        if list(checkpoints) == [21, 42, 63] and np.array_equal(paths, repeated) and ordered and bootstrapped.shape == paths.shape:
+            print(f"✓ Seeded simulation is reproducible; 63-day 5-95% band: {bands['5'][-1]:.2f}-{bands['95'][-1]:.2f}")
+            return True
+        else:
+            print("✗ Monte Carlo bands are not reproducible or not ordered")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing Monte Carlo simulation: {e}")
+        return False
+
+@script_test
+def test_portfolio_optimizer():
+    """Test min-variance, max-Sharpe and risk-parity weights and the covariance cache"""
+    print("\nTesting portfolio optimizer...")
+    
+    try:
+        import pandas as pd
+        from optimizer import PortfolioOptimizer, ledoit_wolf, risk_contributions
+        
+        rng = np.random.default_rng(21)
+        factor = rng.normal(0, 0.01, size=(400, 1))
+        returns = factor * rng.uniform(0.5, 1.5, size=8) + rng.normal(0.0004, 0.01, size=(400, 8)) * np.linspace(0.5, 2, 8)
+        dates = pd.bdate_range(end='2024-12-31', periods=400)
+        histories = {f"S{i}": pd.DataFrame({'Close': 100 * np.exp(np.cumsum(returns[:, i]))}, index=dates) for i in range(8)}
+        
+        covariance, shrinkage = ledoit_wolf(returns)
+        optimizer = PortfolioOptimizer()
+        weights = {}
+        for strategy in ['equal', 'min_variance', 'max_sharpe', 'risk_parity']:
+            allocation, risk = optimizer.optimize(histories, strategy, max_weight=0.4)
+            weights[strategy] = np.array(list(allocation.values()))
+            print(f"  - {strategy}: volatility {risk['volatility']:.3f}, Sharpe {risk['sharpe_ratio']:.2f}")
+        
+        model = optimizer.covariance(histories)
+        contributions = risk_contributions(weights['risk_parity'], model.covariance)
+        variance = {name: w @ model.covariance @ w for name, w in weights.items()}
+        # A cap that binds on the unconstrained risk parity weights is enforced too
+        capped, _ = optimizer.optimize(histories, 'risk_parity', max_weight=0.15)
+        weights['capped_risk_parity'] = np.array(list(capped.values()))
+        valid = all(abs(w.sum() - 1) < 1e-9 and w.min() >= 0 and w.max() <= 0.4 + 1e-9 for w in weights.values())
+        
+        if (0 < shrinkage < 1 and np.allclose(covariance, covariance.T) and valid
+                and weights['risk_parity'].max() > 0.15 >= weights['capped_risk_parity'].max() - 1e-9
+                and variance['min_variance'] <= min(variance.values()) + 1e-12
+                and np.allclose(contributions, 1 / 8, atol=1e-6)
+                and optimizer.stats()['hits'] >= 4):
+            print(f"✓ Optimized weights are feasible; shrinkage {shrinkage:.3f}, covariance cached across strategies")
+            return True
+        else:
+            print("✗ Optimized weights are infeasible or not optimal")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing portfolio optimizer: {e}")
+        return False
+
+@script_test
+def test_share_allocation():
+    """Test that whole-share allocation beats flooring on cash and tracking error"""
+    print("\nTesting integer share allocation...")
+    
+    try:
+        from allocation import allocate_shares, allocation_error
+        
+        prices = np.array([150.0, 300.0, 2500.0, 3500.0, 450.0, 200.0, 250.0, 150.0, 160.0, 140.0])
+        weights = np.full(len(prices), 0.1)
+        budgets = np.geomspace(1000, 1000000, 50)
+        
+        shares, cash = allocate_shares(prices, weights, budgets)
+        floored = np.floor(budgets[:, None] * weights / prices)
+        floored_cash = budgets - floored @ prices
+        error = allocation_error(shares, prices, weights, budgets)
+        floored_error = allocation_error(floored, prices, weights, budgets)
+        
+        within_budget = np.allclose(shares @ prices + cash, budgets) and (cash >= -1e-9).all() and (shares >= 0).all()
+        
+        if within_budget and (error <= floored_error + 1e-12).all() and cash.sum() < floored_cash.sum() / 4:
+            print(f"✓ Idle cash {cash.sum() / budgets.sum():.2%} vs {floored_cash.sum() / budgets.sum():.2%} when flooring")
+            tier = np.abs(budgets - 10000).argmin()
+            print(f"  - ${budgets[tier]:,.0f} tier: {dict(zip(['AAPL', 'MSFT', 'GOOGL', 'AMZN'], shares[tier][:4].tolist()))}")
+            return True
+        else:
+            print("✗ Allocation overspent or did worse than flooring")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing share allocation: {e}")
+        return False
+
+@script_test
+def test_backtest():
+    """Test point-in-time Sharpe scores and the vectorized backtest engine"""
+    print("\nTesting backtest engine...")
+    
+    try:
+        import pandas as pd
+        from backtest import Backtester, rolling_sharpe
+        from screening import compute_factors
+        
+        rng = np.random.default_rng(8)
+        dates = pd.bdate_range(end='2024-12-31', periods=1000)
+        closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, size=(1000, 40)), axis=0))
+        prices = pd.DataFrame(closes, index=dates, columns=[f"S{i}" for i in range(40)])
+        prices.iloc[:400, :5] = np.nan  # listed later
+        
+        rows = np.array([450, 999])
+        rolling = rolling_sharpe(prices.to_numpy(), rows, lookback=252)
+        direct = np.vstack([compute_factors(prices.iloc[row - 252:row + 1])['sharpe_ratio'].to_numpy() for row in rows])
+        
+        backtester = Backtester(prices, pe_ratios=rng.uniform(5, 40, 40), dividend_yields=rng.uniform(0, 4, 40))
+        fractional = backtester.run(top_n=10)
+        whole = backtester.run(top_n=10, whole_shares=True, capital=1000000)
+        sweep = backtester.sweep({'top_n': [5, 10], 'frequency': ['M', 'Q']})
+        
+        holdings_ok = all(len(rebalance['holdings']) == 10 for rebalance in fractional['rebalances'])
+        close = abs(fractional['metrics']['total_return'] - whole['metrics']['total_return']) < 0.05
+        
+        if np.allclose(rolling, direct, equal_nan=True) and holdings_ok and close and len(sweep) == 4:
+            metrics = fractional['metrics']
+            print(f"✓ {metrics['rebalances']} rebalances, return {metrics['total_return']:.1%}, "
+                  f"max drawdown {metrics['max_drawdown']:.1%}, turnover {metrics['average_turnover']:.1%}")
+            return True
+        else:
+            print("✗ Backtest scores or results are inconsistent")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing backtest engine: {e}")
+        return False
+
+@script_test
+def test_rolling_stats():
+    """Test incremental rolling metrics against a full pandas recompute"""
+    print("\nTesting rolling statistics engine...")
+    
+    try:
+        import os
+        import tempfile
+        import pandas as pd
+        from rolling import RollingStatsEngine
+        
+        rng = np.random.default_rng(14)
+        dates = pd.bdate_range(end='2024-12-31', periods=400)
+        hist = pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, 400)))}, index=dates)
+        benchmark = pd.DataFrame({'Close': 400 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, 400)))}, index=dates)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            engine = RollingStatsEngine(window=100, directory=directory)
+            engine.catch_up('TEST', hist.iloc[:300], benchmark)
+            # Bars arrive one by one, including an intraday refresh of the newest bar
+            for day in range(300, 400):
+                partial = hist.iloc[day - 1:day + 1].copy()
+                partial.iloc[-1] *= 0.99
+                engine.catch_up('TEST', partial, benchmark)
+                engine.catch_up('TEST', hist.iloc[day - 1:day + 1], benchmark)
+            # Replaying the same history applies nothing and leaves the state file alone
+            path = engine._path('TEST')
+            modified = os.stat(path).st_mtime_ns
+            bars_applied = engine.bars_applied
+            os.utime(path, ns=(modified - 10**9, modified - 10**9))
+            replayed = engine.catch_up('TEST', hist, benchmark)
+            unchanged = (replayed == 0 and engine.bars_applied == bars_applied
+                         and os.stat(path).st_mtime_ns == modified - 10**9)
+            metrics = engine.metrics(['TEST'])['TEST']
+            reloaded = RollingStatsEngine(window=100, directory=directory).metrics(['TEST'])['TEST']
+        
+        returns = hist['Close'].pct_change().iloc[-100:]
+        benchmark_returns = benchmark['Close'].pct_change().iloc[-100:]
+        sharpe = np.sqrt(252) * (returns.mean() - 0.02 / 252) / returns.std()
+        beta = returns.cov(benchmark_returns) / benchmark_returns.var()
+        slope, intercept = np.polyfit(np.arange(100), hist['Close'].iloc[-100:], 1)
+        
+        expected = [sharpe, returns.std() * np.sqrt(252), beta, slope, intercept]
+        actual = [metrics[key] for key in ('sharpe_ratio', 'volatility', 'beta', 'trend_slope', 'trend_intercept')]
+        restored = [reloaded[key] for key in ('sharpe_ratio', 'volatility', 'beta', 'trend_slope', 'trend_intercept')]
+        if not unchanged:
+            print(f"✗ Replaying the same history applied {replayed} bars")
+            return False
+        if np.allclose(actual, expected, rtol=1e-9) and np.allclose(restored, actual, rtol=1e-12) and metrics['observations'] == 100:
+            print(f"✓ Sharpe {metrics['sharpe_ratio']:.3f}, volatility {metrics['volatility']:.1%}, "
+                  f"beta {metrics['beta']:.2f} match a full recompute and survive a reload")
+            return True
+        else:
+            print(f"✗ Rolling metrics differ: {actual} vs {expected}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing rolling statistics: {e}")
+        return False
+
+@script_test
+def test_quote_feed():
+    """Test that many quote subscribers share one upstream poll and receive only deltas"""
+    print("\nTesting live quote feed...")
+    
+    try:
+        import json
+        from quotes import QuoteFeed
+        
+        prices = {'AAPL': 150.0, 'MSFT': 300.0, 'JPM': 140.0}
+        calls = []
+        
+        def fetch(symbols):
+            calls.append(list(symbols))
+            return {symbol: prices[symbol] for symbol in symbols}
+        
+        feed = QuoteFeed(fetch, autostart=False)
+        streams = [feed.events(['AAPL', 'MSFT'] if i % 2 else ['AAPL', 'MSFT', 'JPM']) for i in range(200)]
+        snapshots = [next(stream) for stream in streams]
+        
+        feed.poll_once()
+        # Payloads are either dicts or JSON pre-encoded once for every subscriber it fits
+        decode = lambda data: json.loads(data) if isinstance(data, str) else data
+        first = [decode(next(stream)[2]) for stream in streams]
+        prices['JPM'] = 141.5
+        feed.poll_once()
+        second = next(streams[0])
+        feed.poll_once()  # nothing changed, so nothing is published
+        for stream in streams:
+            stream.close()
+        
+        one_fetch_per_poll = len(calls) == 3 and sorted(calls[0]) == ['AAPL', 'JPM', 'MSFT']
+        full = all(len(quotes) == (2 if i % 2 else 3) for i, quotes in enumerate(first))
+        delta = second[0] == 'quotes' and decode(second[2]) == {'JPM': feed.quotes['JPM']} and feed.quotes['JPM']['change'] == 1.5
+        if all(event == ('snapshot', 0, {}) for event in snapshots) and one_fetch_per_poll and full and delta and feed.version == 2 and not feed.watched():
+            print(f"✓ 200 subscribers shared {len(calls)} upstream polls and received only changed prices")
+            return True
+        else:
+            print("✗ Quote feed fan-out or deltas are wrong")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing quote feed: {e}")
+        return False
+
+@script_test
+def test_user_store():
+    """Test that users saved by one worker are visible to another through the shared stores"""
+    print("\nTesting shared user store...")
+    
+    try:
+        import os
+        import tempfile
+        import time
+        from models import User, UserSession, SQLiteUserStore, RedisUserStore
+        
+        class FakeRedis:
+            """In-process stand-in for the get/set/delete subset of the Redis API"""
+            
+            def __init__(self):
+                self.values = {}
+            
+            def set(self, key, value, ex=None):
+                self.values[key] = (value.encode(), time.time() + ex if ex else None)
+            
+            def get(self, key):
+                value, expires = self.values.get(key, (None, None))
+                return value if expires is None or expires > time.time() else None
+            
+            def delete(self, key):
+                self.values.pop(key, None)
+        
+        user = User('42', 'investor@example.com', 'Test Investor')
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            redis = FakeRedis()
+            for make_store in (lambda: SQLiteUserStore(os.path.join(directory, 'users.db')), lambda: RedisUserStore(redis, ttl=60)):
+                # Two workers, each with its own connection and LRU in front of the same backend
+                first, second = UserSession(make_store(), cache_ttl=0), UserSession(make_store(), cache_ttl=0)
+                first.add_user(user)
+                loaded = second.get_user('42')
+                first.remove_user('42')
+                results.append(loaded == user and loaded.email == user.email and second.get_user('42') is None)
+        
+        cached = UserSession()
+        cached.add_user(user)
+        cached_hit = cached.get_user('42') is user and cached.stats()['hits'] == 1
+        
+        if all(results) and cached_hit and not hasattr(user, '__dict__') and user.get_id() == '42':
+            print("✓ SQLite and Redis-protocol stores share users across workers; LRU serves repeat lookups")
+            return True
+        else:
+            print(f"✗ User store results: {results}, cached hit: {cached_hit}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing user store: {e}")
+        return False
+
+@script_test
+def test_http_transport():
+    """Test connection reuse of the pooled transport and cached OpenID discovery"""
+    print("\nTesting pooled HTTP transport...")
+    
+    try:
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from transport import HttpTransport
+        from oidc import OIDCProvider
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep connections open between requests
+            
+            def do_GET(self):
+                host = f"http://127.0.0.1:{self.server.server_port}"
+                documents = {
+                    '/.well-known/openid-configuration': {'issuer': host, 'token_endpoint': host + '/token', 'jwks_uri': host + '/certs'},
+                    '/certs': {'keys': [{'kid': 'k1', 'kty': 'RSA'}]}
+                }
+                body = json.dumps(documents.get(self.path, {})).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        try:
+            transport = HttpTransport(pool_maxsize=4)
+            for _ in range(20):
+                transport.get(base + '/ping').json()
+            
+            provider = OIDCProvider(base + '/.well-known/openid-configuration', 'client-id', transport)
+            endpoints = [provider.endpoint('token_endpoint') for _ in range(5)]
+            keys = [provider.jwks() for _ in range(5)]
+            stats = transport.stats()[f"http://127.0.0.1:{server.server_port}"]
+        finally:
+            server.shutdown()
+            server.server_close()
+        
+        # 20 pings plus one discovery and one JWKS fetch, all over a single connection
+        if stats['requests'] == 22 and stats['connections'] == 1 and endpoints[-1] == base + '/token' and 'k1' in keys[-1]:
+            print(f"✓ {stats['requests']} requests over {stats['connections']} connection, discovery and JWKS fetched once")
+            return True
+        else:
+            print(f"✗ Unexpected transport stats: {stats}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing HTTP transport: {e}")
+        return False
+
+@script_test
+def test_id_token_verification():
+    """Test local ID token verification against a stubbed JWKS"""
+    print("\nTesting ID token verification...")
+    
+    try:
+        import base64
+        import json
+        import time
+        import jwt
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from oidc import OIDCProvider
+        
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+        jwk['kid'] = 'k1'
+        
+        class StubResponse:
+            def __init__(self, document):
+                self.document = document
+            
+            def raise_for_status(self):
+                pass
+            
+            def json(self):
+                return self.document
+        
+        class StubTransport:
+            documents = {
+                'https://issuer.test/.well-known/openid-configuration': {'jwks_uri': 'https://issuer.test/certs'},
+                'https://issuer.test/certs': {'keys': [jwk]}
+            }
+            
+            def get(self, url):
+                return StubResponse(self.documents[url])
+        
+        now = int(time.time())
+        claims = {'iss': 'https://accounts.google.com', 'aud': 'client-id', 'sub': '42',
+                  'email': 'a@b.c', 'iat': now, 'exp': now + 600}
+        token = jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': 'k1'})
+        header, payload, signature = token.split('.')
+        forged = dict(claims, email='mallory@b.c')
+        tampered = '.'.join([header, base64.urlsafe_b64encode(json.dumps(forged).encode()).rstrip(b'=').decode(), signature])
+        
+        provider = OIDCProvider('https://issuer.test/.well-known/openid-configuration', 'client-id', StubTransport())
+        verified = provider.verify_id_token(token)
+        rejected = provider.verify_id_token(tampered)
+        
+        if verified and verified['email'] == 'a@b.c' and rejected is None and provider.verified == 1 and provider.fallbacks == 1:
+            print("✓ Signed token verified locally, tampered token rejected")
+            return True
+        else:
+            print(f"✗ Unexpected verification results: {verified}, {rejected}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing ID token verification: {e}")
+        return False
+
+@script_test
+def test_fundamentals_index():
+    """Test fundamentals index filters and sorts against a brute-force scan"""
+    print("\nTesting fundamentals index...")
+    
+    try:
+        from fundamentals import FundamentalsIndex
+        
+        rng = np.random.default_rng(18)
+        infos = {
+            f"S{i:04d}": {
+                'trailingPE': float(rng.integers(5, 40)) if i % 7 else None,
+                'dividendYield': rng.uniform(0, 0.05),
+                'sector': 'Utilities' if i % 3 == 0 else 'Oil and Gas' if i % 5 == 0 else 'Technology',
+                'longName': f"Company {i}"
+            }
+            for i in range(5000)
+        }
+        index = FundamentalsIndex.from_infos(infos)
+        
+        rows, total = index.query("pe < 25 and dividend_yield > 2 and sector == 'utilities'", sort='pe', descending=True, limit=20)
+        expected = sorted(
+            (symbol for symbol, info in infos.items()
+             if info['trailingPE'] is not None and info['trailingPE'] < 25 and info['dividendYield'] * 100 > 2 and info['sector'] == 'Utilities'),
+            key=lambda symbol: -infos[symbol]['trailingPE']
+        )
+        pes = [row['pe_ratio'] for row in rows]
+        _, not_equal = index.query('pe != 10')
+        expected_not_equal = sum(1 for info in infos.values() if info['trailingPE'] is not None and info['trailingPE'] != 10)
+        # 'and' inside a quoted value is part of the value, not a conjunction
+        _, oil_and_gas = index.query('sector == "Oil and Gas" and pe < 15')
+        expected_oil_and_gas = sum(1 for info in infos.values()
+                                   if info['sector'] == 'Oil and Gas' and info['trailingPE'] is not None and info['trailingPE'] < 15)
+        
+        if total == len(expected) and pes == sorted(pes, reverse=True) and {row['symbol'] for row in rows} <= set(expected) and not_equal == expected_not_equal and oil_and_gas == expected_oil_and_gas > 0:
+            print(f"✓ {total} of {len(index)} symbols matched, sorted by P/E; results match a full scan")
+            return True
+        else:
+            print(f"✗ Index returned {total} matches, expected {len(expected)}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing fundamentals index: {e}")
+        return False
+
+@script_test
+def test_universes():
+    """Test universe files, dated membership, sharding and survivorship-free backtests"""
+    print("\nTesting symbol universes...")
+    
+    try:
+        import os
+        import tempfile
+        import pandas as pd
+        from universes import UniverseRegistry, partition
+        from backtest import Backtester
+        
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'demo.csv'), 'w') as f:
+                f.write("symbol,start,end\nAAA,,\nBBB,,2024-01-01\nCCC,2024-01-01,\nDDD,2022-01-01,2023-01-01\nDDD,2024-06-01,\n")
+            with open(os.path.join(directory, 'small.txt'), 'w') as f:
+                f.write("# comment\naaa\nbbb\n")
+            registry = UniverseRegistry(directory, os.path.join(directory, 'watchlists'))
+            universe = registry.get('demo')
+            registry.save_watchlist('user-1', ['msft', 'aapl'])
+            watchlist = registry.resolve('watchlist', 'user-1').all_symbols()
+            names = registry.names()
+        
+        members_2023 = universe.symbols('2023-06-30')
+        members_2024 = universe.symbols('2024-07-01')
+        
+        symbols = [f"S{i:04d}" for i in range(3000)]
+        shards = partition(symbols, 8)
+        stable = partition(symbols[:-1], 8)[0] == [symbol for symbol in shards[0] if symbol != symbols[-1]]
+        
+        # Prices exist for every symbol, but BBB leaves and CCC joins the index at the start of 2024
+        dates = pd.bdate_range('2023-01-02', '2024-12-31')
+        rng = np.random.default_rng(19)
+        prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0.0005, 0.01, (len(dates), 4)), axis=0)), index=dates, columns=['AAA', 'BBB', 'CCC', 'DDD'])
+        backtester = Backtester(prices, membership=universe.membership(dates, prices.columns))
+        result = backtester.run(top_n=4, lookback=60)
+        violations = [
+            (rebalance['date'], symbol) for rebalance in result['rebalances'] for symbol in rebalance['holdings']
+            if not universe.is_member(symbol, rebalance['date'])
+        ]
+        
+        if (members_2023 == ['AAA', 'BBB'] and members_2024 == ['AAA', 'CCC', 'DDD'] and names == ['demo', 'small']
+                and watchlist == ['MSFT', 'AAPL'] and sorted(sum(shards, [])) == symbols and stable and not violations):
+            print(f"✓ Dated membership honoured over {len(result['rebalances'])} rebalances; 3000 symbols in {len(shards)} stable shards")
+            return True
+        else:
+            print(f"✗ Universe results wrong: {members_2023}, {members_2024}, violations {violations[:3]}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing universes: {e}")
+        return False
+
+@script_test
+def test_offline_sources():
+    """Test the synthetic market, fault injection and fixture record/replay"""
+    print("\nTesting offline market data sources...")
+    
+    try:
+        import tempfile
+        from replay import SyntheticSource, ReplaySource, SimulatedUpstreamError, record_fixtures, synthetic_symbols
+        from rate_limiter import RequestScheduler, is_retryable
+        
+        source = SyntheticSource(days=600, end='2024-12-31', seed=20)
+        symbols = synthetic_symbols(520, ['AAPL', 'MSFT'])
+        histories = source.download(symbols)
+        # A symbol's series must not depend on which batch asked for it
+        alone = SyntheticSource(days=600, end='2024-12-31', seed=20).download(['SYN0100'])['SYN0100']
+        same = histories['SYN0100'].equals(alone)
+        ohlc_valid = all(
+            (hist['Low'] <= hist[['Open', 'Close']].min(axis=1)).all() and (hist['High'] >= hist[['Open', 'Close']].max(axis=1)).all()
+            for hist in histories.values()
+        )
+        info = source.info('AAPL')
+        info_valid = info['regularMarketPrice'] == round(float(histories['AAPL']['Close'].iloc[-1]), 2) and info['sector'] and info['marketCap'] > 0
+        
+        # Injected 429/503s are retried by the rate limiter until they run out
+        flaky = SyntheticSource(days=300, error_rate=1.0)
+        scheduler = RequestScheduler(6000, max_retries=2, sleep=lambda seconds: None)
+        try:
+            scheduler.call(flaky.info, 'AAPL')
+            retried = False
+        except SimulatedUpstreamError as e:
+            retried = is_retryable(e) and scheduler.stats()['retries'] == 2
+        
+        with tempfile.TemporaryDirectory() as directory:
+            record_fixtures(source, symbols[:20], directory, period='max')
+            replay = ReplaySource(directory)
+            replayed = replay.download(symbols[:20], period='max')
+            round_trip = len(replayed) == 20 and np.allclose(replayed['MSFT']['Close'].to_numpy(), histories['MSFT']['Close'].to_numpy())
+            info_round_trip = replay.info('MSFT')['longName'] == source.info('MSFT')['longName']
+        
+        if len(histories) == 520 and same and ohlc_valid and info_valid and retried and round_trip and info_round_trip:
+            print("✓ 520 synthetic symbols, deterministic per symbol, OHLC consistent; fixtures replay exactly")
+            return True
+        else:
+            print(f"✗ Offline sources wrong: same {same}, ohlc {ohlc_valid}, info {info_valid}, retried {retried}, replay {round_trip}/{info_round_trip}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing offline sources: {e}")
+        return False
+
+@script_test
+def test_metrics():
+    """Test stage spans, Prometheus exposition, Server-Timing and the sampling profiler"""
+    print("\nTesting instrumentation...")
+    
+    try:
+        import threading
+        import time
+        from metrics import Metrics, SamplingProfiler
+        from app import app
+        
+        registry = Metrics()
+        registry.start_trace()
+        with registry.span('fetch_info', items=500):
+            time.sleep(0.002)
+        with registry.span('fetch_info', items=20):
+            pass
+        registry.inc('upstream_calls_total', call='info', outcome='ok')
+        trace = registry.end_trace()
+        text = registry.render([('cache_hit_ratio', {'cache': 'info'}, 0.75)])
+        exposition_valid = (
+            'stocks_analyzer_stage_seconds_count{stage="fetch_info"} 2' in text
+            and 'stocks_analyzer_stage_items_total{stage="fetch_info"} 520' in text
+            and 'stocks_analyzer_stage_seconds_bucket{stage="fetch_info",le="+Inf"} 2' in text
+            and 'stocks_analyzer_upstream_calls_total{call="info",outcome="ok"} 1' in text
+            and 'stocks_analyzer_cache_hit_ratio{cache="info"} 0.75' in text
+        )
+        
+        def busy_loop():
+            deadline = time.perf_counter() + 0.2
+            while time.perf_counter() < deadline:
+                sum(range(1000))
+        
+        worker = threading.Thread(target=busy_loop)
+        worker.start()
+        profiler = SamplingProfiler(worker.ident, interval=0.002).start()
+        worker.join()
+        profiler.stop()
+        sampled_busy_loop = profiler.samples > 10 and 'busy_loop' in profiler.top(1)[0][0]
+        
+        client = app.test_client()
+        token = app.config['METRICS_TOKEN']
+        app.config['METRICS_TOKEN'] = 'scrape-secret'
+        try:
+            denied = client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+            client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+            response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+            app.config['METRICS_TOKEN'] = None
+            closed_without_token = client.get('/metrics').status_code == 403
+        finally:
+            app.config['METRICS_TOKEN'] = token
+        scraped = denied and closed_without_token and 'stocks_analyzer_http_requests_total{endpoint="prometheus_metrics",method="GET",status="200"}' in response.get_data(as_text=True)
+        server_timing = 'total;dur=' in response.headers.get('Server-Timing', '')
+        
+        if trace['fetch_info'] >= 0.002 and exposition_valid and sampled_busy_loop and scraped and server_timing:
+            print(f"✓ Spans, /metrics exposition and Server-Timing work; profiler took {profiler.samples} samples")
+            return True
+        else:
+            print(f"✗ Instrumentation wrong: trace {trace}, exposition {exposition_valid}, profiler {profiler.top(1)}, scraped {scraped}, timing {server_timing}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing instrumentation: {e}")
+        return False
+
+@script_test
+def test_chart_payload():
+    """Test LTTB and min/max downsampling, compact encodings and cached chart bodies"""
+    print("\nTesting chart payloads...")
+    
+    try:
+        import gzip
+        import json
+        import pandas as pd
+        from charts import lttb, minmax_indices, encode, decode, chart_payload
+        from responses import ResponseCache
+        
+        rng = np.random.default_rng(22)
+        dates = pd.bdate_range(end='2024-12-31', periods=2520)
+        closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, len(dates))))
+        closes[1234] *= 1.5  # a one-day spike both methods must keep
+        hist = pd.DataFrame({'Close': closes}, index=dates)
+        x = np.arange(len(closes))
+        
+        kept = lttb(x, closes, 500)
+        lttb_valid = len(kept) == 500 and kept[0] == 0 and kept[-1] == len(closes) - 1 and np.all(np.diff(kept) > 0) and 1234 in kept
+        extremes = minmax_indices(closes, 500)
+        minmax_valid = len(extremes) <= 500 and 1234 in extremes and int(np.argmin(closes)) in extremes
+        
+        delta_round_trip = np.allclose(decode(encode(closes)), np.round(closes, 2))
+        float32_round_trip = np.allclose(decode(encode(closes, 'float32')), closes, rtol=1e-6)
+        
+        projection = (np.array([20089, 20119]), np.array([210.5, 215.25]))
+        payload = chart_payload('TEST', hist, points=500, projection=projection)
+        days = decode(payload['x'])
+        payload_valid = (
+            payload['points'] == 500 and payload['as_of'] == '2024-12-31'
+            and days[-1] == (pd.Timestamp('2024-12-31') - pd.Timestamp('1970-01-01')).days
+            and np.allclose(decode(payload['projection']['y']), [210.5, 215.25])
+        )
+        
+        # Projected points of /chart land one month apart, ending at the 12-month horizon
+        import app as app_module
+        get_history = app_module.market_data.get_history
+        app_module.market_data.get_history = lambda symbols, **kwargs: {symbol: hist.iloc[-504:] for symbol in symbols}
+        try:
+            chart = app_module.build_chart('TEST', hist, 500, 'lttb', 'delta', months=12)
+        finally:
+            app_module.market_data.get_history = get_history
+        gaps = np.diff(decode(chart['projection']['x']))
+        months_valid = len(gaps) == 12 and gaps.min() >= 28 and gaps.max() <= 31 and 350 <= gaps.sum() <= 368
+        
+        builds = []
+        cache = ResponseCache(lambda obj: json.dumps(obj, separators=(',', ':')), max_entries=10)
+        entry = cache.get_or_build(('TEST', '10y'), lambda: builds.append(1) or payload)
+        again = cache.get_or_build(('TEST', '10y'), lambda: builds.append(1) or payload)
+        raw_size = len(hist.to_json())
+        cached_valid = len(builds) == 1 and entry is again and json.loads(gzip.decompress(entry.variants['gzip'])) == json.loads(entry.body)
+        
+        if lttb_valid and minmax_valid and delta_round_trip and float32_round_trip and payload_valid and months_valid and cached_valid:
+            print(f"✓ 2520 closes -> 500 points, {len(entry.variants['gzip'])} bytes gzipped vs {raw_size} bytes raw; spike kept by both methods")
+            return True
+        else:
+            print(f"✗ Chart payload wrong: lttb {lttb_valid}, minmax {minmax_valid}, delta {delta_round_trip}, float32 {float32_round_trip}, payload {payload_valid}, monthly gaps {gaps}, cache {cached_valid}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing chart payloads: {e}")
+        return False
+
+@script_test
+def test_response_cache():
+    """Test the byte-bounded response cache, ETag revalidation, compression and NumPy-aware JSON"""
+    print("\nTesting response cache...")
+    
+    try:
+        import gzip
+        import json
+        from flask import request
+        from cache import TTLCache
+        from app import app
+        from responses import ResponseCache
+        
+        sized = TTLCache(max_size=100, max_weight=1000, weigher=len)
+        for i in range(5):
+            sized.set(i, 'x' * 300)
+        bounded = sized.stats()['weight'] == 900 and sized.get(0) is None and sized.get(4) is not None
+        
+        encoded = json.loads(app.json.dumps({'price': np.float64(101.25), 'series': np.arange(3), 'count': np.int64(7)}))
+        numpy_valid = encoded == {'price': 101.25, 'series': [0, 1, 2], 'count': 7}
+        
+        builds = []
+        cache = ResponseCache(app.json.dumps, max_entries=10)
+        payload = {'success': True, 'stocks': [{'symbol': f'S{i}', 'score': np.float64(i / 7)} for i in range(100)]}
+        entry = cache.get_or_build(('analyze', 1), lambda: builds.append(1) or payload)
+        cache.get_or_build(('analyze', 1), lambda: builds.append(1) or payload)
+        
+        # A failure is served but rebuilt on the next request rather than cached
+        failures = []
+        for _ in range(2):
+            cache.get_or_build(('projection', 1), lambda: failures.append(1) or {'success': False, 'error': 'upstream'})
+        
+        with app.test_request_context('/analyze', headers={'Accept-Encoding': 'gzip'}):
+            first = cache.respond(entry, request)
+        etag = first.headers['ETag']
+        with app.test_request_context('/analyze', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}):
+            revalidated = cache.respond(entry, request)
+        with app.test_request_context('/analyze', headers={'If-None-Match': etag}):
+            identity = cache.respond(entry, request)
+        
+        compressed = first.headers.get('Content-Encoding') == 'gzip' and json.loads(gzip.decompress(first.get_data())) == json.loads(entry.body)
+        conditional = revalidated.status_code == 304 and identity.status_code == 200 and 'Accept-Encoding' in first.headers.get('Vary', '')
+        
+        if bounded and numpy_valid and len(builds) == 1 and len(failures) == 2 and compressed and conditional:
+            print(f"✓ {len(entry.body)} byte body built once, {len(entry.variants['gzip'])} bytes gzipped, 304 on a matching ETag")
+            return True
+        else:
+            print(f"✗ Response cache wrong: bounded {bounded}, numpy {numpy_valid}, builds {len(builds)}, failure builds {len(failures)}, compressed {compressed}, conditional {conditional}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing response cache: {e}")
+        return False
+
+@script_test
+def test_compute_pool():
+    """Test that the shared-memory compute pool matches the inline factor and trend computations"""
+    print("\nTesting compute pool...")
+    
+    try:
+        import pandas as pd
+        from compute_pool import ComputePool, SharedMatrix
+        from screening import compute_factors
+        from projection import fit_trend
+        
+        rng = np.random.default_rng(24)
+        dates = pd.bdate_range(end='2024-12-31', periods=504)
+        closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, (len(dates), 120)), axis=0))
+        prices = pd.DataFrame(closes, index=dates, columns=[f"S{i:03d}" for i in range(120)])
+        prices.iloc[:200, 3] = np.nan  # a shorter history
+        
+        pool = ComputePool(processes=2, min_columns=20)
+        builds = []
+        matrix = pool.publish(('1y', 'test'), 1, lambda: builds.append(1) or prices)
+        again = pool.publish(('1y', 'test'), 1, lambda: builds.append(1) or prices)
+        symbols = ['S003', 'MISSING'] + list(prices.columns)
+        factors = pool.factors(matrix, symbols, start=252)
+        expected = compute_factors(prices.iloc[252:]).reindex(symbols)['sharpe_ratio'].to_numpy()
+        factors_match = np.allclose(factors['sharpe_ratio'], expected, equal_nan=True) and np.isnan(factors['sharpe_ratio'][1])
+        
+        fits = pool.fit_trends(closes, 'log_linear')
+        reference = fit_trend(closes, 'log_linear')
+        trends_match = all(np.allclose(fits[name], reference[name]) for name in reference)
+        
+        stats = pool.stats()
+        name = matrix.descriptor()[0]
+        pool.shutdown()
+        
+        def attachable(descriptor):
+            try:
+                SharedMatrix.attach(descriptor).close()
+                return True
+            except FileNotFoundError:
+                return False
+        
+        freed = not attachable((name, prices.shape))
+        
+        # A replaced matrix stays mapped while a task still uses it, and is freed once it finishes
+        small = ComputePool(processes=2, max_matrices=1)
+        first = small.publish(('1y', 'test'), 1, lambda: prices)
+        small._inflight[first.shm.name] = 1
+        for version in (2, 3, 4):
+            small.publish(('1y', 'test'), version, lambda: prices)
+        kept_while_busy = attachable(first.descriptor())
+        del small._inflight[first.shm.name]
+        small.publish(('1y', 'test'), 5, lambda: prices)
+        freed_when_idle = not attachable(first.descriptor())
+        small.shutdown()
+        
+        if not (kept_while_busy and freed_when_idle):
+            print(f"✗ Retired matrix lifetime wrong: kept while busy {kept_while_busy}, freed when idle {freed_when_idle}")
+            return False
+        if factors_match and trends_match and matrix is again and len(builds) == 1 and stats['tasks'] >= 4 and freed:
+            print(f"✓ {stats['tasks']} worker tasks over a {stats['shared_bytes']} byte shared matrix match the inline results")
+            return True
+        else:
+            print(f"✗ Compute pool wrong: factors {factors_match}, trends {trends_match}, builds {len(builds)}, stats {stats}, freed {freed}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing compute pool: {e}")
+        return False
+
+@script_test
+def test_portfolio_risk():
+    """Test batched VaR/CVaR, Euler risk components, beta and correlation clustering"""
+    print("\nTesting portfolio risk...")
+    
+    try:
+        import pandas as pd
+        from risk import RiskEngine, component_cvar
+        
+        rng = np.random.default_rng(25)
+        dates = pd.bdate_range(end='2024-12-31', periods=505)
+        market = rng.normal(0.0004, 0.01, len(dates))
+        energy = rng.normal(0, 0.015, len(dates))
+        loadings = [(1.0, 0.0), (1.0, 0.0), (1.0, 0.0), (0.3, 1.0), (0.3, 1.0)]
+        histories = {}
+        for i, (beta, sector) in enumerate(loadings):
+            returns = beta * market + sector * energy + rng.normal(0, 0.003, len(dates))
+            histories[f"S{i}"] = pd.DataFrame({'Close': 100 * np.exp(np.cumsum(returns))}, index=dates)
+        benchmark = pd.DataFrame({'Close': 100 * np.exp(np.cumsum(market))}, index=dates)
+        
+        engine = RiskEngine(confidence=0.95, cluster_threshold=0.5)
+        model = engine.model(histories, benchmark, window=504)
+        clustered = model.clusters.tolist() == [0, 0, 0, 1, 1]
+        betas_valid = np.allclose(model.asset_betas[:3], 1.0, atol=0.05)
+        
+        weights = rng.dirichlet(np.ones(5), size=1000)
+        batch = engine.evaluate(model, weights)
+        singles = [engine.evaluate(model, w) for w in weights[:20]]
+        batch_matches = all(np.isclose(batch[name][i], single[name][0]) for i, single in enumerate(singles) for name in batch)
+        
+        pnl = model.returns @ weights[0]
+        worst = np.sort(pnl)[:25]  # 5% of 504 days
+        historical_valid = np.isclose(batch['historical_var'][0], -worst[-1]) and np.isclose(batch['historical_cvar'][0], -worst.mean())
+        ordered = bool(np.all(batch['historical_cvar'] >= batch['historical_var']) and np.all(batch['parametric_cvar'] > batch['parametric_var']))
+        
+        components = component_cvar(model.returns, weights[0], 0.95)
+        report = engine.report(model, weights[0], 10000)
+        euler_valid = np.isclose(components.sum(), batch['historical_cvar'][0]) and len(report['clusters']) == 2
+        
+        if clustered and betas_valid and batch_matches and historical_valid and ordered and euler_valid:
+            print(f"✓ 1000 portfolios evaluated in one batch; 95% VaR ${report['historical_var_amount']:.2f}, CVaR ${report['historical_cvar_amount']:.2f}, 2 clusters")
+            return True
+        else:
+            print(f"✗ Risk wrong: clusters {model.clusters.tolist()}, betas {betas_valid}, batch {batch_matches}, historical {historical_valid}, ordered {ordered}, euler {euler_valid}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing portfolio risk: {e}")
+        return False
+
+@script_test
+def test_import_time():
+    """Test that importing the app does not load the analytics stack"""
+    print("\nTesting app import time...")
+    
+    try:
+        import os
+        import subprocess
+        import sys
+        
+        env = dict(os.environ, PRELOAD_ANALYTICS='false')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import app'],
+            capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        # stderr lines look like "import time: self [us] | cumulative | name"
+        modules = {}
+        for line in result.stderr.splitlines():
+            parts = line.split('|')
+            if line.startswith('import time:') and len(parts) == 3 and parts[0].split(':')[1].strip().isdigit():
+                modules[parts[2].strip()] = int(parts[1])
+        heavy = [name for name in ('numpy', 'pandas', 'yfinance', 'plotly') if name in modules]
+        total = modules.get('app', 0) / 1e6
+        
+        if result.returncode == 0 and not heavy and 0 < total < 2.0:
+            print(f"✓ import app took {total:.3f}s without numpy/pandas/yfinance")
+            return True
+        else:
+            print(f"✗ import app took {total:.3f}s and loaded {heavy}")
+            return False
+    except Exception as e:
+        print(f"✗ Error testing import time: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("Stock Portfolio Analyzer - Functionality Tests")
@@ -135,14 +1395,40 @@ def main():
         test_stock_data,
         test_sharpe_calculation,
         test_portfolio_creation,
-        test_growth_projection
+        test_growth_projection,
+        test_market_data_provider,
+        test_ttl_cache,
+        test_rate_limiter,
+        test_vectorized_screening,
+        test_price_store,
+        test_snapshot_scheduler,
+        test_analysis_jobs,
+        test_projection_engine,
+        test_monte_carlo,
+        test_import_time,
+        test_portfolio_optimizer,
+        test_share_allocation,
+        test_backtest,
+        test_rolling_stats,
+        test_quote_feed,
+        test_user_store,
+        test_http_transport,
+        test_id_token_verification,
+        test_fundamentals_index,
+        test_universes,
+        test_offline_sources,
+        test_metrics,
+        test_chart_payload,
+        test_response_cache,
+        test_compute_pool,
+        test_portfolio_risk
     ]
     
     passed = 0
     total = len(tests)
     
     for test in tests:
-        if test():
+        if getattr(test, '__wrapped__', test)():
             passed += 1
     
     print("\n" + "=" * 50)
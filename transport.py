@@ -0,0 +1,78 @@
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+
+# Yahoo rejects the default python-requests User-Agent
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5'
+}
+
+
+class HttpTransport:
+    """Keep-alive connection pools shared by every outbound HTTP call, sized per host.
+
+    Sessions built per request (such as one OAuth2Session per login) are
+    mounted onto the same adapters, so they reuse already-open TLS
+    connections instead of each opening their own.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, host_pool_sizes=None, timeout=10):
+        self.timeout = timeout
+        self.default_adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.host_adapters = {
+            f"https://{host}/": HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            for host, size in (host_pool_sizes or {}).items()
+        }
+        self.session = self.mount(requests.Session())
+        self._sessions = {}
+
+    def mount(self, session):
+        """Route a requests.Session (or subclass) through the shared pools and return it"""
+        session.mount('https://', self.default_adapter)
+        session.mount('http://', self.default_adapter)
+        for prefix, adapter in self.host_adapters.items():
+            session.mount(prefix, adapter)
+        return session
+
+    def named_session(self, name, headers=None):
+        """Return a long-lived session with its own headers and cookies on the shared pools"""
+        session = self._sessions.get(name)
+        if session is None:
+            session = self.mount(requests.Session())
+            session.headers.update(headers or {})
+            session = self._sessions.setdefault(name, session)
+        return session
+
+    def get(self, url, **kwargs):
+        """GET through the shared session with the default timeout"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def stats(self):
+        """Return per-host request and connection counts of the live pools"""
+        hosts = {}
+        for adapter in [self.default_adapter] + list(self.host_adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = f"{pool.scheme}://{pool.host}:{pool.port}"
+                entry = hosts.setdefault(host, {'requests': 0, 'connections': 0, 'pool_maxsize': pool.pool.maxsize if pool.pool else 0})
+                entry['requests'] += pool.num_requests
+                entry['connections'] += pool.num_connections
+        for entry in hosts.values():
+            entry['reused'] = max(entry['requests'] - entry['connections'], 0)
+            entry['reuse_ratio'] = entry['reused'] / entry['requests'] if entry['requests'] else 0.0
+        return hosts
+
+
+# Global transport instance
+http_transport = HttpTransport(
+    pool_connections=Config.HTTP_POOL_CONNECTIONS,
+    pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+    host_pool_sizes=Config.HTTP_HOST_POOL_SIZES,
+    timeout=Config.HTTP_TIMEOUT
+)
@@ -0,0 +1,196 @@
+import csv
+import os
+import re
+import threading
+import zlib
+from datetime import date
+
+SYMBOL = re.compile(r"^[A-Z0-9][A-Z0-9.\-^=]{0,14}$")
+
+
+def normalize_symbols(symbols):
+    """Upper-case, validate and de-duplicate symbols, keeping their order"""
+    cleaned = []
+    for symbol in symbols:
+        symbol = str(symbol).strip().upper()
+        if not SYMBOL.match(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        cleaned.append(symbol)
+    return list(dict.fromkeys(cleaned))
+
+
+def partition(symbols, shards):
+    """Split symbols into `shards` lists by a stable hash.
+
+    A symbol always lands in the same shard for a given shard count, so
+    membership changes only move the symbols that were added or removed.
+    """
+    parts = [[] for _ in range(max(shards, 1))]
+    for symbol in symbols:
+        parts[zlib.crc32(symbol.encode()) % len(parts)].append(symbol)
+    return [sorted(part) for part in parts if part]
+
+
+def _as_date(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, date):
+        return value.isoformat()
+    return date.fromisoformat(str(value)[:10]).isoformat()
+
+
+class Universe:
+    """A named symbol list with optional dated membership.
+
+    `members` maps each symbol to a list of (start, end) ISO dates; either
+    end may be None for open intervals, and a symbol that left and rejoined
+    the index has several intervals. Plain lists have one open interval per
+    symbol.
+    """
+
+    def __init__(self, name, members):
+        self.name = name
+        self.members = {symbol: sorted(intervals, key=lambda interval: interval[0] or '') for symbol, intervals in members.items()}
+
+    @classmethod
+    def from_symbols(cls, name, symbols):
+        return cls(name, {symbol: [(None, None)] for symbol in normalize_symbols(symbols)})
+
+    @classmethod
+    def from_file(cls, path, name=None):
+        """Load a .txt file (one symbol per line, # comments) or a .csv with symbol,start,end columns"""
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        members = {}
+        with open(path, newline='') as f:
+            if path.endswith('.csv'):
+                for row in csv.DictReader(line for line in f if not line.startswith('#')):
+                    symbol = normalize_symbols([row['symbol']])[0]
+                    interval = (_as_date(row.get('start')), _as_date(row.get('end')))
+                    members.setdefault(symbol, []).append(interval)
+            else:
+                for line in f:
+                    line = line.split('#', 1)[0].strip()
+                    if line:
+                        members.setdefault(normalize_symbols([line])[0], [(None, None)])
+        return cls(name, members)
+
+    def __len__(self):
+        return len(self.members)
+
+    def is_member(self, symbol, as_of):
+        """True if the symbol was in the universe on the ISO date as_of (end dates are exclusive)"""
+        return any(
+            (start is None or start <= as_of) and (end is None or as_of < end)
+            for start, end in self.members.get(symbol, ())
+        )
+
+    def symbols(self, as_of=None):
+        """Members on a date (today by default), in file order"""
+        as_of = _as_date(as_of) or date.today().isoformat()
+        return [symbol for symbol in self.members if self.is_member(symbol, as_of)]
+
+    def all_symbols(self):
+        """Every symbol that was ever a member, for backtests free of survivorship bias"""
+        return list(self.members)
+
+    def membership(self, dates, symbols):
+        """Boolean dates x symbols matrix of membership on each date"""
+        import numpy as np
+        import pandas as pd
+
+        days = pd.DatetimeIndex(dates)
+        if days.tz is not None:
+            days = days.tz_localize(None)
+        days = days.values.astype('datetime64[D]')
+        mask = np.zeros((len(days), len(symbols)), dtype=bool)
+        for j, symbol in enumerate(symbols):
+            for start, end in self.members.get(symbol, ()):
+                after = days >= np.datetime64(start, 'D') if start else True
+                before = days < np.datetime64(end, 'D') if end else True
+                mask[:, j] |= after & before
+        return mask
+
+    def shards(self, count, as_of=None):
+        """Members on a date split into `count` stable shards"""
+        return partition(self.symbols(as_of), count)
+
+    def summary(self):
+        """Return the name and member counts"""
+        current = self.symbols()
+        return {
+            'name': self.name,
+            'symbols': len(current),
+            'all_time_symbols': len(self.members),
+            'has_history': any(interval != (None, None) for intervals in self.members.values() for interval in intervals)
+        }
+
+
+class UniverseRegistry:
+    """Universes loaded from a directory of symbol files, plus one watchlist file per user"""
+
+    def __init__(self, directory, watchlist_dir=None):
+        self.directory = directory
+        self.watchlist_dir = watchlist_dir
+        self._cache = {}  # path -> (mtime, Universe)
+        self._lock = threading.Lock()
+
+    def _files(self):
+        if not os.path.isdir(self.directory):
+            return {}
+        return {
+            os.path.splitext(entry)[0]: os.path.join(self.directory, entry)
+            for entry in sorted(os.listdir(self.directory))
+            if entry.endswith(('.txt', '.csv'))
+        }
+
+    def _load(self, path, name):
+        # Reload only when the file changed on disk
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        universe = Universe.from_file(path, name)
+        with self._lock:
+            self._cache[path] = (mtime, universe)
+        return universe
+
+    def names(self):
+        """Names of the available universes"""
+        return list(self._files())
+
+    def get(self, name):
+        """Return a universe by name; raises ValueError if there is no such file"""
+        path = self._files().get(name)
+        if path is None:
+            raise ValueError(f"Unknown universe: {name}")
+        return self._load(path, name)
+
+    def _watchlist_path(self, user_id):
+        safe = re.sub(r"[^A-Za-z0-9_.-]", '_', str(user_id))
+        return os.path.join(self.watchlist_dir, f"{safe}.txt")
+
+    def watchlist(self, user_id):
+        """Return the user's watchlist universe, or None if they have not saved one"""
+        if not self.watchlist_dir or not os.path.exists(self._watchlist_path(user_id)):
+            return None
+        return self._load(self._watchlist_path(user_id), 'watchlist')
+
+    def save_watchlist(self, user_id, symbols):
+        """Write the user's watchlist atomically and return it"""
+        universe = Universe.from_symbols('watchlist', symbols)
+        path = self._watchlist_path(user_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            f.write('\n'.join(universe.all_symbols()) + '\n')
+        os.replace(path + '.tmp', path)
+        return universe
+
+    def resolve(self, name, user_id=None):
+        """Return a named universe, or the user's watchlist for name 'watchlist'"""
+        if name == 'watchlist':
+            universe = self.watchlist(user_id)
+            if universe is None:
+                raise ValueError("No watchlist saved yet")
+            return universe
+        return self.get(name)